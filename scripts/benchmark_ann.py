@@ -0,0 +1,82 @@
+"""
+Benchmark del índice aproximado IVF frente a la búsqueda exacta
+
+Mide recall@k y latencias p50/p99 sobre vectores sintéticos agrupados
+(parecidos a embeddings reales de pasajes) para distintos valores de nprobe.
+
+Uso:
+    python scripts/benchmark_ann.py --n 100000 --dim 384 --queries 200
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+# Agregar src al path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from services.vector_store import VectorMatrix
+from services.ann_index import ExactVectorIndex, IVFFlatIndex
+
+def make_dataset(n: int, dim: int, clusters: int, seed: int) -> np.ndarray:
+    """Generar vectores agrupados alrededor de centros aleatorios"""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, size=n)
+    return centers[labels] + 0.6 * rng.normal(size=(n, dim)).astype(np.float32)
+
+def measure(index, queries: np.ndarray, k: int):
+    """Ejecutar las consultas y devolver (resultados, latencias en ms)"""
+    results = []
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        hits = index.search(query, k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append({row for row, _ in hits})
+    return results, np.array(latencies)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark IVF vs búsqueda exacta")
+    parser.add_argument("--n", type=int, default=100_000, help="Número de vectores")
+    parser.add_argument("--dim", type=int, default=384, help="Dimensión de los vectores")
+    parser.add_argument("--queries", type=int, default=200, help="Número de consultas")
+    parser.add_argument("--k", type=int, default=10, help="Resultados por consulta")
+    parser.add_argument("--nlist", type=int, default=None, help="Listas IVF (None = automático)")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+    parser.add_argument("--dtype", choices=["float32", "float16"], default="float32")
+    args = parser.parse_args()
+
+    print(f"🔄 Generando {args.n} vectores de dimensión {args.dim}...")
+    data = make_dataset(args.n, args.dim, clusters=max(8, args.n // 500), seed=0)
+    rng = np.random.default_rng(1)
+    queries = data[rng.choice(args.n, size=args.queries, replace=False)]
+    queries = queries + 0.3 * rng.normal(size=queries.shape).astype(np.float32)
+
+    matrix = VectorMatrix(dtype=args.dtype, initial_capacity=args.n)
+    matrix.extend(data)
+
+    exact = ExactVectorIndex(matrix)
+    truth, exact_latencies = measure(exact, queries, args.k)
+
+    print("🔄 Entrenando IVF...")
+    start = time.perf_counter()
+    ivf = IVFFlatIndex(matrix, nlist=args.nlist)
+    ivf.train()
+    print(f"✅ Entrenamiento: {time.perf_counter() - start:.2f}s ({ivf.get_stats()['nlist']} listas)")
+
+    print(f"\n{'índice':<16}{'recall@' + str(args.k):>12}{'p50 ms':>10}{'p99 ms':>10}")
+    print(f"{'exacto':<16}{1.0:>12.3f}{np.percentile(exact_latencies, 50):>10.2f}"
+          f"{np.percentile(exact_latencies, 99):>10.2f}")
+
+    for nprobe in args.nprobe:
+        ivf.nprobe = nprobe
+        found, latencies = measure(ivf, queries, args.k)
+        recall = np.mean([len(f & t) / max(len(t), 1) for f, t in zip(found, truth)])
+        print(f"{'ivf nprobe=' + str(nprobe):<16}{recall:>12.3f}"
+              f"{np.percentile(latencies, 50):>10.2f}{np.percentile(latencies, 99):>10.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Benchmark de la búsqueda con shards (scatter-gather en procesos locales)
+
+Indexa un corpus sintético y mide latencias p50/p99 y consultas por segundo
+con 1 shard (búsqueda en el propio proceso) y con 2..N shards, para ver
+cómo escala la puntuación al repartirla entre núcleos. La columna
+"coincidencia" es la fracción media del top-k que coincide con la de la
+primera configuración medida: con shards el orden es aproximado (cada shard
+usa sus propias estadísticas).
+
+Uso:
+    python scripts/benchmark_shards.py --articles 20000 --shards 1 2 4 8 --mode lexical
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+import numpy as np
+
+# Agregar src al path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from services.embeddings import EmbeddingManager
+from services.query_cache import QueryCache
+from services.vectorizer import HashingVectorizer
+
+def make_corpus(n: int, words: int, vocabulary: int, seed: int):
+    """Generar artículos con palabras sintéticas de frecuencia tipo Zipf"""
+    rng = np.random.default_rng(seed)
+    lexicon = [f"termino{i}" for i in range(vocabulary)]
+    articles = []
+    for i in range(n):
+        ids = np.minimum(rng.zipf(1.2, size=words), vocabulary) - 1
+        articles.append({
+            "id": f"articulo-{i}",
+            "title": f"Artículo {i} {lexicon[ids[0]]}",
+            "content": " ".join(lexicon[j] for j in ids),
+            "status": "published"
+        })
+    return articles, lexicon
+
+def build_manager(articles, shards: int, vectors: bool) -> EmbeddingManager:
+    """Crear un índice (sin caché de consultas) e indexar el corpus por lotes"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        manager = EmbeddingManager(
+            model=HashingVectorizer() if vectors else None,
+            query_cache=QueryCache(max_entries=0),
+            shards=shards
+        )
+        for start in range(0, len(articles), 1000):
+            manager.add_articles_bulk(articles[start:start + 1000])
+    return manager
+
+def measure(manager: EmbeddingManager, queries, k: int, mode: str):
+    """Ejecutar las consultas y devolver (latencias en ms, consultas por segundo, IDs del top-k)"""
+    latencies = []
+    rankings = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        manager.search_similar_articles(queries[0], k, mode=mode)
+        start_all = time.perf_counter()
+        for query in queries:
+            start = time.perf_counter()
+            results = manager.search_similar_articles(query, k, mode=mode)
+            latencies.append((time.perf_counter() - start) * 1000)
+            rankings.append([result["id"] for result in results])
+        elapsed = time.perf_counter() - start_all
+    return np.array(latencies), len(queries) / elapsed, rankings
+
+def overlap(rankings, reference) -> float:
+    """Fracción media del top-k de referencia presente en cada top-k"""
+    fractions = [
+        len(set(ranking) & set(expected)) / len(expected)
+        for ranking, expected in zip(rankings, reference) if expected
+    ]
+    return float(np.mean(fractions)) if fractions else 1.0
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de búsqueda con shards")
+    parser.add_argument("--articles", type=int, default=20_000, help="Número de artículos")
+    parser.add_argument("--words", type=int, default=300, help="Palabras por artículo")
+    parser.add_argument("--vocabulary", type=int, default=20_000, help="Tamaño del vocabulario")
+    parser.add_argument("--queries", type=int, default=200, help="Número de consultas")
+    parser.add_argument("--k", type=int, default=10, help="Resultados por consulta")
+    parser.add_argument("--shards", type=int, nargs="+",
+                        default=sorted({1, 2, 4, os.cpu_count() or 1}), help="Números de shards a medir")
+    parser.add_argument("--mode", choices=["lexical", "vector", "hybrid"], default="lexical")
+    args = parser.parse_args()
+
+    print(f"🔄 Generando {args.articles} artículos de {args.words} palabras...")
+    articles, lexicon = make_corpus(args.articles, args.words, args.vocabulary, seed=0)
+    rng = np.random.default_rng(1)
+    # Consultas de 3 términos frecuentes: recorren postings largos (el caso costoso)
+    queries = [
+        " ".join(lexicon[j] for j in rng.integers(0, 200, size=3))
+        for _ in range(args.queries)
+    ]
+
+    print(f"\n{'shards':<8}{'p50 ms':>10}{'p99 ms':>10}{'consultas/s':>14}{'aceleración':>14}{'coincidencia':>14}")
+    baseline = None
+    reference = None
+    for shards in args.shards:
+        manager = build_manager(articles, shards, vectors=args.mode != "lexical")
+        latencies, qps, rankings = measure(manager, queries, args.k, args.mode)
+        baseline = baseline or qps
+        reference = reference or rankings
+        print(f"{shards:<8}{np.percentile(latencies, 50):>10.2f}{np.percentile(latencies, 99):>10.2f}"
+              f"{qps:>14.1f}{qps / baseline:>13.2f}x{overlap(rankings, reference):>14.2f}")
+        if manager.shard_pool is not None:
+            manager.shard_pool.close()
+
+if __name__ == "__main__":
+    main()
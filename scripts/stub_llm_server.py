@@ -0,0 +1,136 @@
+"""
+Servidor LLM local de pruebas (sin conexión) con latencia configurable
+
+Simula un proveedor de LLM para pruebas de carga del chat: cada llamada
+espera un tiempo hasta el primer token y después emite la respuesta a un
+ritmo fijo de tokens por segundo. Opcionalmente rechaza con 429 las
+peticiones por encima de un límite por minuto, como la cuota del proveedor.
+
+Protocolo (lo usa services/stub_llm.py):
+    POST /v1/generate  {"prompt": "...", "stream": false}
+        -> {"text": "...", "usage": {"prompt_tokens": n, "output_tokens": m}}
+    POST /v1/generate  {"prompt": "...", "stream": true}
+        -> una línea JSON por fragmento {"text": "..."} y al final {"done": true, "usage": {...}}
+    GET /health
+
+Uso:
+    python scripts/stub_llm_server.py --port 8090 --first-token-ms 400 --tokens-per-second 50
+    LLM_STUB_URL=http://127.0.0.1:8090 uvicorn main:app
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+class RateLimiter:
+    """Ventana deslizante de un minuto (simula la cuota del proveedor)"""
+
+    def __init__(self, per_minute: int):
+        self.per_minute = per_minute
+        self._calls = deque()
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        if self.per_minute <= 0:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            while self._calls and self._calls[0] < now - 60:
+                self._calls.popleft()
+            if len(self._calls) >= self.per_minute:
+                return False
+            self._calls.append(now)
+            return True
+
+def build_handler(args, limiter: RateLimiter):
+    class StubLLMHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *log_args):
+            if args.verbose:
+                super().log_message(format, *log_args)
+
+        def _send_json(self, status: int, data: dict):
+            body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._send_json(200, {"status": "ok"})
+            else:
+                self._send_json(404, {"error": "not found"})
+
+        def do_POST(self):
+            if self.path != "/v1/generate":
+                self._send_json(404, {"error": "not found"})
+                return
+
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            if not limiter.allow():
+                self._send_json(429, {"error": "cuota por minuto superada"})
+                return
+            if random.random() < args.error_rate:
+                self._send_json(500, {"error": "error simulado"})
+                return
+
+            prompt = request.get("prompt", "")
+            question = prompt.strip().splitlines()[-1] if prompt.strip() else ""
+            words = [f"Respuesta simulada a «{question}»:"] + ["contenido"] * (args.output_tokens - 1)
+            usage = {"prompt_tokens": estimate_tokens(prompt), "output_tokens": args.output_tokens}
+
+            # Tiempo hasta el primer token (con variación) y después ritmo constante
+            time.sleep(max(0.0, random.gauss(args.first_token_ms, args.jitter_ms)) / 1000)
+            token_delay = 1.0 / args.tokens_per_second
+
+            if not request.get("stream"):
+                time.sleep(token_delay * len(words))
+                self._send_json(200, {"text": " ".join(words), "usage": usage})
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.end_headers()
+            for start in range(0, len(words), args.chunk_tokens):
+                chunk = words[start:start + args.chunk_tokens]
+                time.sleep(token_delay * len(chunk))
+                text = (" " if start else "") + " ".join(chunk)
+                self.wfile.write((json.dumps({"text": text}, ensure_ascii=False) + "\n").encode("utf-8"))
+                self.wfile.flush()
+            self.wfile.write((json.dumps({"done": True, "usage": usage}) + "\n").encode("utf-8"))
+
+    return StubLLMHandler
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor LLM local de pruebas")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--first-token-ms", type=float, default=400.0, help="Latencia hasta el primer token")
+    parser.add_argument("--jitter-ms", type=float, default=100.0, help="Desviación de esa latencia")
+    parser.add_argument("--tokens-per-second", type=float, default=50.0, help="Ritmo de generación")
+    parser.add_argument("--output-tokens", type=int, default=120, help="Tokens de cada respuesta")
+    parser.add_argument("--chunk-tokens", type=int, default=8, help="Tokens por fragmento en streaming")
+    parser.add_argument("--rpm", type=int, default=0, help="Peticiones por minuto antes de responder 429 (0 = sin límite)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fracción de respuestas 500 simuladas")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), build_handler(args, RateLimiter(args.rpm)))
+    print(f"🧪 LLM local en http://{args.host}:{args.port} "
+          f"(primer token {args.first_token_ms:.0f} ms, {args.tokens_per_second:.0f} tokens/s)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
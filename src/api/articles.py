@@ -3,15 +3,19 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from typing import List, Optional
 from datetime import datetime
 from services.embeddings import embedding_manager
+from services.gemini_service import gemini_service
 from models.models import ArticleCreate, ArticleUpdate, ArticleResponse, ArticleListResponse
-from utils.firestore_utils import FirestoreManager
+from utils.firestore_utils import AsyncFirestoreManager
 from core.auth import verify_token, require_role
 
 # Router para artículos
 router = APIRouter(prefix="/articles", tags=["articles"])
 
+# Campos que afectan al índice de búsqueda (texto y filtros de metadatos)
+INDEXED_FIELDS = {"title", "content", "category", "tags", "visibility", "status"}
+
 @router.post("/", response_model=dict)
-def create_article(
+async def create_article(
     article: ArticleCreate,
     user=Depends(require_role("admin"))
 ):
@@ -26,13 +30,18 @@ def create_article(
         article_data["author"] = user["uid"]
         
         # Crear artículo
-        article_id = FirestoreManager.create_article(article_data)
+        article_id = await AsyncFirestoreManager.create_article(article_data)
         
-        # Agregar al sistema de embeddings
-        embedding_manager.add_article_embedding(
-            article_id, 
+        # Agregar al sistema de embeddings (indexar es trabajo de CPU)
+        await embedding_manager.offload(
+            embedding_manager.add_article_embedding,
+            article_id,
             article.title, 
-            article.content
+            article.content,
+            category=article.category,
+            tags=article.tags,
+            visibility=article.visibility,
+            version=1
         )
         
         return {
@@ -46,7 +55,7 @@ def create_article(
 
 
 @router.get("/", response_model=ArticleListResponse)
-def list_articles(
+async def list_articles(
     category: Optional[str] = Query(None, description="Filtrar por categoría"),
     limit: int = Query(10, ge=1, le=100, description="Número máximo de artículos"),
     page: int = Query(1, ge=1, description="Página actual"),
@@ -59,7 +68,7 @@ def list_articles(
     """
     try:
         # Obtener artículos
-        articles = FirestoreManager.list_articles(category, limit, page)
+        articles = await AsyncFirestoreManager.list_articles(category, limit, page)
         
         return ArticleListResponse(
             articles=articles,
@@ -72,7 +81,7 @@ def list_articles(
         raise HTTPException(status_code=500, detail=f"Error listando artículos: {str(e)}")
 
 @router.get("/{article_id}", response_model=ArticleResponse)
-def get_article(
+async def get_article(
     article_id: str,
     user=Depends(verify_token)
 ):
@@ -82,7 +91,7 @@ def get_article(
     Todos los usuarios autenticados pueden ver artículos
     """
     try:
-        article = FirestoreManager.get_article(article_id)
+        article = await AsyncFirestoreManager.get_article(article_id)
         
         if not article:
             raise HTTPException(status_code=404, detail="Artículo no encontrado")
@@ -95,7 +104,7 @@ def get_article(
         raise HTTPException(status_code=500, detail=f"Error obteniendo artículo: {str(e)}")
 
 @router.put("/{article_id}", response_model=dict)
-def update_article(
+async def update_article(
     article_id: str,
     article_update: ArticleUpdate,
     user=Depends(require_role("admin"))
@@ -108,7 +117,7 @@ def update_article(
     """
     try:
         # Verificar que el artículo existe
-        existing_article = FirestoreManager.get_article(article_id)
+        existing_article = await AsyncFirestoreManager.get_article(article_id)
         if not existing_article:
             raise HTTPException(status_code=404, detail="Artículo no encontrado")
         
@@ -119,17 +128,27 @@ def update_article(
             raise HTTPException(status_code=400, detail="No hay datos para actualizar")
         
         # Actualizar artículo
-        new_version = FirestoreManager.update_article(article_id, update_data)
+        new_version = await AsyncFirestoreManager.update_article(article_id, update_data)
         
         # Actualizar en sistema de embeddings
-        if "title" in update_data or "content" in update_data:
+        if INDEXED_FIELDS & update_data.keys():
             # Obtener datos actualizados
-            updated_article = FirestoreManager.get_article(article_id)
-            embedding_manager.add_article_embedding(
+            updated_article = await AsyncFirestoreManager.get_article(article_id)
+            await embedding_manager.offload(
+                embedding_manager.add_article_embedding,
                 article_id,
                 updated_article["title"],
-                updated_article["content"]
+                updated_article["content"],
+                status=updated_article.get("status", "published"),
+                category=updated_article.get("category"),
+                tags=updated_article.get("tags"),
+                visibility=updated_article.get("visibility"),
+                version=updated_article.get("version")
             )
+            
+            # Las respuestas que citaban la versión anterior ya no son válidas
+            if gemini_service.answer_cache is not None:
+                await gemini_service.answer_cache.invalidate_article_async(article_id)
         
         return {
             "message": "Artículo actualizado exitosamente",
@@ -144,7 +163,7 @@ def update_article(
         raise HTTPException(status_code=500, detail=f"Error actualizando artículo: {str(e)}")
 
 @router.delete("/{article_id}", response_model=dict)
-def delete_article(
+async def delete_article(
     article_id: str,
     user=Depends(require_role("admin"))
 ):
@@ -156,12 +175,17 @@ def delete_article(
     """
     try:
         # Verificar que el artículo existe
-        existing_article = FirestoreManager.get_article(article_id)
+        existing_article = await AsyncFirestoreManager.get_article(article_id)
         if not existing_article:
             raise HTTPException(status_code=404, detail="Artículo no encontrado")
         
         # Eliminar artículo (soft delete)
-        FirestoreManager.delete_article(article_id)
+        await AsyncFirestoreManager.delete_article(article_id)
+        
+        # Retirar del sistema de embeddings
+        await embedding_manager.offload(embedding_manager.remove_article, article_id)
+        if gemini_service.answer_cache is not None:
+            await gemini_service.answer_cache.invalidate_article_async(article_id)
         
         return {
             "message": "Artículo eliminado exitosamente",
@@ -175,7 +199,7 @@ def delete_article(
         raise HTTPException(status_code=500, detail=f"Error eliminando artículo: {str(e)}")
 
 @router.get("/{article_id}/versions", response_model=dict)
-def get_article_versions(
+async def get_article_versions(
     article_id: str,
     user=Depends(verify_token)
 ):
@@ -186,12 +210,12 @@ def get_article_versions(
     """
     try:
         # Verificar que el artículo existe
-        existing_article = FirestoreManager.get_article(article_id)
+        existing_article = await AsyncFirestoreManager.get_article(article_id)
         if not existing_article:
             raise HTTPException(status_code=404, detail="Artículo no encontrado")
         
         # Obtener versiones
-        versions = FirestoreManager.get_article_versions(article_id)
+        versions = await AsyncFirestoreManager.get_article_versions(article_id)
         
         return {
             "article_id": article_id,
@@ -1,23 +1,85 @@
+import asyncio
+import json
 from fastapi import APIRouter, Depends, HTTPException
-from pydantic import BaseModel
-from typing import List, Dict, Optional
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from typing import List, Dict, Literal, Optional, Tuple, Union
 from core.auth import verify_token
 from services.embeddings import embedding_manager
+from services.context_packer import PackedContext, context_packer
 from services.gemini_service import gemini_service
+from services.llm_scheduler import LLMQueueFullError
+from services.reindex import reindex_manager
+from services.index_sharing import index_sharing
+from services.single_flight import chat_single_flight
 
 # Router para chat
 router = APIRouter(prefix="/chat", tags=["chat"])
 
+# Preguntas máximas por solicitud de chat en lote
+MAX_BATCH_QUESTIONS = 50
+
+# Respuesta cuando ningún artículo es suficientemente relevante
+NO_ARTICLES_ANSWER = "Este tema no está disponible en la biblioteca virtual. Por favor, verifica que el artículo correspondiente esté cargado o reformula tu pregunta."
+
 class ChatRequest(BaseModel):
     """Modelo para solicitud de chat"""
     message: str
     max_results: int = 3
+    # auto = híbrida (BM25 + vectores) si hay embeddings, BM25 si no
+    search_mode: Literal["auto", "hybrid", "vector", "lexical"] = "auto"
+    lexical_weight: float = Field(1.0, ge=0)
+    vector_weight: float = Field(1.0, ge=0)
+    # Filtros opcionales: solo se buscan artículos de esa categoría / con alguna de esas etiquetas
+    category: Optional[str] = None
+    tags: Optional[List[str]] = None
     
     class Config:
         schema_extra = {
             "example": {
                 "message": "¿Qué son las redes de computadoras?",
-                "max_results": 3
+                "max_results": 3,
+                "search_mode": "hybrid",
+                "lexical_weight": 1.0,
+                "vector_weight": 1.0,
+                "category": "redes",
+                "tags": ["tcp-ip"]
+            }
+        }
+
+class BatchChatRequest(BaseModel):
+    """Modelo para solicitud de chat en lote (mismas opciones para todas las preguntas)"""
+    questions: List[str] = Field(..., min_length=1, max_length=MAX_BATCH_QUESTIONS)
+    max_results: int = 3
+    search_mode: Literal["auto", "hybrid", "vector", "lexical"] = "auto"
+    lexical_weight: float = Field(1.0, ge=0)
+    vector_weight: float = Field(1.0, ge=0)
+    category: Optional[str] = None
+    tags: Optional[List[str]] = None
+    
+    class Config:
+        schema_extra = {
+            "example": {
+                "questions": [
+                    "¿Qué son las redes de computadoras?",
+                    "¿Qué es TCP/IP?"
+                ],
+                "max_results": 3,
+                "search_mode": "hybrid",
+                "category": "redes"
+            }
+        }
+
+class ReindexRequest(BaseModel):
+    """Modelo para solicitud de reindexación"""
+    batch_size: int = Field(200, ge=10, le=1000)
+    max_docs_per_second: Optional[float] = Field(None, gt=0)
+    
+    class Config:
+        schema_extra = {
+            "example": {
+                "batch_size": 200,
+                "max_docs_per_second": 500
             }
         }
 
@@ -28,6 +90,7 @@ class ChatResponse(BaseModel):
     confidence: float
     query: str
     model: str = "gemini-pro"  # Indicar que usamos Gemini
+    context_tokens: int = 0  # Tokens (aproximados) del contexto enviado al modelo
     
     class Config:
         schema_extra = {
@@ -42,12 +105,19 @@ class ChatResponse(BaseModel):
                 ],
                 "confidence": 0.95,
                 "query": "¿Qué son las redes de computadoras?",
-                "model": "gemini-pro"
+                "model": "gemini-pro",
+                "context_tokens": 412
             }
         }
 
+class BatchChatResponse(BaseModel):
+    """Modelo para respuesta de chat en lote"""
+    results: List[ChatResponse]
+    total_questions: int
+    unique_questions: int
+
 @router.post("/", response_model=ChatResponse)
-def chat_with_ai(
+async def chat_with_ai(
     request: ChatRequest,
     user=Depends(verify_token)
 ):
@@ -59,60 +129,263 @@ def chat_with_ai(
     try:
         print(f" Usuario {user['email']} pregunta: {request.message}")
         
-        # 1. Buscar artículos relevantes
-        similar_articles = embedding_manager.search_similar_articles(
-            request.message, 
-            request.max_results
+        # Preguntas idénticas en curso comparten una sola búsqueda y generación
+        response = await chat_single_flight.do(
+            ("chat", _request_key(request)),
+            lambda: _search_and_answer(request)
         )
+        return response.model_copy(update={"query": request.message})
+        
+    except LLMQueueFullError as e:
+        print(f"⚠️  Chat rechazado: {str(e)}")
+        raise HTTPException(status_code=503, detail=f"Servicio saturado, inténtalo de nuevo: {str(e)}")
+    except Exception as e:
+        print(f"❌ Error en chat: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error en el chat: {str(e)}")
+
+@router.post("/batch", response_model=BatchChatResponse)
+async def chat_batch(
+    request: BatchChatRequest,
+    user=Depends(verify_token)
+):
+    """
+    Chat con IA para un lote de preguntas (por ejemplo, un cuestionario del LMS)
+    
+    Todas las preguntas se buscan juntas con search_many y las preguntas
+    repetidas se responden una sola vez. Las respuestas se devuelven en el
+    mismo orden que las preguntas.
+    """
+    try:
+        print(f" Usuario {user['email']} envía un lote de {len(request.questions)} preguntas")
         
-        # 2. Si no hay artículos relevantes o la similitud es muy baja
-        if not similar_articles or similar_articles[0]["similarity_score"] < 0.3:
-            return ChatResponse(
-                answer="Este tema no está disponible en la biblioteca virtual. Por favor, verifica que el artículo correspondiente esté cargado o reformula tu pregunta.",
-                sources=[],
-                confidence=0.0,
-                query=request.message,
-                model="gemini-pro"
-            )
+        # 1. Buscar artículos relevantes para todas las preguntas a la vez
+        batch_articles = await embedding_manager.offload(
+            embedding_manager.search_many,
+            request.questions,
+            request.max_results,
+            mode=request.search_mode,
+            lexical_weight=request.lexical_weight,
+            vector_weight=request.vector_weight,
+            filters=_build_filters(request)
+        )
         
-        # 3. Preparar contexto para la respuesta
-        context = _build_context(similar_articles)
-        sources = _build_sources(similar_articles)
+        # 2. Una respuesta por pregunta distinta (misma normalización que la
+        # búsqueda), generadas de forma concurrente
+        keys = [" ".join(embedding_manager.analyzer.normalize(question)) for question in request.questions]
+        unique: Dict[str, int] = {}
+        for position, key in enumerate(keys):
+            unique.setdefault(key, position)
+        generated = await asyncio.gather(*(
+            _answer(request.questions[position], batch_articles[position], priority="batch")
+            for position in unique.values()
+        ))
+        answers: Dict[str, ChatResponse] = dict(zip(unique, generated))
+        results = [
+            answers[key].model_copy(update={"query": question})
+            for question, key in zip(request.questions, keys)
+        ]
         
-        # 4. Generar respuesta usando Gemini
-        answer = gemini_service.generate_answer(request.message, context)
+        return BatchChatResponse(
+            results=results,
+            total_questions=len(request.questions),
+            unique_questions=len(answers)
+        )
         
-        # 5. Calcular confianza basada en similitud
-        confidence = similar_articles[0]["similarity_score"]
+    except LLMQueueFullError as e:
+        print(f"⚠️  Chat en lote rechazado: {str(e)}")
+        raise HTTPException(status_code=503, detail=f"Servicio saturado, inténtalo de nuevo: {str(e)}")
+    except Exception as e:
+        print(f"❌ Error en chat en lote: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error en el chat en lote: {str(e)}")
+
+@router.post("/stream")
+async def chat_stream(
+    request: ChatRequest,
+    user=Depends(verify_token)
+):
+    """
+    Chat con IA con la respuesta en streaming (Server-Sent Events)
+    
+    Eventos, en orden:
+    - sources: fuentes y confianza, en cuanto termina la búsqueda
+    - chunk: fragmentos de la respuesta a medida que Gemini los genera
+    - done: fin de la respuesta (o error si la generación falla a mitad)
+    """
+    try:
+        print(f" Usuario {user['email']} pregunta (streaming): {request.message}")
         
-        return ChatResponse(
-            answer=answer,
-            sources=sources,
-            confidence=confidence,
-            query=request.message,
-            model="gemini-pro"
+        # La búsqueda se comparte entre preguntas idénticas en curso; la
+        # respuesta se emite por separado a cada cliente
+        similar_articles = await chat_single_flight.do(
+            ("search", _request_key(request)),
+            lambda: _search(request)
         )
         
     except Exception as e:
         print(f"❌ Error en chat: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error en el chat: {str(e)}")
+    
+    return StreamingResponse(
+        _stream_answer(request.message, similar_articles),
+        media_type="text/event-stream",
+        # Sin caché ni buffering en proxies: cada evento se envía al producirse
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def _request_key(request: ChatRequest):
+    """Clave de una pregunta: texto normalizado, parámetros de búsqueda y filtros"""
+    return embedding_manager.request_key(
+        request.message,
+        request.max_results,
+        mode=request.search_mode,
+        lexical_weight=request.lexical_weight,
+        vector_weight=request.vector_weight,
+        filters=_build_filters(request)
+    )
+
+async def _search(request: ChatRequest) -> List[Dict]:
+    """Buscar los artículos relevantes de una pregunta (puntuación fuera del event loop)"""
+    return await embedding_manager.offload(
+        embedding_manager.search_similar_articles,
+        request.message,
+        request.max_results,
+        mode=request.search_mode,
+        lexical_weight=request.lexical_weight,
+        vector_weight=request.vector_weight,
+        filters=_build_filters(request)
+    )
 
-def _build_context(articles: List[Dict]) -> str:
+async def _search_and_answer(request: ChatRequest) -> ChatResponse:
+    """Buscar artículos relevantes y responder con ellos"""
+    similar_articles = await _search(request)
+    return await _answer(request.message, similar_articles)
+
+def _sse(event: str, data: Dict) -> str:
+    """Formatear un evento Server-Sent Events con datos JSON"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+async def _stream_answer(message: str, similar_articles: List[Dict]):
     """
-    Construir contexto para la respuesta basado en artículos encontrados
+    Generar los eventos SSE de una respuesta: fuentes, fragmentos y fin
     
     Args:
-        articles: Lista de artículos similares
+        message: Pregunta del usuario
+        similar_articles: Artículos encontrados (de mayor a menor similitud)
+        
+    Yields:
+        str: Eventos SSE
+    """
+    if not _is_relevant(similar_articles):
+        yield _sse("sources", {"query": message, "sources": [], "confidence": 0.0})
+        yield _sse("chunk", {"text": NO_ARTICLES_ANSWER})
+        yield _sse("done", {"model": "gemini-pro"})
+        return
+    
+    confidence = similar_articles[0]["similarity_score"]
+    context = _build_context(similar_articles)
+    yield _sse("sources", {
+        "query": message,
+        "sources": _build_sources(similar_articles),
+        "confidence": confidence,
+        "context_tokens": context.tokens_used
+    })
+    
+    try:
+        async for chunk in gemini_service.generate_answer_stream(
+                message, context.text, _answer_sources(similar_articles)):
+            yield _sse("chunk", {"text": chunk})
+    except Exception as e:
+        # Las fuentes ya se enviaron: el error se notifica como evento
+        print(f"❌ Error generando respuesta en streaming: {str(e)}")
+        yield _sse("error", {"detail": f"Error en el chat: {str(e)}"})
+        return
+    
+    yield _sse("done", {"model": "gemini-pro"})
+
+def _is_relevant(similar_articles: List[Dict]) -> bool:
+    """True si el mejor artículo supera el umbral de similitud"""
+    return bool(similar_articles) and similar_articles[0]["similarity_score"] >= embedding_manager.relevance_threshold
+
+async def _answer(message: str, similar_articles: List[Dict], priority: str = "interactive") -> ChatResponse:
+    """
+    Generar la respuesta del chat a partir de los artículos encontrados
+    
+    Args:
+        message: Pregunta del usuario
+        similar_articles: Artículos relevantes (de mayor a menor similitud)
+        priority: Carril de las llamadas al modelo ("interactive" o "batch")
+        
+    Returns:
+        ChatResponse: Respuesta con fuentes y confianza
+    """
+    # Si no hay artículos relevantes o la similitud es muy baja
+    if not _is_relevant(similar_articles):
+        return ChatResponse(
+            answer=NO_ARTICLES_ANSWER,
+            sources=[],
+            confidence=0.0,
+            query=message,
+            model="gemini-pro"
+        )
+    
+    # Preparar contexto para la respuesta
+    context = _build_context(similar_articles)
+    sources = _build_sources(similar_articles)
+    
+    # Generar respuesta usando Gemini
+    answer = await gemini_service.generate_answer(
+        message, context.text, _answer_sources(similar_articles), priority=priority
+    )
+    
+    # Calcular confianza basada en similitud
+    confidence = similar_articles[0]["similarity_score"]
+    
+    return ChatResponse(
+        answer=answer,
+        sources=sources,
+        confidence=confidence,
+        query=message,
+        model="gemini-pro",
+        context_tokens=context.tokens_used
+    )
+
+def _answer_sources(articles: List[Dict]) -> List[Tuple[str, Optional[int]]]:
+    """(ID, versión) de los artículos del contexto, para la caché de respuestas"""
+    return [(article["id"], article["version"]) for article in articles]
+
+def _build_filters(request: Union[ChatRequest, BatchChatRequest]) -> Dict[str, List[str]]:
+    """
+    Construir los filtros de metadatos de la búsqueda
+    
+    Args:
+        request: Solicitud de chat (individual o en lote)
         
     Returns:
-        str: Contexto formateado
+        Dict[str, List[str]]: Campo -> valores aceptados
     """
-    context = "Información disponible en la biblioteca virtual:\n\n"
+    filters = {}
+    if request.category:
+        filters["category"] = [request.category]
+    if request.tags:
+        filters["tags"] = request.tags
+    return filters
+
+def _build_context(articles: List[Dict]) -> PackedContext:
+    """
+    Construir contexto para la respuesta basado en artículos encontrados
     
-    for i, article in enumerate(articles, 1):
-        context += f"Artículo {i}: {article['title']}\n"
-        context += f"Contenido: {article['content'][:300]}...\n\n"
+    Llena el presupuesto de tokens con los pasajes más relevantes, sin
+    repetir texto solapado (ver ContextPacker).
     
+    Args:
+        articles: Lista de artículos similares
+        
+    Returns:
+        PackedContext: Contexto formateado y tokens usados
+    """
+    context = context_packer.pack(articles)
+    print(f"🔍 Contexto: {context.tokens_used}/{context.token_budget} tokens, "
+          f"{context.passages} pasajes de {context.articles} artículos")
     return context
 
 def _build_sources(articles: List[Dict]) -> List[Dict]:
@@ -132,24 +405,33 @@ def _build_sources(articles: List[Dict]) -> List[Dict]:
             "title": article["title"],
             "id": article["id"],
             "similarity_score": article["similarity_score"],
-            "content_preview": article["content"][:150] + "..."
+            "content_preview": _preview(article)
         })
     
     return sources
 
+def _preview(article: Dict) -> str:
+    """Vista previa de la fuente: inicio de su mejor pasaje o del contenido"""
+    passages = article.get("passages")
+    text = passages[0]["text"] if passages else article["content"]
+    return text[:150] + "..."
+
 @router.get("/stats", response_model=Dict)
-def get_chat_stats(user=Depends(verify_token)):
+async def get_chat_stats(user=Depends(verify_token)):
     """
     Obtener estadísticas del sistema de chat
     
     Muestra información sobre el sistema de embeddings y Gemini
     """
     try:
-        stats = embedding_manager.get_index_stats()
+        stats = await embedding_manager.offload(embedding_manager.get_index_stats)
         gemini_status = gemini_service.test_connection()
         
         return {
             "embedding_stats": stats,
+            "query_cache": embedding_manager.query_cache.get_stats(),
+            "gemini": gemini_service.get_stats(),
+            "single_flight": chat_single_flight.get_stats(),
             "gemini_status": "connected" if gemini_status else "disconnected",
             "model": "gemini-pro",
             "message": "Estadísticas del sistema de chat"
@@ -159,18 +441,60 @@ def get_chat_stats(user=Depends(verify_token)):
         raise HTTPException(status_code=500, detail=f"Error obteniendo estadísticas: {str(e)}")
 
 @router.post("/reindex", response_model=Dict)
-def reindex_articles(user=Depends(verify_token)):
+async def reindex_articles(
+    request: Optional[ReindexRequest] = None,
+    user=Depends(verify_token)
+):
     """
     Reindexar todos los artículos
     
-    Útil cuando se agregan muchos artículos nuevos
+    Inicia una reconstrucción en segundo plano: lee Firestore por lotes,
+    construye un índice en sombra y lo intercambia de forma atómica.
+    Las búsquedas siguen usando el índice actual mientras tanto.
     """
     try:
+        request = request or ReindexRequest()
+        
+        if not index_sharing.is_builder:
+            # Con el índice compartido solo el proceso constructor reindexa
+            index_sharing.request_reindex({
+                "requested_by": user.get("email"),
+                "batch_size": request.batch_size,
+                "max_docs_per_second": request.max_docs_per_second
+            })
+            return {
+                "message": "Reindexación enviada al proceso constructor del índice",
+                "status": "queued",
+                "job_id": None,
+                "model": "gemini-pro"
+            }
+        
+        job = reindex_manager.start_job(
+            requested_by=user.get("email"),
+            batch_size=request.batch_size,
+            max_docs_per_second=request.max_docs_per_second
+        )
+        
         return {
             "message": "Reindexación iniciada",
             "status": "success",
+            "job_id": job.id,
+            "job": job.to_dict(),
             "model": "gemini-pro"
         }
         
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error en reindexación: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error en reindexación: {str(e)}")
+
+@router.get("/reindex/{job_id}", response_model=Dict)
+async def get_reindex_status(job_id: str, user=Depends(verify_token)):
+    """
+    Obtener el progreso de una reindexación
+    
+    Incluye fase, artículos procesados, documentos por segundo, ETA y errores
+    """
+    job = reindex_manager.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Trabajo de reindexación no encontrado")
+    
+    return job.to_dict()
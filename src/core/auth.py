@@ -2,6 +2,7 @@ import firebase_admin
 from firebase_admin import credentials, auth
 from fastapi import HTTPException, Depends, Header
 from typing import Optional
+import asyncio
 import os
 import json
 from .firebase_config import google_auth_manager
@@ -23,10 +24,14 @@ def initialize_firebase():
 
 # No auto-init; called from main.py
 
-def verify_token(authorization: Optional[str] = Header(None)):
+async def verify_token(authorization: Optional[str] = Header(None)):
     """
     Verificar el token de Google en cada request
     
+    La verificación del SDK de Firebase es bloqueante (firma RSA y, a veces,
+    descarga de certificados): se ejecuta en un hilo aparte para no detener
+    el event loop.
+    
     Args:
         authorization: Header con formato "Bearer <token>"
     
@@ -47,7 +52,7 @@ def verify_token(authorization: Optional[str] = Header(None)):
         token = authorization.split(" ")[1]
         
         # Verificar token con Google Auth Manager
-        user_info = google_auth_manager.verify_google_token(token)
+        user_info = await asyncio.to_thread(google_auth_manager.verify_google_token, token)
         
         print(f"✅ Usuario autenticado: {user_info['email']}")
         return user_info
@@ -103,8 +108,9 @@ def require_role(required_role: str):
         function: Decorador que verifica el rol del usuario
     """
 
-    def role_checker(user=Depends(verify_token)):
-        user_role = get_user_role(user['uid'])
+    async def role_checker(user=Depends(verify_token)):
+        # get_user consulta Firebase Auth por red: fuera del event loop
+        user_role = await asyncio.to_thread(get_user_role, user['uid'])
         
         # Los admins pueden acceder a todo
         if user_role != required_role and user_role != 'admin':
@@ -1,10 +1,15 @@
 import os
 from fastapi import FastAPI, Depends
+from fastapi.responses import JSONResponse
 import firebase_admin
 from core.auth import verify_token, require_role
 from api.articles import router as articles_router
 from api.chat import router as chat_router
 from core.firebase_config import initialize_firebase
+from services.embeddings import embedding_manager
+from services.index_warmup import index_warmup
+from services.index_sharing import index_sharing
+from services.reindex import reindex_manager
 
 # Inicializar Firebase Admin con manejo de errores
 try:
@@ -16,6 +21,15 @@ except Exception as e:
 
 PORT = int(os.environ.get("PORT", 8080))
 
+# Directorio de snapshots del índice de búsqueda (vacío = sin persistencia)
+INDEX_SNAPSHOT_DIR = os.environ.get("INDEX_SNAPSHOT_DIR", "")
+
+# Cargar los artículos de Firestore en el índice al arrancar
+INDEX_WARMUP_ENABLED = os.environ.get("INDEX_WARMUP_ENABLED", "true").lower() == "true"
+
+# Compartir un único índice entre varios workers (requiere INDEX_SNAPSHOT_DIR)
+INDEX_SHARING_ENABLED = os.environ.get("INDEX_SHARING_ENABLED", "false").lower() == "true"
+
 # Crear instancia de FastAPI
 app = FastAPI(
     title="Wiki Virtual API",
@@ -27,6 +41,57 @@ app = FastAPI(
 app.include_router(articles_router)
 app.include_router(chat_router)
 
+@app.on_event("startup")
+def warm_up_index():
+    """
+    Preparar el índice de búsqueda al arrancar
+
+    Con un snapshot disponible el índice está listo de inmediato; la carga
+    desde Firestore sigue en segundo plano para incorporar cambios recientes.
+
+    Con el índice compartido, solo el proceso constructor carga Firestore;
+    los lectores esperan a que publique la primera generación. El constructor
+    ya cargó el snapshot en index_sharing.start() y su hilo reaplica el
+    diario de cambios sobre él: cargarlo otra vez descartaría esas entradas.
+    """
+    if INDEX_SHARING_ENABLED and INDEX_SNAPSHOT_DIR:
+        # El constructor publica cada generación: la reindexación no escribe snapshots propios
+        reindex_manager.snapshot_dir = None
+        if index_sharing.start() == "reader":
+            index_sharing.on_attach = index_warmup.mark_ready
+            if embedding_manager.load_snapshot(INDEX_SNAPSHOT_DIR):
+                index_warmup.mark_ready()
+            return
+        index_sharing.on_reindex_request = lambda params: reindex_manager.start_job(**params)
+        if index_sharing.snapshot_loaded:
+            index_warmup.mark_ready()
+    elif INDEX_SNAPSHOT_DIR and embedding_manager.load_snapshot(INDEX_SNAPSHOT_DIR):
+        index_warmup.mark_ready()
+
+    if INDEX_WARMUP_ENABLED:
+        index_warmup.start()
+    else:
+        index_warmup.mark_ready()
+
+@app.on_event("shutdown")
+def save_index_snapshot():
+    """Guardar el índice al apagar la instancia (los lectores no escriben snapshots)"""
+    if INDEX_SNAPSHOT_DIR and index_sharing.is_builder:
+        try:
+            if INDEX_SHARING_ENABLED:
+                # Publica lo pendiente y recorta el diario de cambios
+                index_sharing.flush()
+            else:
+                embedding_manager.save_snapshot(INDEX_SNAPSHOT_DIR)
+        except Exception as e:
+            print(f"❌ Error guardando snapshot del índice: {str(e)}")
+
+@app.on_event("shutdown")
+def stop_search_shards():
+    """Detener los procesos shard de búsqueda (SEARCH_SHARDS > 1)"""
+    if embedding_manager.shard_pool is not None:
+        embedding_manager.shard_pool.close()
+
 # Endpoint raiz
 @app.get("/")
 def root():
@@ -54,9 +119,22 @@ def health_check():
         "message": "API funcionando correctamente",
         "port": PORT,
         "environment": os.environ.get("ENVIRONMENT", "development"),
-        "firebase": firebase_status
+        "firebase": firebase_status,
+        "index": index_warmup.get_status(),
+        "index_sharing": index_sharing.get_status() if INDEX_SHARING_ENABLED else None
     }
 
+# Endpoint de disponibilidad (el balanceador solo enruta cuando el índice está listo)
+@app.get("/ready")
+def readiness_check():
+    index_status = index_warmup.get_status()
+    if not index_status["ready"]:
+        return JSONResponse(
+            status_code=503,
+            content={"status": "warming_up", "index": index_status}
+        )
+    return {"status": "ready", "index": index_status}
+
 # Endpoint de información del proyecto
 @app.get("/info")
 def project_info():
@@ -0,0 +1,111 @@
+import unicodedata
+from functools import lru_cache
+from typing import FrozenSet, List
+from .search_index import tokenize
+
+# Palabras vacías del español (sin tildes, como quedan tras el plegado)
+SPANISH_STOPWORDS: FrozenSet[str] = frozenset("""
+a al algo algunas algunos ante antes como con contra cual cuales cuando cuanto de del desde
+donde durante e el ella ellas ellos en entre era eran eres es esa esas ese eso esos esta estaba
+estaban estamos estan estar este esto estos fue fueron ha habia han has hasta hay la las le les
+lo los mas me mi mis mucho muchos muy nada ni no nos nosotros o os otra otras otro otros para
+pero poco por porque que quien quienes se sea sean ser si sido sin sobre son su sus tambien
+tanto te tiene tienen toda todas todo todos tu tus un una unas uno unos usted ustedes y ya yo
+""".split())
+
+def fold_accents(text: str) -> str:
+    """
+    Normalizar Unicode (NFKD) y quitar tildes y diéresis, conservando la ñ
+
+    Args:
+        text: Texto a normalizar
+
+    Returns:
+        str: Texto en minúsculas sin marcas diacríticas
+    """
+    # La ñ se protege: en español es una letra distinta, no una n acentuada
+    text = text.lower().replace("ñ", "\0")
+    decomposed = unicodedata.normalize("NFKD", text)
+    folded = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return folded.replace("\0", "ñ")
+
+@lru_cache(maxsize=100_000)
+def light_stem(token: str) -> str:
+    """
+    Stemmer ligero del español (Savoy): quita plurales y vocal de género
+
+    "redes" -> "red", "computadoras" -> "computador", "luces" -> "luz".
+    Las palabras de menos de 5 letras no se modifican.
+
+    Args:
+        token: Token ya plegado (minúsculas, sin tildes)
+
+    Returns:
+        str: Raíz del token
+    """
+    if len(token) < 5:
+        return token
+
+    if token[-1] in "aoe":
+        return token[:-1]
+
+    if token[-1] == "s":
+        if token.endswith("eses"):
+            return token[:-2]
+        if token.endswith("ces"):
+            return token[:-3] + "z"
+        if token[-2] in "aoe":
+            return token[:-2]
+
+    return token
+
+class SpanishAnalyzer:
+    """
+    Analizador de texto para el corpus en español
+
+    Cadena: normalización Unicode y plegado de tildes, tokenización,
+    eliminación de palabras vacías y stemming ligero. Se aplica igual a los
+    documentos (una vez, al indexar) y a las consultas, de modo que
+    "programación" coincide con "programacion" y "redes" con "red".
+    """
+
+    def __init__(self, stopwords: FrozenSet[str] = SPANISH_STOPWORDS, stem: bool = True):
+        """
+        Inicializar analizador
+
+        Args:
+            stopwords: Palabras vacías a descartar (ya plegadas)
+            stem: Aplicar el stemmer ligero
+        """
+        self.stopwords = stopwords
+        self.stem = stem
+
+    def normalize(self, text: str) -> List[str]:
+        """
+        Tokenizar un texto plegado, sin quitar palabras vacías ni aplicar stemming
+
+        Args:
+            text: Texto a tokenizar
+
+        Returns:
+            List[str]: Tokens en minúsculas y sin tildes
+        """
+        return tokenize(fold_accents(text))
+
+    def analyze(self, text: str) -> List[str]:
+        """
+        Convertir un texto en la secuencia de términos que se indexan
+
+        Args:
+            text: Texto a analizar
+
+        Returns:
+            List[str]: Términos (sin palabras vacías y con stemming)
+        """
+        terms = [token for token in self.normalize(text) if token not in self.stopwords]
+        if self.stem:
+            terms = [light_stem(token) for token in terms]
+        return terms
+
+# Instancia global del analizador
+spanish_analyzer = SpanishAnalyzer()
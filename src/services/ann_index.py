@@ -0,0 +1,779 @@
+import math
+import os
+from abc import ABC, abstractmethod
+import numpy as np
+from typing import Dict, List, Optional, Set, Tuple
+from .vector_store import VectorMatrix, normalize_rows, top_k
+
+# Candidatos por resultado que reordenan por defecto los índices comprimidos
+DEFAULT_RERANK = 4
+
+class ExactVectorIndex:
+    """
+    Índice vectorial exacto: recorre todas las filas de la matriz
+
+    Es el comportamiento de referencia y el usado con corpus pequeños.
+    """
+
+    kind = "exact"
+
+    def __init__(self, vectors: VectorMatrix):
+        self.vectors = vectors
+
+    def add(self, row: int):
+        """La matriz ya contiene la fila; no hay estructura adicional"""
+
+    def remove(self, row: int):
+        """La matriz marca la fila como eliminada; no hay estructura adicional"""
+
+    def rebuild(self):
+        """No hay estructura que reconstruir"""
+
+    def compact(self, rows: np.ndarray):
+        """La matriz ya se compactó; no hay estructura adicional"""
+
+    def search(self, query: np.ndarray, k: int,
+               allowed: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        return self.vectors.search(query, k, allowed)
+
+    def search_batch(self, queries: np.ndarray, k: int,
+                     allowed: Optional[np.ndarray] = None) -> List[List[Tuple[int, float]]]:
+        return self.vectors.search_batch(queries, k, allowed)
+
+    def save(self, directory: str):
+        """No hay estado adicional que guardar"""
+
+    def load(self, directory: str):
+        """No hay estado adicional que cargar"""
+
+    def get_stats(self) -> Dict:
+        return {"kind": self.kind}
+
+class IVFFlatIndex:
+    """
+    Índice aproximado IVF-Flat (listas invertidas sobre centroides k-means)
+
+    Cada fila de la matriz se asigna al centroide más cercano. Una consulta
+    solo puntúa las filas de las `nprobe` listas más cercanas, por lo que el
+    coste pasa de O(N·d) a O((nlist + N·nprobe/nlist)·d). Los vectores no se
+    duplican: las listas guardan filas de la VectorMatrix compartida.
+
+    Parámetros de ajuste recall/latencia:
+    - nlist: número de listas (por defecto ~4·sqrt(N) al entrenar)
+    - nprobe: listas visitadas por consulta (más = mejor recall, más lento)
+
+    Mientras no haya suficientes vectores para entrenar se usa búsqueda exacta.
+    """
+
+    kind = "ivf"
+
+    def __init__(self, vectors: VectorMatrix, nlist: Optional[int] = None, nprobe: int = 8,
+                 min_train_size: int = 2048, retrain_growth: float = 4.0,
+                 kmeans_iterations: int = 10, seed: int = 0):
+        """
+        Inicializar índice IVF vacío (sin entrenar)
+
+        Args:
+            vectors: Matriz con los vectores indexados
+            nlist: Número de listas (None = automático según el tamaño)
+            nprobe: Número de listas visitadas por consulta
+            min_train_size: Filas mínimas para entrenar los centroides
+            retrain_growth: Factor de crecimiento del corpus que dispara un reentrenamiento
+            kmeans_iterations: Iteraciones de k-means al entrenar
+            seed: Semilla para el muestreo de k-means
+        """
+        self.vectors = vectors
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.min_train_size = min_train_size
+        self.retrain_growth = retrain_growth
+        self.kmeans_iterations = kmeans_iterations
+        self.seed = seed
+
+        self.centroids: Optional[np.ndarray] = None
+        self._lists: List[Set[int]] = []
+        self._assignments: Dict[int, int] = {}
+        self._trained_size = 0
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    def _nearest_centroids(self, vectors: np.ndarray) -> np.ndarray:
+        return np.argmax(vectors @ self.centroids.T, axis=1)
+
+    def train(self):
+        """Entrenar centroides (k-means esférico) y reasignar todas las filas"""
+        rows = self.vectors.live_rows()
+        if len(rows) == 0:
+            return
+
+        nlist = self.nlist or max(1, int(4 * math.sqrt(len(rows))))
+        nlist = min(nlist, len(rows))
+
+        rng = np.random.default_rng(self.seed)
+        sample_size = min(len(rows), max(nlist * 64, self.min_train_size))
+        sample_rows = np.sort(rng.choice(rows, size=sample_size, replace=False))
+        sample = self.vectors.matrix[sample_rows].astype(np.float32)
+
+        centroids = sample[rng.choice(sample_size, size=nlist, replace=False)]
+        for _ in range(self.kmeans_iterations):
+            assignment = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, sample)
+            counts = np.bincount(assignment, minlength=nlist)
+
+            # Reubicar centroides vacíos en puntos aleatorios de la muestra
+            empty = counts == 0
+            if empty.any():
+                sums[empty] = sample[rng.choice(sample_size, size=int(empty.sum()))]
+            centroids = normalize_rows(sums)
+
+        self.centroids = centroids
+        self._trained_size = len(rows)
+        self._assign_rows(rows)
+
+        print(f"✅ Índice IVF entrenado: {nlist} listas, {len(rows)} vectores")
+
+    def _assign_rows(self, rows: np.ndarray):
+        """Reconstruir las listas invertidas asignando las filas a su centroide"""
+        self._lists = [set() for _ in range(len(self.centroids))]
+        self._assignments = {}
+
+        batch = 8192
+        for start in range(0, len(rows), batch):
+            chunk = rows[start:start + batch]
+            nearest = self._nearest_centroids(self.vectors.matrix[chunk].astype(np.float32))
+            for row, list_id in zip(chunk.tolist(), nearest.tolist()):
+                self._lists[list_id].add(row)
+                self._assignments[row] = list_id
+
+    def add(self, row: int):
+        """
+        Insertar (o reasignar) una fila ya escrita en la matriz
+
+        Args:
+            row: Fila de la matriz
+        """
+        if not self.is_trained:
+            if len(self.vectors) >= self.min_train_size:
+                self.train()
+            return
+
+        if len(self._assignments) >= self.retrain_growth * self._trained_size:
+            self.train()
+            return
+
+        self.remove(row)
+        vector = self.vectors.matrix[row:row + 1].astype(np.float32)
+        list_id = int(self._nearest_centroids(vector)[0])
+        self._lists[list_id].add(row)
+        self._assignments[row] = list_id
+
+    def remove(self, row: int):
+        """
+        Quitar una fila de su lista invertida
+
+        Args:
+            row: Fila de la matriz
+        """
+        list_id = self._assignments.pop(row, None)
+        if list_id is not None:
+            self._lists[list_id].discard(row)
+
+    def rebuild(self):
+        """Reasignar todas las filas (tras compactar o reemplazar la matriz)"""
+        if not self.is_trained:
+            if len(self.vectors) >= self.min_train_size:
+                self.train()
+            return
+        self._assign_rows(self.vectors.live_rows())
+
+    def compact(self, rows: np.ndarray):
+        """Reasignar las filas tras compactar la matriz (rows: filas anteriores, en el nuevo orden)"""
+        self.rebuild()
+
+    def search(self, query: np.ndarray, k: int,
+               allowed: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        """
+        Buscar las k filas más similares visitando nprobe listas
+
+        Args:
+            query: Vector de consulta
+            k: Número de resultados
+            allowed: Máscara booleana de filas permitidas (None = todas)
+
+        Returns:
+            List[Tuple[int, float]]: (fila, similitud coseno) de mayor a menor
+        """
+        if not self.is_trained:
+            return self.vectors.search(query, k, allowed)
+
+        query = normalize_rows(query)
+        centroid_scores = self.centroids @ query
+        nprobe = min(self.nprobe, len(self.centroids))
+        probed = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+
+        candidates = np.fromiter(
+            (row for list_id in probed for row in self._lists[list_id]),
+            dtype=np.int64
+        )
+        if allowed is not None:
+            candidates = candidates[allowed[candidates]]
+            if len(candidates) < k:
+                # Filtro muy selectivo para las listas visitadas: búsqueda exacta filtrada
+                return self.vectors.search(query, k, allowed)
+        if len(candidates) == 0:
+            return []
+
+        return top_k(candidates, self.vectors.scores_for(candidates, query), k)
+
+    def search_batch(self, queries: np.ndarray, k: int,
+                     allowed: Optional[np.ndarray] = None) -> List[List[Tuple[int, float]]]:
+        """Buscar varias consultas (cada una visita sus propias listas)"""
+        if not self.is_trained:
+            return self.vectors.search_batch(queries, k, allowed)
+        return [self.search(query, k, allowed) for query in queries]
+
+    def save(self, directory: str):
+        """
+        Guardar los centroides y la lista asignada a cada fila
+
+        Args:
+            directory: Directorio del snapshot
+        """
+        if self.is_trained:
+            np.save(os.path.join(directory, "ivf_centroids.npy"), self.centroids)
+            # Las filas se guardan compactadas (ver VectorMatrix.save): se numeran en orden
+            live_rows = self.vectors.live_rows()
+            assignments = np.array([self._assignments.get(int(row), -1) for row in live_rows], dtype=np.int32)
+            np.save(os.path.join(directory, "ivf_assignments.npy"), assignments)
+
+    def load(self, directory: str):
+        """
+        Cargar centroides y asignaciones guardados
+
+        Evita repetir k-means (y, si hay asignaciones, el cálculo de la lista
+        más cercana de cada fila) al arrancar desde un snapshot.
+
+        Args:
+            directory: Directorio del snapshot
+        """
+        path = os.path.join(directory, "ivf_centroids.npy")
+        if not os.path.exists(path):
+            self.rebuild()
+            return
+
+        self.centroids = np.load(path)
+        rows = self.vectors.live_rows()
+        self._trained_size = len(rows)
+
+        assignments_path = os.path.join(directory, "ivf_assignments.npy")
+        if not os.path.exists(assignments_path):
+            self._assign_rows(rows)
+            return
+
+        assignments = np.load(assignments_path)
+        if len(assignments) != len(rows) or (assignments < 0).any():
+            self._assign_rows(rows)
+            return
+
+        self._lists = [set() for _ in range(len(self.centroids))]
+        self._assignments = dict(zip(rows.tolist(), assignments.tolist()))
+        for row, list_id in self._assignments.items():
+            self._lists[list_id].add(row)
+
+    def get_stats(self) -> Dict:
+        sizes = [len(rows) for rows in self._lists]
+        return {
+            "kind": self.kind,
+            "trained": self.is_trained,
+            "nlist": len(self._lists),
+            "nprobe": self.nprobe,
+            "indexed_vectors": len(self._assignments),
+            "max_list_size": max(sizes) if sizes else 0
+        }
+
+class CompressedVectorIndex(ABC):
+    """
+    Base de los índices comprimidos: un código compacto por fila de la matriz
+
+    La búsqueda puntúa todos los códigos (en RAM) con una aproximación del
+    producto punto y, si rerank > 0, reordena los k·rerank mejores candidatos
+    con los vectores en precisión completa de la VectorMatrix. Esa matriz
+    puede estar mapeada en memoria (snapshot o storage_dir), de modo que solo
+    se leen de disco las filas de los candidatos.
+
+    Con rerank = 0 los vectores completos no se vuelven a leer: el índice
+    libera cada fila de la matriz en cuanto la codifica (ver
+    VectorMatrix.release), así que en memoria solo quedan los códigos.
+
+    Las subclases implementan los métodos abstractos: cómo se codifica una
+    fila y cómo se puntúa un bloque de códigos.
+    """
+
+    kind = ""
+
+    # Filas puntuadas por bloque (acota la memoria temporal)
+    BLOCK_ROWS = 16384
+
+    # Arrays por fila que se guardan en los snapshots (atributos "_<nombre>")
+    CODE_ARRAYS: Tuple[str, ...] = ("codes",)
+
+    def __init__(self, vectors: VectorMatrix, rerank: int = DEFAULT_RERANK):
+        """
+        Inicializar índice vacío
+
+        Args:
+            vectors: Matriz con los vectores en precisión completa
+            rerank: Candidatos por resultado que se reordenan con los vectores
+                completos (0 = devolver las puntuaciones aproximadas)
+        """
+        self.vectors = vectors
+        self.rerank = rerank
+        self._codes: Optional[np.ndarray] = None
+
+    @property
+    def is_ready(self) -> bool:
+        """True si las filas están codificadas (si no, se busca sobre la matriz)"""
+        return True
+
+    @property
+    @abstractmethod
+    def code_size(self) -> int:
+        """Bytes por fila de los códigos"""
+
+    @abstractmethod
+    def _encode(self, vectors: np.ndarray):
+        """Codificar vectores float32 normalizados -> tupla de arrays por fila"""
+
+    @abstractmethod
+    def _store(self, rows, encoded):
+        """Escribir los códigos de unas filas (la capacidad ya está asegurada)"""
+
+    @abstractmethod
+    def _allocate_codes(self, capacity: int):
+        """Crear (o ampliar) los arrays de códigos a la capacidad indicada"""
+
+    def _prepare_query(self, query: np.ndarray):
+        """Precalcular lo necesario para puntuar códigos contra una consulta"""
+        return query
+
+    @abstractmethod
+    def _approx_scores(self, rows, prepared) -> np.ndarray:
+        """Producto punto aproximado de la consulta contra los códigos de unas filas"""
+
+    def _ensure_capacity(self, rows: int):
+        capacity = 0 if self._codes is None else self._codes.shape[0]
+        if capacity >= rows and self._codes.flags.writeable:
+            return
+        # Duplicar al llenarse; los códigos cargados de un snapshot (solo lectura) se copian
+        self._allocate_codes(max(rows, 2 * capacity, 64))
+
+    def _encode_rows(self, rows: np.ndarray):
+        """Codificar filas de la matriz por bloques (y liberarlas si no se reordena)"""
+        if len(rows) == 0:
+            return
+        self._ensure_capacity(int(rows.max()) + 1)
+        for start in range(0, len(rows), self.BLOCK_ROWS):
+            chunk = rows[start:start + self.BLOCK_ROWS]
+            self._store(chunk, self._encode(self.vectors.rows_for(chunk)))
+            if self.rerank <= 0:
+                self.vectors.release(chunk)
+
+    def add(self, row: int):
+        """
+        Codificar (o recodificar) una fila ya escrita en la matriz
+
+        Args:
+            row: Fila de la matriz
+        """
+        if self.is_ready:
+            self._encode_rows(np.array([row]))
+
+    def remove(self, row: int):
+        """La matriz marca la fila como eliminada; su código se ignora"""
+
+    def rebuild(self):
+        """Recodificar todas las filas (tras reemplazar la matriz)"""
+        self._codes = None
+        if self.is_ready:
+            self._encode_rows(self.vectors.live_rows())
+
+    def compact(self, rows: np.ndarray):
+        """
+        Reordenar los códigos tras compactar la matriz, sin recodificar
+
+        Args:
+            rows: Filas anteriores de las filas conservadas, en el nuevo orden
+        """
+        if self._codes is None:
+            self.rebuild()
+            return
+        rows = np.asarray(rows, dtype=np.int64)
+        for name in self.CODE_ARRAYS:
+            setattr(self, f"_{name}", np.ascontiguousarray(getattr(self, f"_{name}")[rows]))
+
+    def search(self, query: np.ndarray, k: int,
+               allowed: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        """
+        Buscar las k filas más similares puntuando los códigos
+
+        Args:
+            query: Vector de consulta
+            k: Número de resultados
+            allowed: Máscara booleana de filas permitidas (None = todas)
+
+        Returns:
+            List[Tuple[int, float]]: (fila, similitud) de mayor a menor; exacta si
+            hay reordenación y aproximada si no
+        """
+        if not self.is_ready:
+            return self.vectors.search(query, k, allowed)
+
+        n_rows = len(self.vectors)
+        if not n_rows or k <= 0:
+            return []
+
+        query = normalize_rows(query)
+        prepared = self._prepare_query(query)
+        mask = self.vectors.live_mask()
+        if allowed is not None:
+            mask = mask & allowed[:n_rows]
+        rows = np.flatnonzero(mask)
+        if len(rows) == 0:
+            return []
+
+        scores = np.empty(len(rows), dtype=np.float32)
+        if len(rows) * 2 > n_rows:
+            # Filtro poco selectivo: bloques contiguos (sin copiar códigos) y enmascarar
+            all_scores = np.empty(n_rows, dtype=np.float32)
+            for start in range(0, n_rows, self.BLOCK_ROWS):
+                end = min(start + self.BLOCK_ROWS, n_rows)
+                all_scores[start:end] = self._approx_scores(slice(start, end), prepared)
+            scores = all_scores[rows]
+        else:
+            for start in range(0, len(rows), self.BLOCK_ROWS):
+                chunk = rows[start:start + self.BLOCK_ROWS]
+                scores[start:start + len(chunk)] = self._approx_scores(chunk, prepared)
+
+        if self.rerank <= 0:
+            return top_k(rows, scores, k)
+
+        # Reordenar los mejores candidatos con los vectores en precisión completa
+        candidates = np.array([row for row, _ in top_k(rows, scores, k * self.rerank)], dtype=np.int64)
+        return top_k(candidates, self.vectors.scores_for(candidates, query), k)
+
+    def search_batch(self, queries: np.ndarray, k: int,
+                     allowed: Optional[np.ndarray] = None) -> List[List[Tuple[int, float]]]:
+        """Buscar varias consultas (las tablas de cada consulta son distintas)"""
+        if not self.is_ready:
+            return self.vectors.search_batch(queries, k, allowed)
+        return [self.search(query, k, allowed) for query in queries]
+
+    def save(self, directory: str):
+        """
+        Guardar los códigos de las filas vivas (en el orden compactado de la matriz)
+
+        Args:
+            directory: Directorio del snapshot
+        """
+        if not self.is_ready or self._codes is None:
+            return
+        live_rows = self.vectors.live_rows()
+        for name in self.CODE_ARRAYS:
+            np.save(os.path.join(directory, f"{self.kind}_{name}.npy"), getattr(self, f"_{name}")[live_rows])
+
+    def load(self, directory: str):
+        """
+        Cargar los códigos guardados (mapeados en memoria; se copian al modificarlos)
+
+        Si faltan o no corresponden a la matriz, se recodifican las filas.
+
+        Args:
+            directory: Directorio del snapshot
+        """
+        arrays = {}
+        for name in self.CODE_ARRAYS:
+            path = os.path.join(directory, f"{self.kind}_{name}.npy")
+            if not os.path.exists(path):
+                self.rebuild()
+                return
+            arrays[name] = np.load(path, mmap_mode="r")
+
+        if any(len(array) != len(self.vectors) for array in arrays.values()):
+            self.rebuild()
+            return
+        for name, array in arrays.items():
+            setattr(self, f"_{name}", array)
+        if self.rerank <= 0:
+            self.vectors.release(self.vectors.live_rows())
+
+    def get_stats(self) -> Dict:
+        full_size = (self.vectors.dim or 0) * 4
+        return {
+            "kind": self.kind,
+            "ready": self.is_ready,
+            "rerank": self.rerank,
+            "full_vectors_bytes": self.vectors.nbytes,
+            "bytes_per_vector": self.code_size,
+            "compression_vs_float32": round(full_size / self.code_size, 1) if self.code_size else None,
+            "codes_bytes": int(sum(getattr(self, f"_{name}").nbytes for name in self.CODE_ARRAYS))
+            if self._codes is not None else 0
+        }
+
+class Int8VectorIndex(CompressedVectorIndex):
+    """
+    Cuantización escalar int8 (4x menos memoria que float32)
+
+    Cada fila se guarda como int8 con su propia escala (máximo absoluto / 127),
+    así que no hay entrenamiento y las altas se codifican al momento. La
+    puntuación es el producto de la consulta float32 por los códigos
+    (distancia asimétrica: la consulta no se cuantiza).
+    """
+
+    kind = "int8"
+
+    CODE_ARRAYS = ("codes", "scales")
+
+    def __init__(self, vectors: VectorMatrix, rerank: int = DEFAULT_RERANK):
+        super().__init__(vectors, rerank)
+        self._scales: Optional[np.ndarray] = None
+
+    @property
+    def code_size(self) -> int:
+        return (self.vectors.dim or 0) + 4
+
+    def _allocate_codes(self, capacity: int):
+        codes = np.zeros((capacity, self.vectors.dim), dtype=np.int8)
+        scales = np.zeros(capacity, dtype=np.float32)
+        if self._codes is not None:
+            codes[:len(self._codes)] = self._codes[:capacity]
+            scales[:len(self._scales)] = self._scales[:capacity]
+        self._codes = codes
+        self._scales = scales
+
+    def _encode(self, vectors: np.ndarray):
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0.0] = 1.0
+        codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+        return codes, scales.astype(np.float32)
+
+    def _store(self, rows, encoded):
+        codes, scales = encoded
+        self._codes[rows] = codes
+        self._scales[rows] = scales
+
+    def _approx_scores(self, rows, prepared) -> np.ndarray:
+        return (self._codes[rows].astype(np.float32) @ prepared) * self._scales[rows]
+
+class PQVectorIndex(CompressedVectorIndex):
+    """
+    Cuantización de producto (PQ) con tablas de distancia asimétricas
+
+    Cada vector se divide en `subvectors` trozos y cada trozo se sustituye por
+    el índice (1 byte) del centroide más cercano de su subespacio (256
+    centroides por subespacio, entrenados con k-means). Con el valor por
+    defecto (un trozo cada 4 dimensiones) un vector float32 ocupa 16x menos.
+
+    Una consulta precalcula una tabla (subespacio x centroide) con el producto
+    punto de su trozo contra cada centroide; la puntuación de una fila es la
+    suma de 'subvectors' entradas de esa tabla. Mientras no haya suficientes
+    vectores para entrenar se usa búsqueda exacta.
+
+    Sin reordenación (rerank = 0) las filas se liberan tras codificarlas, así
+    que no se reentrena al crecer el corpus: los centroides siguen siendo los
+    del primer entrenamiento.
+    """
+
+    kind = "pq"
+
+    # Centroides por subespacio (códigos de 1 byte)
+    CENTROIDS = 256
+
+    def __init__(self, vectors: VectorMatrix, subvectors: Optional[int] = None, rerank: int = DEFAULT_RERANK,
+                 min_train_size: int = 2048, retrain_growth: float = 4.0,
+                 kmeans_iterations: int = 10, seed: int = 0):
+        """
+        Inicializar índice PQ vacío (sin entrenar)
+
+        Args:
+            vectors: Matriz con los vectores en precisión completa
+            subvectors: Número de subespacios (None = dimensión / 4)
+            rerank: Candidatos por resultado que se reordenan con los vectores completos
+            min_train_size: Filas mínimas para entrenar los centroides
+            retrain_growth: Factor de crecimiento del corpus que dispara un reentrenamiento
+            kmeans_iterations: Iteraciones de k-means al entrenar
+            seed: Semilla para el muestreo de k-means
+        """
+        super().__init__(vectors, rerank)
+        self.subvectors = subvectors
+        self.min_train_size = min_train_size
+        self.retrain_growth = retrain_growth
+        self.kmeans_iterations = kmeans_iterations
+        self.seed = seed
+
+        # (subvectors, CENTROIDS, dimensión del subespacio)
+        self.codebooks: Optional[np.ndarray] = None
+        self._trained_size = 0
+
+    @property
+    def is_ready(self) -> bool:
+        return self.codebooks is not None
+
+    @property
+    def code_size(self) -> int:
+        return self.codebooks.shape[0] if self.codebooks is not None else 0
+
+    def _split(self, vectors: np.ndarray) -> np.ndarray:
+        """(n, d) -> (n, subespacios, dimensión del subespacio), con ceros de relleno"""
+        m, _, dsub = self.codebooks.shape
+        padded = np.zeros((vectors.shape[0], m * dsub), dtype=np.float32)
+        padded[:, :vectors.shape[1]] = vectors
+        return padded.reshape(vectors.shape[0], m, dsub)
+
+    def train(self):
+        """Entrenar los centroides de cada subespacio (k-means) y codificar todas las filas"""
+        rows = self.vectors.live_rows()
+        if len(rows) == 0:
+            return
+
+        dim = self.vectors.dim
+        m = self.subvectors or max(1, dim // 4)
+        dsub = -(-dim // m)
+        centroids = min(self.CENTROIDS, len(rows))
+
+        rng = np.random.default_rng(self.seed)
+        sample_size = min(len(rows), max(centroids * 16, self.min_train_size))
+        sample_rows = np.sort(rng.choice(rows, size=sample_size, replace=False))
+        self.codebooks = np.zeros((m, self.CENTROIDS, dsub), dtype=np.float32)
+        sample = self._split(self.vectors.rows_for(sample_rows))
+
+        for j in range(m):
+            points = sample[:, j, :]
+            centers = points[rng.choice(sample_size, size=centroids, replace=False)]
+            for _ in range(self.kmeans_iterations):
+                # argmin ||x - c||² = argmax (x·c - ||c||²/2)
+                assignment = np.argmax(points @ centers.T - 0.5 * (centers ** 2).sum(axis=1), axis=1)
+                sums = np.zeros_like(centers)
+                np.add.at(sums, assignment, points)
+                counts = np.bincount(assignment, minlength=centroids)
+                filled = counts > 0
+                centers[filled] = sums[filled] / counts[filled, None]
+            self.codebooks[j, :centroids] = centers
+            # Centroides sobrantes (corpus pequeño): copias del primero, nunca más cercanos
+            self.codebooks[j, centroids:] = centers[0]
+
+        self._trained_size = len(rows)
+        self._codes = None
+        self._encode_rows(rows)
+
+        print(f"✅ Índice PQ entrenado: {m} subespacios, {len(rows)} vectores")
+
+    def add(self, row: int):
+        if not self.is_ready:
+            if len(self.vectors) >= self.min_train_size:
+                self.train()
+            return
+        if len(self.vectors) >= self.retrain_growth * self._trained_size and self.vectors.has_rows:
+            self.train()
+            return
+        super().add(row)
+
+    def rebuild(self):
+        if not self.is_ready:
+            if len(self.vectors) >= self.min_train_size:
+                self.train()
+            return
+        super().rebuild()
+
+    def _allocate_codes(self, capacity: int):
+        codes = np.zeros((capacity, self.codebooks.shape[0]), dtype=np.uint8)
+        if self._codes is not None:
+            codes[:len(self._codes)] = self._codes[:capacity]
+        self._codes = codes
+
+    def _encode(self, vectors: np.ndarray):
+        parts = self._split(vectors)
+        codes = np.empty((vectors.shape[0], self.codebooks.shape[0]), dtype=np.uint8)
+        squared_norms = (self.codebooks ** 2).sum(axis=2)
+        for j in range(self.codebooks.shape[0]):
+            codes[:, j] = np.argmax(parts[:, j, :] @ self.codebooks[j].T - 0.5 * squared_norms[j], axis=1)
+        return codes
+
+    def _store(self, rows, encoded):
+        self._codes[rows] = encoded
+
+    def _prepare_query(self, query: np.ndarray) -> np.ndarray:
+        # Tabla (subespacio, centroide) con el producto punto de cada trozo de la consulta
+        parts = self._split(query[None, :])[0]
+        return np.einsum("mkd,md->mk", self.codebooks, parts)
+
+    def _approx_scores(self, rows, prepared) -> np.ndarray:
+        codes = self._codes[rows]
+        return prepared[np.arange(codes.shape[1]), codes].sum(axis=1)
+
+    def save(self, directory: str):
+        if self.is_ready:
+            np.save(os.path.join(directory, "pq_codebooks.npy"), self.codebooks)
+        super().save(directory)
+
+    def load(self, directory: str):
+        path = os.path.join(directory, "pq_codebooks.npy")
+        if not os.path.exists(path):
+            self.rebuild()
+            return
+        self.codebooks = np.load(path)
+        self._trained_size = len(self.vectors.live_rows())
+        super().load(directory)
+
+    def get_stats(self) -> Dict:
+        stats = super().get_stats()
+        stats["subvectors"] = self.code_size
+        return stats
+
+# Índices vectoriales disponibles para EmbeddingManager
+VECTOR_INDEXES = {
+    ExactVectorIndex.kind: ExactVectorIndex,
+    IVFFlatIndex.kind: IVFFlatIndex,
+    Int8VectorIndex.kind: Int8VectorIndex,
+    PQVectorIndex.kind: PQVectorIndex,
+}
+
+def is_compressed_index(kind: str) -> bool:
+    """True si el índice guarda códigos comprimidos (int8, pq)"""
+    return issubclass(VECTOR_INDEXES.get(kind, ExactVectorIndex), CompressedVectorIndex)
+
+def needs_full_vectors(kind: str, params: Optional[Dict] = None) -> bool:
+    """
+    Indicar si un índice vuelve a leer los vectores en precisión completa
+
+    Los índices comprimidos sin reordenación (rerank = 0) solo usan sus
+    códigos: la matriz puede descartar cada fila en cuanto se codifica.
+
+    Args:
+        kind: Tipo de índice
+        params: Parámetros del índice
+
+    Returns:
+        bool: False si basta con los códigos
+    """
+    if not is_compressed_index(kind):
+        return True
+    return (params or {}).get("rerank", DEFAULT_RERANK) > 0
+
+def create_vector_index(kind: str, vectors: VectorMatrix, **params):
+    """
+    Crear un índice vectorial por nombre
+
+    Args:
+        kind: "exact", "ivf" o comprimido ("int8", "pq")
+        vectors: Matriz con los vectores indexados
+        **params: Parámetros específicos del índice (nlist, nprobe, rerank, ...)
+
+    Returns:
+        Índice vectorial
+    """
+    if kind not in VECTOR_INDEXES:
+        raise ValueError(f"Índice vectorial no soportado: {kind}")
+    return VECTOR_INDEXES[kind](vectors, **params)
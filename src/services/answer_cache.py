@@ -0,0 +1,394 @@
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+from .analyzer import spanish_analyzer
+
+# Fuente de una respuesta: (ID del artículo, versión en Firestore)
+AnswerSource = Tuple[str, Optional[int]]
+
+class AnswerCache:
+    """
+    Caché de respuestas generadas, en memoria (LRU + TTL) y opcionalmente en SQLite
+
+    La clave combina la pregunta normalizada (sin tildes, mayúsculas ni
+    signos) con una huella de las fuentes: IDs y versiones de los artículos
+    recuperados, el contexto enviado al modelo y el modelo que respondió. Si
+    un artículo cambia de versión la huella cambia y la respuesta anterior no
+    se vuelve a servir; además invalidate_article borra al momento las
+    respuestas que usaron ese artículo.
+
+    El nivel en disco (SQLite) sobrevive a reinicios: un fallo en memoria se
+    busca en disco y, si está vigente, se promueve a memoria.
+
+    Desde código async se usan get_async, put_async e invalidate_article_async:
+    el nivel en memoria se consulta en el event loop y las consultas y commits
+    de SQLite se ejecutan en un hilo (asyncio.to_thread), así que el disco
+    nunca bloquea el event loop.
+    """
+
+    # Escrituras entre limpiezas del nivel en disco
+    PRUNE_EVERY = 100
+
+    def __init__(self, max_entries: int = 512, ttl_seconds: float = 3600.0,
+                 db_path: Optional[str] = None, max_disk_entries: int = 10000,
+                 normalizer: Optional[Callable[[str], List[str]]] = None):
+        """
+        Inicializar caché
+
+        Args:
+            max_entries: Respuestas máximas en memoria (0 = caché desactivada)
+            ttl_seconds: Segundos de validez de cada respuesta
+            db_path: Archivo SQLite del nivel en disco (None = solo memoria)
+            max_disk_entries: Respuestas máximas en disco
+            normalizer: Tokenizador de la pregunta (por defecto, el del analizador español)
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.db_path = db_path
+        self.max_disk_entries = max_disk_entries
+        self.normalizer = normalizer or spanish_analyzer.normalize
+
+        # Clave -> (caduca en [time.time()], respuesta, IDs de artículos)
+        self._entries: "OrderedDict[str, Tuple[float, str, Tuple[str, ...]]]" = OrderedDict()
+        # ID de artículo -> claves de las respuestas que lo usaron
+        self._by_article: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+        # El nivel en disco tiene su propio lock: una consulta lenta no bloquea la memoria
+        self._db_lock = threading.Lock()
+
+        self._db: Optional[sqlite3.Connection] = None
+        self._puts_since_prune = 0
+        if db_path and max_entries > 0:
+            self._open_db(db_path)
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def _open_db(self, db_path: str):
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        # WAL: las lecturas no esperan a las escrituras y cada commit es barato
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS answers (
+                key TEXT PRIMARY KEY,
+                answer TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                created_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS answer_articles (
+                key TEXT NOT NULL,
+                article_id TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS answer_articles_by_article ON answer_articles (article_id);
+            CREATE INDEX IF NOT EXISTS answer_articles_by_key ON answer_articles (key);
+        """)
+        self._db.commit()
+        print(f"✅ Caché de respuestas en disco: {db_path}")
+
+    def make_key(self, query: str, sources: Sequence[AnswerSource], context: str, model: str) -> str:
+        """
+        Calcular la clave de una respuesta
+
+        Args:
+            query: Pregunta del usuario
+            sources: (ID, versión) de los artículos recuperados, en orden
+            context: Contexto enviado al modelo
+            model: Modelo que genera la respuesta
+
+        Returns:
+            str: Clave (hash SHA-256 en hexadecimal)
+        """
+        digest = hashlib.sha256()
+        digest.update(" ".join(self.normalizer(query)).encode("utf-8"))
+        for article_id, version in sources:
+            digest.update(f"\x00{article_id}\x01{version}".encode("utf-8"))
+        digest.update(b"\x00" + model.encode("utf-8") + b"\x00" + context.encode("utf-8"))
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Obtener una respuesta cacheada (memoria y, si falla, disco)
+
+        Args:
+            key: Clave calculada con make_key
+
+        Returns:
+            Optional[str]: Respuesta o None si no hay una vigente
+        """
+        if self.max_entries <= 0:
+            return None
+
+        now = time.time()
+        answer = self._memory_get(key, now)
+        if answer is not None:
+            return answer
+        return self._promote(key, self._disk_get(key, now) if self._db is not None else None)
+
+    async def get_async(self, key: str) -> Optional[str]:
+        """
+        Obtener una respuesta cacheada sin bloquear el event loop
+
+        Args:
+            key: Clave calculada con make_key
+
+        Returns:
+            Optional[str]: Respuesta o None si no hay una vigente
+        """
+        if self.max_entries <= 0:
+            return None
+
+        now = time.time()
+        answer = self._memory_get(key, now)
+        if answer is not None:
+            return answer
+        return self._promote(key, await asyncio.to_thread(self._disk_get, key, now) if self._db is not None else None)
+
+    def _memory_get(self, key: str, now: float) -> Optional[str]:
+        """Buscar en memoria (cuenta aciertos y caducadas, no fallos)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, answer, _ = entry
+            if expires_at >= now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return answer
+            self._discard(key)
+            self.expirations += 1
+            return None
+
+    def _disk_get(self, key: str, now: float) -> Optional[Tuple[float, str, Tuple[str, ...]]]:
+        """Buscar en disco: (caduca en, respuesta, IDs de artículos) si está vigente"""
+        with self._db_lock:
+            if self._db is None:
+                return None
+            row = self._db.execute(
+                "SELECT answer, expires_at FROM answers WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or row[1] < now:
+                return None
+            article_ids = tuple(article_id for (article_id,) in self._db.execute(
+                "SELECT article_id FROM answer_articles WHERE key = ?", (key,)
+            ))
+            return row[1], row[0], article_ids
+
+    def _promote(self, key: str, found: Optional[Tuple[float, str, Tuple[str, ...]]]) -> Optional[str]:
+        """Contar el resultado del disco y, si hubo acierto, subirlo a memoria"""
+        with self._lock:
+            if found is None:
+                self.misses += 1
+                return None
+            expires_at, answer, article_ids = found
+            self._remember(key, expires_at, answer, article_ids)
+            self.disk_hits += 1
+            return answer
+
+    def put(self, key: str, answer: str, article_ids: Sequence[str]):
+        """
+        Guardar una respuesta
+
+        Args:
+            key: Clave calculada con make_key
+            answer: Respuesta generada
+            article_ids: Artículos usados como fuente (para invalidar)
+        """
+        if self.max_entries <= 0:
+            return
+
+        now = time.time()
+        article_ids = self._memory_put(key, answer, article_ids, now)
+        if self._db is not None:
+            self._disk_put(key, answer, article_ids, now)
+
+    async def put_async(self, key: str, answer: str, article_ids: Sequence[str]):
+        """
+        Guardar una respuesta sin bloquear el event loop (el disco se escribe en un hilo)
+
+        Args:
+            key: Clave calculada con make_key
+            answer: Respuesta generada
+            article_ids: Artículos usados como fuente (para invalidar)
+        """
+        if self.max_entries <= 0:
+            return
+
+        now = time.time()
+        article_ids = self._memory_put(key, answer, article_ids, now)
+        if self._db is not None:
+            await asyncio.to_thread(self._disk_put, key, answer, article_ids, now)
+
+    def _memory_put(self, key: str, answer: str, article_ids: Sequence[str], now: float) -> Tuple[str, ...]:
+        """Guardar en memoria; devuelve los IDs de artículos sin duplicados"""
+        article_ids = tuple(dict.fromkeys(article_ids))
+        with self._lock:
+            self._remember(key, now + self.ttl_seconds, answer, article_ids)
+        return article_ids
+
+    def _disk_put(self, key: str, answer: str, article_ids: Tuple[str, ...], now: float):
+        """Guardar en disco y limpiar cada PRUNE_EVERY escrituras"""
+        expires_at = now + self.ttl_seconds
+        with self._db_lock:
+            if self._db is not None:
+                self._db.execute("DELETE FROM answer_articles WHERE key = ?", (key,))
+                self._db.execute(
+                    "INSERT OR REPLACE INTO answers (key, answer, expires_at, created_at) VALUES (?, ?, ?, ?)",
+                    (key, answer, expires_at, now)
+                )
+                self._db.executemany(
+                    "INSERT INTO answer_articles (key, article_id) VALUES (?, ?)",
+                    [(key, article_id) for article_id in article_ids]
+                )
+                self._puts_since_prune += 1
+                if self._puts_since_prune >= self.PRUNE_EVERY:
+                    self._prune_db(now)
+                self._db.commit()
+
+    def _remember(self, key: str, expires_at: float, answer: str, article_ids: Tuple[str, ...]):
+        """Guardar en memoria (requiere tener el lock)"""
+        if key in self._entries:
+            self._discard(key)
+        self._entries[key] = (expires_at, answer, article_ids)
+        for article_id in article_ids:
+            self._by_article.setdefault(article_id, set()).add(key)
+
+        while len(self._entries) > self.max_entries:
+            self._discard(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _discard(self, key: str):
+        """Quitar una entrada de memoria (requiere tener el lock)"""
+        _, _, article_ids = self._entries.pop(key)
+        for article_id in article_ids:
+            keys = self._by_article.get(article_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_article[article_id]
+
+    def _prune_db(self, now: float):
+        """Borrar del disco las caducadas y las más antiguas sobre el límite (requiere _db_lock)"""
+        self._puts_since_prune = 0
+        self._db.execute("DELETE FROM answers WHERE expires_at < ?", (now,))
+        self._db.execute(
+            "DELETE FROM answers WHERE key NOT IN "
+            "(SELECT key FROM answers ORDER BY created_at DESC LIMIT ?)",
+            (self.max_disk_entries,)
+        )
+        self._db.execute("DELETE FROM answer_articles WHERE key NOT IN (SELECT key FROM answers)")
+
+    def invalidate_article(self, article_id: str) -> int:
+        """
+        Borrar las respuestas que usaron un artículo (al editarlo o archivarlo)
+
+        Args:
+            article_id: ID del artículo
+
+        Returns:
+            int: Respuestas borradas de memoria
+        """
+        removed = self._memory_invalidate(article_id)
+        if self._db is not None:
+            self._disk_invalidate(article_id)
+            removed += self._memory_invalidate(article_id)
+        return self._report_invalidation(article_id, removed)
+
+    async def invalidate_article_async(self, article_id: str) -> int:
+        """
+        Borrar las respuestas que usaron un artículo sin bloquear el event loop
+
+        Args:
+            article_id: ID del artículo
+
+        Returns:
+            int: Respuestas borradas de memoria
+        """
+        removed = self._memory_invalidate(article_id)
+        if self._db is not None:
+            await asyncio.to_thread(self._disk_invalidate, article_id)
+            # Por si una lectura del disco la promovió a memoria mientras tanto
+            removed += self._memory_invalidate(article_id)
+        return self._report_invalidation(article_id, removed)
+
+    def _memory_invalidate(self, article_id: str) -> int:
+        with self._lock:
+            keys = list(self._by_article.get(article_id, ()))
+            for key in keys:
+                self._discard(key)
+            self.invalidations += len(keys)
+            return len(keys)
+
+    def _disk_invalidate(self, article_id: str):
+        with self._db_lock:
+            if self._db is not None:
+                self._db.execute(
+                    "DELETE FROM answers WHERE key IN (SELECT key FROM answer_articles WHERE article_id = ?)",
+                    (article_id,)
+                )
+                self._db.execute("DELETE FROM answer_articles WHERE key NOT IN (SELECT key FROM answers)")
+                self._db.commit()
+
+    @staticmethod
+    def _report_invalidation(article_id: str, removed: int) -> int:
+        if removed:
+            print(f"🔄 {removed} respuestas cacheadas invalidadas por el artículo {article_id}")
+        return removed
+
+    def clear(self):
+        """Vaciar la caché, en memoria y en disco (los contadores se conservan)"""
+        with self._lock:
+            self._entries.clear()
+            self._by_article.clear()
+        with self._db_lock:
+            if self._db is not None:
+                self._db.execute("DELETE FROM answers")
+                self._db.execute("DELETE FROM answer_articles")
+                self._db.commit()
+
+    def close(self):
+        """Cerrar el archivo SQLite"""
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def get_stats(self) -> Dict:
+        """
+        Obtener contadores de uso de la caché
+
+        Returns:
+            Dict: Aciertos (memoria y disco), fallos, expulsiones y tamaño actual
+        """
+        lookups = self.hits + self.disk_hits + self.misses
+        stats = {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.disk_hits) / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "disk": self.db_path if self._db is not None else None
+        }
+        if self._db is not None:
+            with self._db_lock:
+                stats["disk_entries"] = self._db.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+        return stats
@@ -0,0 +1,39 @@
+from typing import List, Tuple
+
+def chunk_text(text: str, size: int = 800, overlap: int = 150) -> List[Tuple[int, int]]:
+    """
+    Dividir un texto en pasajes solapados sin cortar palabras
+
+    Args:
+        text: Texto a dividir
+        size: Longitud máxima aproximada de cada pasaje (caracteres)
+        overlap: Caracteres compartidos entre pasajes consecutivos
+
+    Returns:
+        List[Tuple[int, int]]: Offsets (inicio, fin) de cada pasaje en el texto;
+        un texto corto o vacío produce un único pasaje
+    """
+    length = len(text)
+    if length <= size:
+        return [(0, length)]
+
+    spans = []
+    start = 0
+    while start < length:
+        end = min(start + size, length)
+        if end < length:
+            # Retroceder hasta el último espacio para no partir una palabra
+            cut = text.rfind(" ", start + size // 2, end)
+            if cut != -1:
+                end = cut
+
+        spans.append((start, end))
+        if end >= length:
+            break
+
+        # El siguiente pasaje empieza `overlap` caracteres antes, en inicio de palabra
+        next_start = max(end - overlap, start + 1)
+        space = text.find(" ", next_start, end)
+        start = space + 1 if space != -1 else next_start
+
+    return spans
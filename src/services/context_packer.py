@@ -0,0 +1,176 @@
+import os
+from typing import Dict, List, Tuple
+
+from .tokenizer import count_tokens, truncate_to_tokens
+
+class PackedContext:
+    """Contexto empaquetado para el modelo y cuánto presupuesto usó"""
+
+    __slots__ = ("text", "tokens_used", "token_budget", "passages", "articles", "duplicates_skipped")
+
+    def __init__(self, text: str, tokens_used: int, token_budget: int, passages: int,
+                 articles: int, duplicates_skipped: int):
+        self.text = text
+        self.tokens_used = tokens_used
+        self.token_budget = token_budget
+        self.passages = passages
+        self.articles = articles
+        self.duplicates_skipped = duplicates_skipped
+
+    def to_dict(self) -> Dict:
+        return {field: getattr(self, field) for field in self.__slots__ if field != "text"}
+
+class ContextPacker:
+    """
+    Empaquetador del contexto del modelo con un presupuesto de tokens
+
+    Reúne los pasajes de todos los artículos recuperados y los agrega de
+    mayor a menor similitud mientras quepan en el presupuesto:
+    - Los pasajes solapados de un mismo artículo se fusionan y solo cuenta
+      el texto nuevo; si casi todo ya estaba incluido, se descartan.
+    - Los pasajes con el mismo texto en otro artículo se descartan.
+    - Si un pasaje no cabe entero pero queda presupuesto suficiente, se
+      recorta sin partir palabras; si no, se prueba con el siguiente.
+    Después se escriben agrupados por artículo (en el orden de relevancia) y
+    con los fragmentos en el orden en que aparecen en el artículo.
+
+    Los tokens se cuentan con el tokenizador aproximado (ver tokenizer), así
+    que el tamaño del prompt, y con él la latencia de generación, es predecible.
+    """
+
+    HEADER = "Información disponible en la biblioteca virtual:\n\n"
+
+    def __init__(self, token_budget: int = 1500, min_passage_tokens: int = 24,
+                 min_new_fraction: float = 0.5, fallback_chars: int = 600):
+        """
+        Inicializar empaquetador
+
+        Args:
+            token_budget: Tokens máximos del contexto
+            min_passage_tokens: Tokens mínimos de un pasaje recortado para incluirlo
+            min_new_fraction: Fracción mínima de texto nuevo para incluir un pasaje solapado
+            fallback_chars: Caracteres del inicio del contenido si un artículo no trae pasajes
+        """
+        self.token_budget = token_budget
+        self.min_passage_tokens = min_passage_tokens
+        self.min_new_fraction = min_new_fraction
+        self.fallback_chars = fallback_chars
+
+    def pack(self, articles: List[Dict]) -> PackedContext:
+        """
+        Construir el contexto para los artículos encontrados
+
+        Args:
+            articles: Artículos recuperados (de mayor a menor relevancia) con sus pasajes
+
+        Returns:
+            PackedContext: Texto del contexto y tokens usados
+        """
+        contents = [article["content"] for article in articles]
+
+        # (similitud, posición del artículo, inicio, fin) de cada pasaje candidato
+        candidates: List[Tuple[float, int, int, int]] = []
+        for rank, article in enumerate(articles):
+            passages = article.get("passages")
+            if passages:
+                candidates.extend(
+                    (passage["similarity_score"], rank, passage["start"], passage["end"]) for passage in passages
+                )
+            else:
+                candidates.append((article["similarity_score"], rank, 0, min(len(contents[rank]), self.fallback_chars)))
+        candidates.sort(key=lambda candidate: (-candidate[0], candidate[1], candidate[2]))
+
+        remaining = self.token_budget - count_tokens(self.HEADER)
+        spans: Dict[int, List[Tuple[int, int]]] = {}
+        seen_texts = set()
+        duplicates = 0
+
+        for _, rank, start, end in candidates:
+            if remaining < self.min_passage_tokens:
+                break
+
+            content = contents[rank]
+            article_spans = spans.get(rank, [])
+            new_parts = _uncovered(start, end, article_spans)
+            if sum(part_end - part_start for part_start, part_end in new_parts) < self.min_new_fraction * (end - start):
+                duplicates += 1
+                continue
+
+            fingerprint = " ".join(content[start:end].lower().split())
+            if fingerprint in seen_texts:
+                duplicates += 1
+                continue
+
+            header_cost = 0 if rank in spans else count_tokens(self._article_header(0, articles[rank]["title"]))
+            cost = header_cost + count_tokens("Pasaje:") + sum(
+                count_tokens(content[part_start:part_end]) for part_start, part_end in new_parts
+            )
+
+            if cost > remaining:
+                # Recortar solo pasajes sin solapamiento (el texto nuevo es el pasaje entero)
+                available = remaining - (cost - count_tokens(content[start:end]))
+                if len(new_parts) != 1 or new_parts[0] != (start, end) or available < self.min_passage_tokens:
+                    continue
+                end = start + len(truncate_to_tokens(content[start:end], available))
+                cost = remaining
+
+            spans[rank] = _merge(article_spans, (start, end))
+            seen_texts.add(fingerprint)
+            remaining -= cost
+
+        text = self._render(articles, contents, spans)
+        return PackedContext(
+            text=text,
+            tokens_used=count_tokens(text),
+            token_budget=self.token_budget,
+            passages=sum(len(article_spans) for article_spans in spans.values()),
+            articles=len(spans),
+            duplicates_skipped=duplicates
+        )
+
+    @staticmethod
+    def _article_header(number: int, title: str) -> str:
+        return f"Artículo {number}: {title}\n"
+
+    def _render(self, articles: List[Dict], contents: List[str],
+                spans: Dict[int, List[Tuple[int, int]]]) -> str:
+        """Escribir los fragmentos elegidos, agrupados por artículo en orden de relevancia"""
+        parts = [self.HEADER]
+        for number, rank in enumerate(sorted(spans), 1):
+            parts.append(self._article_header(number, articles[rank]["title"]))
+            for start, end in spans[rank]:
+                parts.append(f"Pasaje: {contents[rank][start:end].strip()}\n")
+            parts.append("\n")
+        return "".join(parts)
+
+def _uncovered(start: int, end: int, spans: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """Partes de [start, end) que no cubren los intervalos (ordenados y disjuntos)"""
+    parts = []
+    position = start
+    for span_start, span_end in spans:
+        if span_end <= position:
+            continue
+        if span_start >= end:
+            break
+        if span_start > position:
+            parts.append((position, span_start))
+        position = max(position, span_end)
+    if position < end:
+        parts.append((position, end))
+    return parts
+
+def _merge(spans: List[Tuple[int, int]], span: Tuple[int, int]) -> List[Tuple[int, int]]:
+    """Agregar un intervalo a una lista ordenada de intervalos disjuntos, fusionando solapes"""
+    merged = []
+    start, end = span
+    for span_start, span_end in spans:
+        if span_end < start or span_start > end:
+            merged.append((span_start, span_end))
+        else:
+            start, end = min(start, span_start), max(end, span_end)
+    merged.append((start, end))
+    merged.sort()
+    return merged
+
+# Instancia global del empaquetador de contexto
+context_packer = ContextPacker(token_budget=int(os.getenv("CONTEXT_TOKEN_BUDGET", 1500)))
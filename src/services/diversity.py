@@ -0,0 +1,99 @@
+import numpy as np
+from typing import Dict, List, Optional, Sequence
+
+def lexical_overlap(query_terms: Sequence[str], passage_terms: Sequence[Sequence[str]],
+                    idf: Optional[Dict[str, float]] = None) -> np.ndarray:
+    """
+    Cobertura de los términos de la consulta en cada pasaje (re-ranking léxico barato)
+
+    Args:
+        query_terms: Términos analizados de la consulta
+        passage_terms: Términos analizados de cada pasaje
+        idf: Peso de cada término (por defecto, todos iguales)
+
+    Returns:
+        np.ndarray: Fracción (ponderada) de los términos de la consulta presentes en
+            cada pasaje, en [0, 1]
+    """
+    terms = list(dict.fromkeys(query_terms))
+    if not terms or not passage_terms:
+        return np.zeros(len(passage_terms), dtype=np.float32)
+
+    weights = np.array([idf.get(term, 0.0) if idf else 1.0 for term in terms], dtype=np.float32)
+    total = weights.sum()
+    if total <= 0:
+        return np.zeros(len(passage_terms), dtype=np.float32)
+
+    # Matriz pasajes x términos de la consulta (solo se miran los términos de la consulta)
+    present = np.array(
+        [[term in passage for term in terms] for passage in map(frozenset, passage_terms)],
+        dtype=np.float32
+    )
+    return present @ weights / total
+
+def mmr_select(relevance: np.ndarray, articles: np.ndarray, starts: np.ndarray, ends: np.ndarray,
+               limit: int, mmr_lambda: float = 0.7, max_per_article: int = 0,
+               vectors: Optional[np.ndarray] = None) -> List[int]:
+    """
+    Elegir pasajes con Maximal Marginal Relevance y un máximo por artículo
+
+    En cada paso se elige el candidato con mayor
+        lambda * relevancia - (1 - lambda) * similitud máxima con los ya elegidos
+    La similitud entre dos pasajes es el coseno de sus vectores (si se
+    indican) y, dentro de un mismo artículo, al menos la fracción de texto que
+    comparten (las ventanas solapadas son casi idénticas). Todo se calcula con
+    operaciones vectoriales sobre los candidatos: cada paso es O(candidatos).
+
+    Args:
+        relevance: Relevancia de cada candidato (mayor = mejor)
+        articles: Código del artículo de cada candidato
+        starts: Inicio de cada pasaje en su artículo
+        ends: Fin de cada pasaje en su artículo
+        limit: Pasajes a elegir como máximo
+        mmr_lambda: 1 = solo relevancia; menor = más diversidad
+        max_per_article: Pasajes por artículo como máximo (0 = sin límite)
+        vectors: Vectores normalizados de los candidatos (filas), opcional
+
+    Returns:
+        List[int]: Posiciones de los candidatos elegidos, en orden de elección
+    """
+    n = len(relevance)
+    if n == 0 or limit <= 0:
+        return []
+
+    top = relevance.max()
+    relevance = relevance / top if top > 0 else np.zeros(n, dtype=np.float32)
+    lengths = np.maximum(ends - starts, 1)
+
+    max_similarity = np.zeros(n, dtype=np.float32)
+    available = np.ones(n, dtype=bool)
+    per_article: Dict[int, int] = {}
+    selected: List[int] = []
+
+    while len(selected) < limit:
+        marginal = np.where(available, mmr_lambda * relevance - (1 - mmr_lambda) * max_similarity, -np.inf)
+        chosen = int(np.argmax(marginal))
+        if not available[chosen]:
+            break
+
+        selected.append(chosen)
+        available[chosen] = False
+
+        article = int(articles[chosen])
+        per_article[article] = per_article.get(article, 0) + 1
+        if max_per_article and per_article[article] >= max_per_article:
+            available &= articles != article
+        if not available.any():
+            break
+
+        # Similitud de todos los candidatos con el recién elegido
+        same_article = articles == article
+        overlap = np.minimum(ends, ends[chosen]) - np.maximum(starts, starts[chosen])
+        similarity = np.where(
+            same_article, np.clip(overlap / np.minimum(lengths, lengths[chosen]), 0.0, 1.0), 0.0
+        ).astype(np.float32)
+        if vectors is not None:
+            np.maximum(similarity, vectors @ vectors[chosen], out=similarity)
+        np.maximum(max_similarity, similarity, out=max_similarity)
+
+    return selected
@@ -1,123 +1,1382 @@
 # from sentence_transformers import SentenceTransformer  # DESACTIVADO
-# import numpy as np  # DESACTIVADO
-from typing import List, Dict, Optional
+import numpy as np
+from typing import Callable, List, Dict, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from contextlib import contextmanager
+import asyncio
+import functools
 import json
+import os
+import shutil
+import threading
+from .search_index import InvertedIndex
+from .analyzer import SpanishAnalyzer, spanish_analyzer
+from .vector_store import VectorMatrix
+from .ann_index import create_vector_index, needs_full_vectors
+from .vectorizer import HashingVectorizer
+from .chunking import chunk_text
+from .query_cache import QueryCache
+from .facets import FACET_FIELDS, FacetIndex, article_facets
+from .records import ArticleRecord, PassageView, SearchResult, TextBuffer
+from .sharding import ShardedSearchPool
+from .diversity import lexical_overlap, mmr_select
+
+try:
+    import fcntl
+except ImportError:  # Windows: solo se serializan los guardados del propio proceso
+    fcntl = None
 
 class EmbeddingManager:
     """
-    Gestor de embeddings para búsqueda semántica (MODO DEGRADADO)
+    Gestor de embeddings para búsqueda semántica
     
     Esta clase maneja:
-    - Creación de embeddings (DESACTIVADO)
+    - Creación de embeddings (solo si se configura un modelo)
     - Almacenamiento en memoria
-    - Búsqueda por similitud (DESACTIVADO)
+    - Búsqueda por similitud coseno sobre una matriz incremental
+    - Búsqueda léxica BM25 sobre un índice invertido
+    - Altas, reemplazos y bajas por ID de artículo (sin duplicados)
+    - Indexación por pasajes solapados con offsets dentro del contenido
+    - Búsqueda híbrida (léxica + vectorial) fusionada con reciprocal rank fusion
+    - Análisis de texto en español (tildes, palabras vacías, stemming) para BM25
+    - Caché de resultados invalidada por la generación del índice
+    - Filtros por metadatos (categoría, etiquetas, visibilidad, estado) con bitmaps
+    - Modo con shards: búsqueda scatter-gather en varios procesos (ver sharding)
+    - Diversidad tras la recuperación: MMR, máximo de pasajes por artículo y
+      re-ranking léxico opcional (ver diversity)
     """
     
-    def __init__(self):
-        """Inicializar el gestor de embeddings en modo degradado"""
-        print("⚠️  EmbeddingManager en MODO DEGRADADO - IA desactivada")
+    # Similitud mínima por defecto para considerar relevante un resultado
+    DEFAULT_RELEVANCE_THRESHOLD = 0.3
+    
+    # Versión del formato de los snapshots en disco
+    SNAPSHOT_FORMAT_VERSION = 4
+    
+    # Pasajes candidatos por artículo pedido (para agregar por artículo)
+    PASSAGE_CANDIDATES_PER_RESULT = 5
+    
+    # Candidatos por artículo pedido cuando se aplica el re-ranking léxico
+    RERANK_CANDIDATES_PER_RESULT = 20
+    
+    # Constante de suavizado de reciprocal rank fusion (valor habitual: 60)
+    RRF_K = 60
+    
+    # Modos de búsqueda ("auto" = híbrida si hay embeddings, BM25 si no)
+    SEARCH_MODES = ("auto", "hybrid", "vector", "lexical")
+    
+    def __init__(self, model=None, vector_dtype: str = "float32",
+                 vector_index: str = "exact", vector_index_params: Optional[Dict] = None,
+                 compaction_ratio: float = 0.25, min_compaction_tombstones: int = 64,
+                 passage_size: int = 800, passage_overlap: int = 150,
+                 analyzer: Optional[SpanishAnalyzer] = None,
+                 query_cache: Optional[QueryCache] = None, shards: int = 1,
+                 vector_storage_dir: Optional[str] = None, mmr_lambda: float = 0.7,
+                 max_passages_per_article: int = 3, rerank_weight: float = 0.0):
+        """
+        Inicializar el gestor de embeddings
+        
+        Args:
+            model: Modelo con método encode(textos) -> np.ndarray (None = modo degradado)
+            vector_dtype: Almacenamiento de los vectores ("float32" o "float16")
+            vector_index: Índice vectorial ("exact", "ivf" aproximado o comprimido:
+                "int8" / "pq", con reordenación exacta de los mejores candidatos)
+            vector_index_params: Parámetros del índice vectorial (nlist, nprobe, ...)
+            compaction_ratio: Fracción de lápidas que dispara la compactación
+            min_compaction_tombstones: Mínimo de lápidas antes de compactar
+            passage_size: Longitud aproximada de cada pasaje (caracteres)
+            passage_overlap: Solapamiento entre pasajes consecutivos (caracteres)
+            analyzer: Analizador de texto del índice léxico (por defecto, español)
+            query_cache: Caché de resultados de búsqueda
+            shards: Procesos entre los que se reparte la búsqueda (1 = en este proceso)
+            vector_storage_dir: Directorio en disco para mapear en memoria los vectores
+                en precisión completa (None = en RAM). Con un índice comprimido solo
+                los códigos ocupan RAM si sus vectores se mapean aquí o, sin
+                reordenación (rerank=0), si se descartan tras codificarlos. Debe
+                ser un disco real: en Cloud Run /tmp está en memoria
+            mmr_lambda: Equilibrio relevancia/diversidad de MMR entre los pasajes
+                recuperados (1 = sin diversidad)
+            max_passages_per_article: Pasajes por artículo como máximo en los
+                resultados (0 = sin límite)
+            rerank_weight: Peso del re-ranking por cobertura de los términos de la
+                consulta, sobre más candidatos (0 = desactivado)
+        """
+        if model is None:
+            print("⚠️  EmbeddingManager en MODO DEGRADADO - IA desactivada")
+        
+        # Modelo de embeddings (None = solo búsqueda léxica)
+        self.model = model
+        
+        # Almacenar artículos vivos por ID y los embeddings de sus pasajes (fila = ID interno)
+        self.articles_data: Dict[str, ArticleRecord] = {}
+        self.passage_size = passage_size
+        self.passage_overlap = passage_overlap
+        self.vector_index_params = vector_index_params or {}
+        # Los índices comprimidos sin reordenación no vuelven a leer los vectores completos
+        self.keep_full_vectors = needs_full_vectors(vector_index, self.vector_index_params)
+        self.vector_storage_dir = vector_storage_dir
+        self.embeddings_matrix = self._new_matrix(vector_dtype)
+        
+        # Índice vectorial intercambiable sobre la matriz (exacto o aproximado)
+        self.vector_index = create_vector_index(
+            vector_index, self.embeddings_matrix, **self.vector_index_params
+        )
+        
+        # ID interno (posición en los índices) -> (artículo, inicio, fin); None = lápida
+        self._passages: List[Optional[Tuple[str, int, int]]] = []
+        self._article_passages: Dict[str, List[int]] = {}
+        # Términos analizados de cada pasaje, calculados una vez al indexar
+        # (None = pendiente de recalcular, por ejemplo tras cargar un snapshot)
+        self._passage_terms: List[Optional[List[str]]] = []
+        self._tombstones = 0
+        self.compaction_ratio = compaction_ratio
+        self.min_compaction_tombstones = min_compaction_tombstones
+        self._lock = threading.RLock()
+        # Serializa los guardados de snapshots (ver save_snapshot)
+        self._snapshot_lock = threading.Lock()
+        
+        # Hilo auxiliar para ejecutar el recuperador vectorial en paralelo al léxico
+        self._retriever_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="retriever")
+        
+        # Hilos para el trabajo de CPU pedido desde handlers async (ver offload):
+        # uno por núcleo, separados del threadpool de Starlette
+        self._scoring_pool = ThreadPoolExecutor(max_workers=os.cpu_count() or 1, thread_name_prefix="scoring")
+        
+        # Generación del índice: aumenta con cada alta, edición o baja e
+        # invalida los resultados cacheados calculados antes del cambio
+        self.generation = 0
+        self.query_cache = query_cache or QueryCache()
         
-        # Modelo desactivado para arranque rápido
-        self.model = None
+        # Cambios registrados mientras se construye un índice en sombra
+        self._change_capture: Optional[List] = None
         
-        # Almacenar artículos y sus embeddings
-        self.articles_data = []
-        self.embeddings_matrix = None
+        # Destino de las altas y bajas cuando este proceso solo lee un índice
+        # compartido (ver index_sharing): se reenvían en lugar de aplicarse aquí
+        self.change_sink: Optional[Callable[[str, object], None]] = None
         
-        print("✅ EmbeddingManager inicializado en modo degradado")
+        # Nombre del último snapshot guardado o cargado
+        self.snapshot_name: Optional[str] = None
+        
+        # Índice invertido (BM25) mantenido al agregar artículos
+        self.analyzer = analyzer or spanish_analyzer
+        self.lexical_index = InvertedIndex()
+        
+        # Bitmaps de metadatos por posición, para filtrar antes de puntuar
+        self.facet_index = FacetIndex()
+        
+        # Etapa posterior a la recuperación (ver _diversify)
+        self.mmr_lambda = mmr_lambda
+        self.max_passages_per_article = max_passages_per_article
+        self.rerank_weight = rerank_weight
+        
+        # Índice repartido en procesos que resuelve las búsquedas (shards > 1).
+        # Con shards este proceso solo guarda los registros y sus metadatos
+        # (snapshots, reindexación, vistas de resultados): los pasajes, los
+        # postings y los vectores se calculan y guardan solo en los shards
+        self.shard_pool: Optional[ShardedSearchPool] = None
+        self.index_locally = shards <= 1
+        if shards > 1:
+            self.shard_pool = ShardedSearchPool(shards, self._manager_params())
+        
+        mode = "con embeddings" if model is not None else "en modo degradado"
+        print(f"✅ EmbeddingManager inicializado {mode}")
     
-    def add_article_embedding(self, article_id: str, title: str, content: str):
+    @property
+    def relevance_threshold(self) -> float:
+        """Similitud mínima para considerar relevante un resultado en el modo actual"""
+        if self.model is None:
+            return self.DEFAULT_RELEVANCE_THRESHOLD
+        return getattr(self.model, "relevance_threshold", self.DEFAULT_RELEVANCE_THRESHOLD)
+    
+    def _new_matrix(self, dtype: str, initial_capacity: int = 64) -> VectorMatrix:
+        """Matriz de vectores vacía con el almacenamiento configurado"""
+        return VectorMatrix(dtype=dtype, initial_capacity=initial_capacity,
+                            storage_dir=self.vector_storage_dir, keep_rows=self.keep_full_vectors)
+    
+    def _encode(self, texts: List[str]) -> np.ndarray:
         """
-        Agregar artículo al sistema de embeddings (MODO DEGRADADO)
+        Crear embeddings con el modelo configurado
+        
+        Args:
+            texts: Textos a vectorizar
+        
+        Returns:
+            np.ndarray: Matriz (n, d) de embeddings
+        """
+        return np.atleast_2d(np.asarray(self.model.encode(texts), dtype=np.float32))
+    
+    def add_article_embedding(self, article_id: str, title: str, content: str,
+                              status: str = "published", category: Optional[str] = None,
+                              tags: Optional[List[str]] = None, visibility: Optional[str] = None,
+                              version: Optional[int] = None):
+        """
+        Agregar o reemplazar artículo en el sistema de embeddings
+        
+        Si el artículo ya estaba indexado se reemplaza en su misma posición.
+        Los artículos archivados se retiran del índice.
         
         Args:
             article_id: ID único del artículo
             title: Título del artículo
             content: Contenido del artículo
+            status: Estado del artículo en Firestore
+            category: Categoría del artículo
+            tags: Etiquetas del artículo
+            visibility: Visibilidad del artículo
+            version: Versión del artículo en Firestore
         """
         try:
-            print(f"⚠️  Modo degradado: Artículo {article_id} guardado sin embeddings")
+            if status == "archived":
+                self.remove_article(article_id)
+                return
             
-            # Solo guardar datos básicos, sin embeddings
-            article_data = {
+            replaced = article_id in self.articles_data
+            self.add_articles_bulk([{
                 "id": article_id,
                 "title": title,
                 "content": content,
-                "full_text": f"{title}\n\n{content}",
-                "embedding": None  # Sin embedding
-            }
-            
-            self.articles_data.append(article_data)
+                "status": status,
+                "category": category,
+                "tags": tags,
+                "visibility": visibility,
+                "version": version
+            }])
             
-            print(f"✅ Artículo {article_id} agregado (sin embeddings)")
+            action = "reemplazado" if replaced else "agregado"
+            detail = "con embedding" if self.model is not None else "sin embeddings"
+            print(f"✅ Artículo {article_id} {action} ({detail})")
             
         except Exception as e:
             print(f"❌ Error agregando artículo: {str(e)}")
             raise e
     
-    def _rebuild_embeddings_matrix(self):
+    def add_articles_bulk(self, articles: List[Dict], encode: bool = True) -> int:
+        """
+        Agregar o reemplazar varios artículos vectorizándolos en un solo lote
+        
+        Args:
+            articles: Artículos (dicts de Firestore) con id, title, content, status y
+                opcionalmente category, tags y visibility
+            encode: False para diferir la vectorización (ver _rebuild_embeddings_matrix)
+            
+        Returns:
+            int: Número de artículos indexados (los archivados se retiran)
+        """
+        if self.change_sink is not None:
+            for article in articles:
+                if article.get("status") == "archived":
+                    self.change_sink("remove", article["id"])
+                else:
+                    self.change_sink("upsert", ArticleRecord.from_dict(article).to_dict())
+            return len(articles)
+        
+        if not self.index_locally:
+            return self._store_records(articles)
+        
+        batch = []
+        for article in articles:
+            if article.get("status") == "archived":
+                self.remove_article(article["id"])
+                continue
+            
+            record = ArticleRecord.from_dict(article)
+            spans = chunk_text(record.content, self.passage_size, self.passage_overlap)
+            # El análisis se hace aquí, fuera del lock, y se guarda con el pasaje
+            terms = [self.analyzer.analyze(record.passage_text(start, end)) for start, end in spans]
+            batch.append((record, spans, terms))
+        
+        if not batch:
+            return 0
+        
+        # Vectorizar todos los pasajes del lote fuera del lock (es la parte costosa)
+        embeddings = None
+        if self.model is not None and encode:
+            texts = [
+                record.passage_text(start, end)
+                for record, spans, _ in batch
+                for start, end in spans
+            ]
+            if hasattr(self.model, "partial_fit"):
+                self.model.partial_fit(texts)
+            embeddings = self._encode(texts)
+        
+        with self._lock:
+            offset = 0
+            for record, spans, terms in batch:
+                passage_embeddings = None
+                if embeddings is not None:
+                    passage_embeddings = embeddings[offset:offset + len(spans)]
+                offset += len(spans)
+                
+                self._index_article(record, spans, terms, passage_embeddings)
+                if self._change_capture is not None:
+                    self._change_capture.append(("upsert", record))
+            
+            # Una versión más corta deja lápidas: las ediciones también compactan
+            self._maybe_compact()
+        
+        if self.shard_pool is not None:
+            self.shard_pool.upsert([record.to_dict() for record, _, _ in batch])
+        
+        return len(batch)
+    
+    def _store_records(self, articles: List[Dict]) -> int:
+        """
+        Guardar solo los registros y enviar la indexación a los shards
+        
+        Con shards, el análisis, la vectorización y los índices de cada
+        artículo solo se hacen en su shard: este proceso no duplica ni la
+        memoria ni la CPU de la ingesta.
+        
+        Args:
+            articles: Artículos (dicts de Firestore)
+            
+        Returns:
+            int: Número de artículos guardados (los archivados se retiran)
+        """
+        records = []
+        for article in articles:
+            if article.get("status") == "archived":
+                self.remove_article(article["id"])
+                continue
+            records.append(ArticleRecord.from_dict(article))
+        
+        if not records:
+            return 0
+        
+        # Primero los shards: un resultado cuyo registro aún no está aquí se omite
+        if self.shard_pool is not None:
+            self.shard_pool.upsert([record.to_dict() for record in records])
+        
+        with self._lock:
+            for record in records:
+                self.articles_data[record.id] = record
+                self.generation += 1
+                if self._change_capture is not None:
+                    self._change_capture.append(("upsert", record))
+        return len(records)
+    
+    def _index_article(self, record: ArticleRecord, spans: List[Tuple[int, int]],
+                       terms: List[List[str]], embeddings: Optional[np.ndarray]):
+        """
+        Escribir los pasajes de un artículo en los índices (requiere tener el lock)
+        
+        Los pasajes de la versión anterior se reemplazan en sus mismas
+        posiciones; si la nueva versión tiene menos pasajes, los sobrantes
+        quedan como lápidas.
+        
+        Args:
+            record: Registro del artículo
+            spans: Offsets (inicio, fin) de cada pasaje en el contenido
+            terms: Términos analizados de cada pasaje
+            embeddings: Vectores de los pasajes (None si no hay modelo)
+        """
+        article_id = record.id
+        old_slots = self._article_passages.get(article_id, [])
+        previous = self.articles_data.get(article_id)
+        
+        old_facets = article_facets(previous) if previous is not None else {}
+        for slot in old_slots:
+            self.lexical_index.remove_document(slot, self._terms_of(slot, previous))
+            self.facet_index.remove(slot, old_facets)
+        
+        facets = article_facets(record)
+        slots = []
+        for i, (start, end) in enumerate(spans):
+            if i < len(old_slots):
+                slot = old_slots[i]
+            else:
+                slot = len(self._passages)
+                self._passages.append(None)
+                self._passage_terms.append(None)
+            
+            self._passages[slot] = (article_id, start, end)
+            self._passage_terms[slot] = terms[i]
+            self.lexical_index.add_document(slot, terms[i])
+            self.facet_index.add(slot, facets)
+            if embeddings is not None:
+                self.embeddings_matrix.set_row(slot, embeddings[i])
+                self.vector_index.add(slot)
+            slots.append(slot)
+        
+        for slot in old_slots[len(spans):]:
+            self._tombstone_passage(slot)
+        
+        self._article_passages[article_id] = slots
+        self.articles_data[article_id] = record
+        self.generation += 1
+    
+    def _tombstone_passage(self, slot: int):
+        """Dejar una lápida en la posición de un pasaje (sus postings ya se quitaron)"""
+        self.vector_index.remove(slot)
+        self.embeddings_matrix.delete(slot)
+        self._passages[slot] = None
+        self._passage_terms[slot] = None
+        self._tombstones += 1
+    
+    def _terms_of(self, slot: int, record: ArticleRecord) -> List[str]:
+        """Términos indexados de un pasaje (desde la caché o analizándolo de nuevo)"""
+        terms = self._passage_terms[slot]
+        if terms is None:
+            _, start, end = self._passages[slot]
+            terms = self.analyzer.analyze(record.passage_text(start, end))
+        return terms
+    
+    def remove_article(self, article_id: str) -> bool:
+        """
+        Retirar un artículo del índice (por ejemplo, al archivarlo)
+        
+        Args:
+            article_id: ID único del artículo
+        
+        Returns:
+            bool: True si el artículo estaba indexado
+        """
+        if self.change_sink is not None:
+            self.change_sink("remove", article_id)
+            return article_id in self.articles_data
+        
+        with self._lock:
+            removed = self._unindex(article_id)
+            if removed:
+                self._maybe_compact()
+            if self._change_capture is not None:
+                self._change_capture.append(("remove", article_id))
+        
+        if removed:
+            if self.shard_pool is not None:
+                self.shard_pool.remove([article_id])
+            print(f"✅ Artículo {article_id} retirado del índice")
+        return removed
+    
+    def _unindex(self, article_id: str) -> bool:
+        """
+        Dejar lápidas en las posiciones de los pasajes del artículo y quitarlos de los índices
+        
+        Args:
+            article_id: ID único del artículo
+        
+        Returns:
+            bool: True si el artículo estaba indexado
+        """
+        slots = self._article_passages.pop(article_id, None)
+        record = self.articles_data.pop(article_id, None)
+        if record is None:
+            return False
+        
+        # Sin índice local (shards) el artículo solo tiene registro
+        facets = article_facets(record)
+        for slot in slots or ():
+            self.lexical_index.remove_document(slot, self._terms_of(slot, record))
+            self.facet_index.remove(slot, facets)
+            self._tombstone_passage(slot)
+        self.generation += 1
+        return True
+    
+    def _maybe_compact(self):
+        """Compactar si la proporción de lápidas supera el umbral"""
+        if (self._tombstones >= self.min_compaction_tombstones
+                and self._tombstones > self.compaction_ratio * len(self._passages)):
+            self.compact()
+    
+    def compact(self):
+        """
+        Eliminar las lápidas y renumerar los IDs internos de forma contigua
+        
+        Tras compactar, el tamaño del índice coincide con el corpus vivo.
+        """
+        with self._lock:
+            if not self._tombstones:
+                return
+            
+            old_rows = [slot for slot, passage in enumerate(self._passages) if passage is not None]
+            mapping = {old_row: new_id for new_id, old_row in enumerate(old_rows)}
+            
+            self.lexical_index.remap(mapping)
+            if len(self.embeddings_matrix):
+                self.embeddings_matrix.compact(old_rows)
+                self.vector_index.compact(old_rows)
+            self._passages = [self._passages[slot] for slot in old_rows]
+            self._passage_terms = [self._passage_terms[slot] for slot in old_rows]
+            self._article_passages = _group_passages(self._passages)
+            self.facet_index.rebuild(self._passages, self.articles_data)
+            
+            print(f"✅ Índice compactado: {self._tombstones} lápidas eliminadas")
+            self._tombstones = 0
+    
+    def _rebuild_embeddings_matrix(self, batch_size: int = 64,
+                                   progress: Optional[Callable[[int], None]] = None):
+        """
+        Reconstruir la matriz de embeddings desde cero (por ejemplo, al cambiar de modelo)
+        
+        Args:
+            batch_size: Pasajes vectorizados por lote
+            progress: Función llamada con (pasajes vectorizados, total) tras cada lote
+        """
+        if self.model is None:
+            print("⚠️  Modo degradado: Matriz de embeddings desactivada")
+            return
+        if not self.index_locally:
+            print("⚠️  Sin índice local: los shards vectorizan su parte del corpus")
+            return
+        
+        with self._lock:
+            self.compact()
+            texts = [
+                self.articles_data[article_id].passage_text(start, end)
+                for article_id, start, end in self._passages
+            ]
+            
+            # Reaprender el IDF desde el corpus vivo si el modelo lo soporta
+            if hasattr(self.model, "fit"):
+                self.model.fit(texts)
+            
+            matrix = self._new_matrix(self.embeddings_matrix.dtype, initial_capacity=max(len(texts), 1))
+            for start in range(0, len(texts), batch_size):
+                matrix.extend(self._encode(texts[start:start + batch_size]))
+                if progress is not None:
+                    progress(min(start + batch_size, len(texts)), len(texts))
+            
+            self.embeddings_matrix = matrix
+            self.vector_index = create_vector_index(
+                self.vector_index.kind, matrix, **self.vector_index_params
+            )
+            self.vector_index.rebuild()
+            self.generation += 1
+        
+        print(f"✅ Matriz de embeddings reconstruida: {len(texts)} pasajes")
+    
+    def create_shadow(self) -> "EmbeddingManager":
+        """
+        Crear un índice vacío con la misma configuración (para reconstrucciones)
+        
+        Returns:
+            EmbeddingManager: Índice en sombra con un modelo nuevo sin estado
+            (con shards, solo de registros: los shards se reparten el corpus al intercambiar)
+        """
+        shadow = EmbeddingManager(**self._manager_params())
+        shadow.index_locally = self.index_locally
+        return shadow
+    
+    def _manager_params(self) -> Dict:
+        """Argumentos para crear un índice con la misma configuración y un modelo nuevo sin estado"""
+        model = self.model
+        if model is not None and hasattr(model, "get_params"):
+            model = type(model)(**model.get_params())
+        
+        return {
+            "model": model,
+            "vector_dtype": self.embeddings_matrix.dtype,
+            "vector_index": self.vector_index.kind,
+            "vector_index_params": self.vector_index_params,
+            "compaction_ratio": self.compaction_ratio,
+            "min_compaction_tombstones": self.min_compaction_tombstones,
+            "passage_size": self.passage_size,
+            "passage_overlap": self.passage_overlap,
+            "analyzer": self.analyzer,
+            "vector_storage_dir": self.vector_storage_dir,
+            "mmr_lambda": self.mmr_lambda,
+            "max_passages_per_article": self.max_passages_per_article,
+            "rerank_weight": self.rerank_weight
+        }
+    
+    def _reset_shards(self):
+        """Repartir de nuevo todo el corpus entre los shards (tras cargar o intercambiar el índice)"""
+        if self.shard_pool is None:
+            return
+        with self._lock:
+            articles = [record.to_dict() for record in self.articles_data.values()]
+        self.shard_pool.reset(articles)
+    
+    def start_change_capture(self):
+        """Registrar altas y bajas a partir de ahora para reaplicarlas en un índice en sombra"""
+        with self._lock:
+            self._change_capture = []
+    
+    def stop_change_capture(self):
+        """Dejar de registrar cambios"""
+        with self._lock:
+            self._change_capture = None
+    
+    def swap_index(self, shadow: "EmbeddingManager"):
+        """
+        Reemplazar atómicamente el contenido del índice por el de un índice en sombra
+        
+        Los cambios registrados desde start_change_capture se reaplican en la
+        sombra antes del intercambio, así que no se pierden altas ni bajas
+        hechas durante la reconstrucción. Las búsquedas toman el mismo lock,
+        por lo que nunca ven un estado mezclado.
+        
+        Args:
+            shadow: Índice construido en segundo plano
+        """
+        with self._lock:
+            for operation, payload in self._change_capture or []:
+                if operation == "upsert":
+                    shadow.add_articles_bulk([payload.to_dict()])
+                else:
+                    shadow.remove_article(payload)
+            self._change_capture = None
+            
+            self.model = shadow.model
+            self.articles_data = shadow.articles_data
+            self._passages = shadow._passages
+            self._article_passages = shadow._article_passages
+            self._passage_terms = shadow._passage_terms
+            self._tombstones = shadow._tombstones
+            self.lexical_index = shadow.lexical_index
+            self.facet_index = shadow.facet_index
+            self.embeddings_matrix = shadow.embeddings_matrix
+            self.vector_index = shadow.vector_index
+            self.generation += 1
+        
+        self._reset_shards()
+        print(f"✅ Índice intercambiado: {len(self.articles_data)} artículos")
+    
+    async def offload(self, function: Callable, *args, **kwargs):
+        """
+        Ejecutar trabajo de CPU del índice fuera del event loop
+        
+        Para handlers async: la puntuación (BM25, similitud, fusión) y la
+        indexación corren en el pool de puntuación y el event loop sigue
+        atendiendo otras peticiones mientras tanto.
+        
+        Args:
+            function: Método a ejecutar (por ejemplo, search_similar_articles)
+            *args, **kwargs: Argumentos del método
+            
+        Returns:
+            El resultado del método
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._scoring_pool, functools.partial(function, *args, **kwargs))
+    
+    def _resolve_search_mode(self, mode: str) -> str:
+        """Traducir el modo pedido al modo efectivo según lo que haya indexado"""
+        if mode not in self.SEARCH_MODES:
+            raise ValueError(f"Modo de búsqueda no soportado: {mode}")
+        
+        if self.index_locally:
+            has_vectors = self.model is not None and len(self.embeddings_matrix) > 0
+        else:
+            # Los vectores están en los shards, que vectorizan todo lo que reciben
+            has_vectors = self.model is not None and bool(self.articles_data)
+        if not has_vectors:
+            return "lexical"
+        if mode == "auto":
+            return "hybrid"
+        return mode
+    
+    def _filter_mask(self, filters: Optional[Dict[str, List[str]]]) -> Optional[np.ndarray]:
+        """Máscara de posiciones que cumplen los filtros (requiere tener el lock)"""
+        if not filters:
+            return None
+        return self.facet_index.mask(filters, len(self._passages))
+    
+    def _vector_hits(self, queries: List[str], candidates: int,
+                     filters: Optional[Dict[str, List[str]]] = None) -> List[List[Tuple[Tuple[str, int, int], float]]]:
+        """
+        Recuperar pasajes por similitud coseno para una o varias consultas
+        
+        Todas las consultas se vectorizan en un lote y se puntúan juntas
+        (producto matriz-matriz con el índice exacto).
+        
+        Returns:
+            List[List[Tuple[Tuple[str, int, int], float]]]: Por consulta, (pasaje, similitud)
+            en orden de relevancia
+        """
+        # Vectorizar las consultas fuera del lock (es la parte costosa)
+        query_embeddings = self._encode(queries)
+        with self._lock:
+            allowed = self._filter_mask(filters)
+            return [
+                [(self._passages[slot], max(score, 0.0)) for slot, score in hits]
+                for hits in self.vector_index.search_batch(query_embeddings, candidates, allowed)
+            ]
+    
+    def _lexical_hits(self, queries: List[str], candidates: int,
+                      filters: Optional[Dict[str, List[str]]] = None) -> List[List[Tuple[Tuple[str, int, int], float, float]]]:
+        """
+        Recuperar pasajes por BM25 para una o varias consultas
+        
+        Los postings de un término compartido por varias consultas se recorren una vez.
+        
+        Returns:
+            List[List[Tuple[Tuple[str, int, int], float, float]]]: Por consulta, (pasaje, bm25,
+            similitud normalizada) en orden de relevancia
+        """
+        # En la consulta solo se analiza su propio texto: los pasajes ya están analizados
+        terms = [self.analyzer.analyze(query) for query in queries]
+        with self._lock:
+            allowed = self._filter_mask(filters)
+            # Solo se recorren los postings de los términos de las consultas
+            return [
+                [(self._passages[slot], score, similarity) for slot, score, similarity in hits]
+                for hits in self.lexical_index.search_many(terms, candidates, allowed)
+            ]
+    
+    def _passage_hits(self, queries: List[str], k: int, mode: str, lexical_weight: float,
+                      vector_weight: float, filters: Dict[str, List[str]]) -> List[List[Tuple[Tuple[str, int, int], Dict]]]:
+        """
+        Recuperar y puntuar pasajes para una o varias consultas según el modo
+        
+        Returns:
+            List[List[Tuple[Tuple[str, int, int], Dict]]]: Por consulta, (pasaje, puntuaciones)
+            en orden de relevancia
+        """
+        # Cada recuperador pide los mismos candidatos que usaría solo (más si
+        # luego se reordenan con el re-ranking léxico)
+        per_result = self.RERANK_CANDIDATES_PER_RESULT if self.rerank_weight > 0 else self.PASSAGE_CANDIDATES_PER_RESULT
+        candidates = max(k * per_result, k)
+        
+        if mode == "vector":
+            return [
+                [(passage, {"similarity_score": similarity}) for passage, similarity in hits]
+                for hits in self._vector_hits(queries, candidates, filters)
+            ]
+        if mode == "lexical":
+            return [
+                [(passage, {"similarity_score": similarity, "bm25_score": score})
+                 for passage, score, similarity in hits]
+                for hits in self._lexical_hits(queries, candidates, filters)
+            ]
+        
+        # La vectorización de las consultas se solapa con la búsqueda BM25;
+        # un recuperador con peso 0 no se ejecuta
+        no_hits = [[] for _ in queries]
+        vector_future = None
+        if vector_weight > 0:
+            vector_future = self._retriever_pool.submit(self._vector_hits, queries, candidates, filters)
+        lexical_hits = self._lexical_hits(queries, candidates, filters) if lexical_weight > 0 else no_hits
+        vector_hits = vector_future.result() if vector_future is not None else no_hits
+        return [
+            self._fuse_hits(vector, lexical, vector_weight, lexical_weight)
+            for vector, lexical in zip(vector_hits, lexical_hits)
+        ]
+    
+    def _diversify(self, query: str, hits: List[Tuple[Tuple[str, int, int], Dict]],
+                   k: int) -> List[Tuple[Tuple[str, int, int], Dict]]:
+        """
+        Etapa posterior a la recuperación: re-ranking léxico, MMR y máximo por artículo
+        
+        Sin esta etapa el top-k suele ser varias ventanas casi idénticas del
+        mismo artículo. Opcionalmente la relevancia se combina primero con la
+        cobertura (ponderada por IDF) de los términos de la consulta en cada
+        pasaje; después MMR elige pasajes relevantes pero distintos entre sí
+        (coseno de sus vectores y solapamiento de texto) con como mucho
+        max_passages_per_article por artículo. Todo es vectorial sobre los
+        candidatos.
+        
+        Returns:
+            List[Tuple[Tuple[str, int, int], Dict]]: Pasajes elegidos, en orden de elección
+        """
+        if not hits or (self.mmr_lambda >= 1.0 and not self.max_passages_per_article and self.rerank_weight <= 0):
+            return hits
+        
+        codes: Dict[str, int] = {}
+        count = len(hits)
+        articles = np.fromiter((codes.setdefault(passage[0], len(codes)) for passage, _ in hits), np.int32, count)
+        starts = np.fromiter((passage[1] for passage, _ in hits), np.int64, count)
+        ends = np.fromiter((passage[2] for passage, _ in hits), np.int64, count)
+        # Relevancia con la que se ordenaron los candidatos
+        relevance = np.fromiter(
+            (scores.get("rrf_score", scores.get("bm25_score", scores["similarity_score"])) for _, scores in hits),
+            np.float32, count
+        )
+        
+        vectors = None
+        with self._lock:
+            slots = [self._slot_of(passage) for passage, _ in hits]
+            
+            if self.rerank_weight > 0:
+                query_terms = self.analyzer.analyze(query)
+                passage_terms = [
+                    self._terms_of(slot, self.articles_data[passage[0]]) if slot is not None else []
+                    for slot, (passage, _) in zip(slots, hits)
+                ]
+                coverage = lexical_overlap(
+                    query_terms, passage_terms, {term: self.lexical_index.idf(term) for term in query_terms}
+                )
+                top = relevance.max()
+                relevance = (1 - self.rerank_weight) * (relevance / top if top > 0 else relevance) \
+                    + self.rerank_weight * coverage
+            
+            if (self.mmr_lambda < 1.0 and self.model is not None and None not in slots
+                    and self.embeddings_matrix.keep_rows and len(self.embeddings_matrix) > max(slots)):
+                vectors = self.embeddings_matrix.rows_for(slots)
+        
+        cap = self.max_passages_per_article
+        selected = mmr_select(
+            relevance, articles, starts, ends,
+            limit=k * cap if cap else count,
+            mmr_lambda=self.mmr_lambda,
+            max_per_article=cap,
+            vectors=vectors
+        )
+        return [hits[position] for position in selected]
+    
+    def _slot_of(self, passage: Tuple[str, int, int]) -> Optional[int]:
+        """Posición de un pasaje vivo en los índices (requiere tener el lock)"""
+        for slot in self._article_passages.get(passage[0], ()):
+            if self._passages[slot] == passage:
+                return slot
+        return None
+    
+    def _group_hits(self, hits: List[Tuple[Tuple[str, int, int], Dict]], k: int) -> List[SearchResult]:
+        """Agregar pasajes por artículo conservando el orden de relevancia (k artículos como máximo)"""
+        grouped: Dict[str, SearchResult] = {}
+        with self._lock:
+            for (article_id, start, end), scores in hits:
+                record = self.articles_data.get(article_id)
+                if record is None:
+                    # Artículo retirado entre la búsqueda y la agregación
+                    continue
+                
+                entry = grouped.get(article_id)
+                if entry is None:
+                    if len(grouped) == k:
+                        continue
+                    # Vista sobre el registro: no se copia el artículo
+                    entry = SearchResult(record, scores, [])
+                    grouped[article_id] = entry
+                entry.passages.append(PassageView(record, start, end, scores["similarity_score"]))
+        
+        return list(grouped.values())
+    
+    @staticmethod
+    def _canonical_filters(filters: Optional[Dict[str, List[str]]]) -> Dict[str, List[str]]:
+        """
+        Validar los filtros y llevarlos a su forma canónica (también forma parte de la clave de caché)
+        
+        Raises:
+            ValueError: Si un campo de filtro no existe
+        """
+        unknown = set(filters or {}) - set(FACET_FIELDS)
+        if unknown:
+            raise ValueError(f"Campos de filtro no soportados: {sorted(unknown)}")
+        return {
+            field: sorted({str(value).strip().lower() for value in values})
+            for field, values in (filters or {}).items() if values
+        }
+    
+    def _cache_key(self, query: str, k: int, mode: str, lexical_weight: float,
+                   vector_weight: float, filters: Dict[str, List[str]]) -> Tuple:
+        """Clave de caché de una consulta: las consultas que se normalizan igual comparten clave"""
+        return (
+            " ".join(self.analyzer.normalize(query)), k, mode, lexical_weight, vector_weight,
+            tuple((field, tuple(values)) for field, values in sorted(filters.items()))
+        )
+    
+    def request_key(self, query: str, k: int = 3, mode: str = "auto", lexical_weight: float = 1.0,
+                    vector_weight: float = 1.0, filters: Optional[Dict[str, List[str]]] = None) -> Tuple:
         """
-        Reconstruir matriz de embeddings (DESACTIVADO)
+        Clave de una búsqueda: dos búsquedas con la misma clave dan el mismo resultado
+        
+        Usa la misma normalización que la caché de resultados (pregunta
+        normalizada y filtros canónicos).
+        
+        Raises:
+            ValueError: Si un campo de filtro no existe
         """
-        print("⚠️  Modo degradado: Matriz de embeddings desactivada")
-        self.embeddings_matrix = None
+        return self._cache_key(query, k, mode, lexical_weight, vector_weight, self._canonical_filters(filters))
     
-    def search_similar_articles(self, query: str, k: int = 3) -> List[Dict]:
+    def _fuse_hits(self, vector_hits: List, lexical_hits: List,
+                   vector_weight: float, lexical_weight: float) -> List[Tuple[Tuple[str, int, int], Dict]]:
         """
-        Buscar artículos similares (MODO DEGRADADO - búsqueda por texto)
+        Fusionar dos rankings de pasajes con reciprocal rank fusion
+        
+        Cada pasaje suma peso / (RRF_K + posición) por cada ranking en el que
+        aparece. Su similarity_score es la mayor similitud de ambos recuperadores.
+        
+        Returns:
+            List[Tuple[Tuple[str, int, int], Dict]]: (pasaje, puntuaciones) ordenados por rrf_score
+        """
+        fused: Dict[Tuple[str, int, int], Dict] = {}
+        
+        for rank, (passage, similarity) in enumerate(vector_hits, 1):
+            scores = fused.setdefault(passage, {"rrf_score": 0.0, "similarity_score": 0.0})
+            scores["rrf_score"] += vector_weight / (self.RRF_K + rank)
+            scores["vector_score"] = similarity
+            scores["similarity_score"] = max(scores["similarity_score"], similarity)
+        
+        for rank, (passage, score, similarity) in enumerate(lexical_hits, 1):
+            scores = fused.setdefault(passage, {"rrf_score": 0.0, "similarity_score": 0.0})
+            scores["rrf_score"] += lexical_weight / (self.RRF_K + rank)
+            scores["bm25_score"] = score
+            scores["similarity_score"] = max(scores["similarity_score"], similarity)
+        
+        return sorted(fused.items(), key=lambda item: item[1]["rrf_score"], reverse=True)
+    
+    def search_similar_articles(self, query: str, k: int = 3, mode: str = "auto",
+                                lexical_weight: float = 1.0, vector_weight: float = 1.0,
+                                filters: Optional[Dict[str, List[str]]] = None) -> List[SearchResult]:
+        """
+        Buscar artículos similares
+        
+        Modos:
+        - vector: similitud coseno sobre los embeddings
+        - lexical: BM25 sobre el índice invertido
+        - hybrid: ambos recuperadores en paralelo, fusionados con reciprocal rank fusion
+        - auto: hybrid si hay embeddings y lexical en caso contrario
+        
+        La búsqueda puntúa pasajes y los agrega por artículo: la relevancia de
+        un artículo es la de su mejor pasaje y se devuelven sus pasajes
+        coincidentes con sus offsets.
+        
+        Con shards el orden es una aproximación del de un único índice: cada
+        shard puntúa con sus propias estadísticas (IDF de BM25 y del
+        vectorizador) y hace su propia etapa de diversidad; los top-k de los
+        shards se fusionan por BM25 bruto, coseno o una RRF global. Con
+        shards de tamaño parecido suelen coincidir los primeros resultados,
+        pero el orden de los siguientes puede cambiar.
+        
+        Los filtros se resuelven con los bitmaps de metadatos antes de puntuar,
+        así que no consumen posiciones del top-k.
         
         Args:
             query: Consulta del usuario
             k: Número de artículos a retornar
-            
+            mode: Modo de búsqueda (ver arriba)
+            lexical_weight: Peso del ranking BM25 en la fusión híbrida
+            vector_weight: Peso del ranking vectorial en la fusión híbrida
+            filters: Campo (category, tags, visibility, status) -> valores aceptados;
+                OR dentro de un campo y AND entre campos
+        
         Returns:
-            List[Dict]: Lista de artículos encontrados por búsqueda de texto
+            List[SearchResult]: Artículos ordenados por relevancia (vistas de solo
+            lectura con acceso tipo dict), cada uno con la lista "passages"
+            (start, end, text, similarity_score)
+        
+        Raises:
+            ValueError: Si el modo de búsqueda o un campo de filtro no existen
         """
+        mode = self._resolve_search_mode(mode)
+        filters = self._canonical_filters(filters)
+        
         try:
             if not self.articles_data:
                 print("⚠️ No hay artículos indexados para buscar")
                 return []
             
-            print(f"⚠️  Modo degradado: Búsqueda por texto simple para: '{query[:50]}...'")
-            
-            # Búsqueda simple por texto (sin embeddings)
-            query_lower = query.lower()
-            results = []
+            # Las consultas repetidas se sirven desde la caché mientras el índice no cambie
+            generation = self.generation
+            cache_key = self._cache_key(query, k, mode, lexical_weight, vector_weight, filters)
+            cached = self.query_cache.get(cache_key, generation)
+            if cached is not None:
+                print(f"✅ {len(cached)} artículos encontrados (caché)")
+                return list(cached)
             
-            for article in self.articles_data:
-                # Buscar en título y contenido
-                title_match = query_lower in article["title"].lower()
-                content_match = query_lower in article["content"].lower()
-                
-                if title_match or content_match:
-                    article_copy = article.copy()
-                    article_copy["similarity_score"] = 0.8 if title_match else 0.6  # Score fijo
-                    article_copy.pop("embedding", None)  # Remover embedding si existe
-                    results.append(article_copy)
+            print(f"🔍 Búsqueda {mode} para: '{query[:50]}...'")
             
-            # Limitar resultados
-            results = results[:k]
+            if self.shard_pool is not None:
+                results = self._sharded_search(query, k, mode, lexical_weight, vector_weight, filters)
+                self.query_cache.put(cache_key, generation, results)
+                print(f"✅ {len(results)} artículos encontrados (búsqueda {mode}, {self.shard_pool.shards} shards)")
+                return list(results)
             
-            print(f"✅ {len(results)} artículos encontrados (búsqueda por texto)")
-            return results
+            hits = self._passage_hits([query], k, mode, lexical_weight, vector_weight, filters)[0]
+            results = self._group_hits(self._diversify(query, hits, k), k)
             
+            self.query_cache.put(cache_key, generation, results)
+            print(f"✅ {len(results)} artículos encontrados (búsqueda {mode})")
+            return list(results)
+        
         except Exception as e:
             print(f"❌ Error buscando artículos: {str(e)}")
             return []
     
+    def search_many(self, queries: List[str], k: int = 3, mode: str = "auto",
+                    lexical_weight: float = 1.0, vector_weight: float = 1.0,
+                    filters: Optional[Dict[str, List[str]]] = None) -> List[List[SearchResult]]:
+        """
+        Buscar varias consultas en un solo lote
+        
+        Las consultas idénticas (tras normalizarlas) se resuelven una vez y las
+        que están en caché no se recalculan. El resto se vectoriza en un lote y
+        se puntúa junto: un producto matriz-matriz para los vectores y un solo
+        recorrido de los postings de cada término para BM25. Con shards, cada
+        consulta se reparte entre ellos como en search_similar_articles.
+        
+        Args:
+            queries: Consultas del usuario
+            k: Número de artículos a retornar por consulta
+            mode: Modo de búsqueda (ver search_similar_articles)
+            lexical_weight: Peso del ranking BM25 en la fusión híbrida
+            vector_weight: Peso del ranking vectorial en la fusión híbrida
+            filters: Filtros de metadatos, comunes a todas las consultas
+        
+        Returns:
+            List[List[SearchResult]]: Resultados de cada consulta, en el orden recibido
+        
+        Raises:
+            ValueError: Si el modo de búsqueda o un campo de filtro no existen
+        """
+        mode = self._resolve_search_mode(mode)
+        filters = self._canonical_filters(filters)
+        
+        try:
+            if not self.articles_data:
+                print("⚠️ No hay artículos indexados para buscar")
+                return [[] for _ in queries]
+            
+            generation = self.generation
+            keys = [self._cache_key(query, k, mode, lexical_weight, vector_weight, filters) for query in queries]
+            
+            # Consultas distintas que no están en caché
+            resolved: Dict[Tuple, List[SearchResult]] = {}
+            pending: Dict[Tuple, str] = {}
+            for key, query in zip(keys, queries):
+                if key in resolved or key in pending:
+                    continue
+                cached = self.query_cache.get(key, generation)
+                if cached is not None:
+                    resolved[key] = cached
+                else:
+                    pending[key] = query
+            
+            print(f"🔍 Lote de {len(queries)} consultas ({len(resolved) + len(pending)} distintas, "
+                  f"{len(pending)} sin caché), búsqueda {mode}")
+            
+            if pending:
+                texts = list(pending.values())
+                if self.shard_pool is not None:
+                    batch = [
+                        self._sharded_search(text, k, mode, lexical_weight, vector_weight, filters)
+                        for text in texts
+                    ]
+                else:
+                    batch = [
+                        self._group_hits(self._diversify(text, hits, k), k)
+                        for text, hits in zip(
+                            texts, self._passage_hits(texts, k, mode, lexical_weight, vector_weight, filters)
+                        )
+                    ]
+                for key, results in zip(pending, batch):
+                    self.query_cache.put(key, generation, results)
+                    resolved[key] = results
+            
+            return [list(resolved[key]) for key in keys]
+        
+        except Exception as e:
+            print(f"❌ Error buscando lote de artículos: {str(e)}")
+            return [[] for _ in queries]
+    
+    def _sharded_search(self, query: str, k: int, mode: str, lexical_weight: float,
+                        vector_weight: float, filters: Dict[str, List[str]]) -> List[SearchResult]:
+        """
+        Resolver una búsqueda en los shards y devolver vistas sobre los registros locales
+        
+        Los shards solo devuelven IDs, puntuaciones y offsets de pasajes, así
+        que por los procesos viajan unos pocos bytes por resultado.
+        """
+        hits = self.shard_pool.search(query, k, mode, lexical_weight, vector_weight, filters, rrf_k=self.RRF_K)
+        
+        results = []
+        with self._lock:
+            for article_id, scores, passages in hits:
+                record = self.articles_data.get(article_id)
+                if record is None:
+                    continue
+                results.append(SearchResult(record, scores, [
+                    PassageView(record, start, end, similarity) for start, end, similarity in passages
+                ]))
+        return results
+    
+    def save_snapshot(self, root: str, keep: int = 2) -> str:
+        """
+        Guardar un snapshot versionado del índice en disco
+        
+        Estructura:
+            root/CURRENT                  -> nombre del snapshot vigente
+            root/snapshot-000001/
+                index.json                -> metadatos de artículos, pasajes y del snapshot
+                content.bin               -> contenidos de los artículos (UTF-8 concatenado)
+                lexical*.json/npy         -> postings BM25 en formato CSR
+                embeddings.npy            -> matriz de embeddings
+                vectorizer*.*, ivf_*.npy  -> estado del modelo y del índice vectorial
+        
+        El snapshot se escribe en un directorio temporal y se publica con un
+        renombrado atómico, así que un lector nunca ve un snapshot a medias.
+        Todo el guardado, desde elegir la generación hasta el renombrado, se
+        hace con un bloqueo del directorio (entre hilos y entre procesos), así
+        que dos guardados simultáneos en la misma raíz no eligen el mismo nombre.
+        Los arrays y los contenidos se abren con mmap al cargar, de modo que
+        varios procesos que cargan la misma generación comparten la memoria.
+        
+        Args:
+            root: Directorio raíz de los snapshots
+            keep: Número de snapshots a conservar (incluido el nuevo)
+        
+        Returns:
+            str: Ruta del snapshot creado
+        """
+        os.makedirs(root, exist_ok=True)
+        with self._snapshot_lock, _locked_snapshot_root(root):
+            return self._save_snapshot_locked(root, keep)
+    
+    def _save_snapshot_locked(self, root: str, keep: int) -> str:
+        """Escribir y publicar el snapshot (requiere el bloqueo del directorio)"""
+        generation = _latest_snapshot_generation(root) + 1
+        name = f"snapshot-{generation:06d}"
+        tmp_dir = os.path.join(root, f".{name}.tmp")
+        # Restos de un guardado interrumpido
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        
+        with self._lock:
+            self.compact()
+            # Los registros son inmutables: basta con fijar la lista bajo el lock
+            records = list(self.articles_data.values())
+            index_data = {
+                "format_version": self.SNAPSHOT_FORMAT_VERSION,
+                "generation": generation,
+                "index_generation": self.generation,
+                "created_at": datetime.utcnow().isoformat(),
+                "model": type(self.model).__name__ if self.model is not None else None,
+                "vector_dtype": self.embeddings_matrix.dtype,
+                "vector_index": self.vector_index.kind,
+                # Filas de vectores (compactadas): sin embeddings.npy, solo los códigos las describen
+                "vector_rows": len(self.embeddings_matrix),
+                "vector_dim": self.embeddings_matrix.dim,
+                # Con shards solo hay registros: quien lo cargue sin shards reindexa
+                "records_only": not self.index_locally,
+                "passages": [list(passage) for passage in self._passages]
+            }
+            self.lexical_index.save(tmp_dir)
+            # Sin reordenación los vectores completos ya se descartaron: bastan los códigos
+            has_embeddings = len(self.embeddings_matrix) > 0 and self.embeddings_matrix.has_rows
+            if has_embeddings:
+                self.embeddings_matrix.save(os.path.join(tmp_dir, "embeddings.npy"))
+            if self.model is not None and hasattr(self.model, "save"):
+                self.model.save(tmp_dir)
+            self.vector_index.save(tmp_dir)
+        
+        spans = TextBuffer.write(os.path.join(tmp_dir, "content.bin"), (record.content for record in records))
+        articles = []
+        for record, (offset, size) in zip(records, spans):
+            article = record.to_dict()
+            del article["content"]
+            article["content_offset"] = offset
+            article["content_size"] = size
+            articles.append(article)
+        index_data["articles"] = articles
+        
+        with open(os.path.join(tmp_dir, "index.json"), "w", encoding="utf-8") as f:
+            json.dump(index_data, f, ensure_ascii=False)
+        
+        snapshot_dir = os.path.join(root, name)
+        os.replace(tmp_dir, snapshot_dir)
+        _write_current_snapshot(root, name)
+        _prune_snapshots(root, keep)
+        self.snapshot_name = name
+        
+        print(f"✅ Snapshot guardado: {snapshot_dir} ({len(index_data['articles'])} artículos)")
+        return snapshot_dir
+    
+    def load_snapshot(self, root: str) -> bool:
+        """
+        Cargar el snapshot vigente de un directorio
+        
+        La matriz de embeddings, los postings BM25 y los contenidos se abren
+        mapeados en memoria y de solo lectura: no se leen completos al
+        arrancar, se comparten entre procesos que cargan el mismo snapshot y
+        solo se copian a memoria si se modifican.
+        
+        Args:
+            root: Directorio raíz de los snapshots
+        
+        Returns:
+            bool: True si se cargó un snapshot
+        """
+        name = _read_current_snapshot(root)
+        if name is None:
+            print(f"⚠️  No hay snapshots en {root}")
+            return False
+        
+        snapshot_dir = os.path.join(root, name)
+        try:
+            with open(os.path.join(snapshot_dir, "index.json"), encoding="utf-8") as f:
+                index_data = json.load(f)
+            
+            if index_data["format_version"] != self.SNAPSHOT_FORMAT_VERSION:
+                print(f"⚠️  Formato de snapshot no soportado: {index_data['format_version']}")
+                return False
+            
+            articles = index_data["articles"]
+            passages = [tuple(passage) for passage in index_data["passages"]]
+            lexical_index = InvertedIndex.load(snapshot_dir)
+            content_buffer = TextBuffer(os.path.join(snapshot_dir, "content.bin"))
+            
+            # Snapshot sin pasajes (guardado con shards): se reindexa tras cargar los registros
+            records_only = index_data.get("records_only", False)
+            
+            embeddings_path = os.path.join(snapshot_dir, "embeddings.npy")
+            same_model = index_data["model"] == (type(self.model).__name__ if self.model is not None else None)
+            needs_rebuild = False
+            
+            if self.model is not None and same_model and os.path.exists(embeddings_path):
+                array = np.load(embeddings_path, mmap_mode="r")
+                if str(array.dtype) != self.embeddings_matrix.dtype:
+                    array = array.astype(self.embeddings_matrix.dtype)
+                matrix = VectorMatrix.from_array(array, storage_dir=self.vector_storage_dir,
+                                                 keep_rows=self.keep_full_vectors)
+                if hasattr(self.model, "load"):
+                    self.model.load(snapshot_dir)
+            elif (self.model is not None and same_model and not self.keep_full_vectors
+                    and index_data.get("vector_rows") and index_data.get("vector_index") == self.vector_index.kind):
+                # Snapshot de un índice comprimido sin reordenación: solo hay códigos
+                matrix = VectorMatrix.released(index_data["vector_dim"], index_data["vector_rows"],
+                                               dtype=self.embeddings_matrix.dtype)
+                if hasattr(self.model, "load"):
+                    self.model.load(snapshot_dir)
+            else:
+                matrix = self._new_matrix(self.embeddings_matrix.dtype)
+                needs_rebuild = self.model is not None and self.index_locally and not records_only
+            
+            vector_index = create_vector_index(
+                self.vector_index.kind, matrix, **self.vector_index_params
+            )
+            if not needs_rebuild:
+                vector_index.load(snapshot_dir)
+            
+            with self._lock:
+                self.articles_data = {
+                    article["id"]: ArticleRecord.from_buffer(article, content_buffer) for article in articles
+                }
+                self.generation += 1
+                self.snapshot_name = name
+                if not self.index_locally:
+                    # Con shards basta con los registros: el índice lo rehacen los shards
+                    passages = []
+                    lexical_index = InvertedIndex()
+                    matrix = self._new_matrix(self.embeddings_matrix.dtype)
+                    vector_index = create_vector_index(self.vector_index.kind, matrix, **self.vector_index_params)
+                self._passages = passages
+                self._article_passages = _group_passages(passages)
+                self._passage_terms = [None] * len(passages)
+                self._tombstones = 0
+                self.lexical_index = lexical_index
+                self.facet_index = FacetIndex()
+                self.facet_index.rebuild(passages, self.articles_data)
+                self.embeddings_matrix = matrix
+                self.vector_index = vector_index
+            
+            if records_only and self.index_locally:
+                self.add_articles_bulk([record.to_dict() for record in list(self.articles_data.values())])
+            
+            if needs_rebuild:
+                # Snapshot creado con otro modelo: se vectoriza de nuevo
+                self._rebuild_embeddings_matrix()
+            
+            self._reset_shards()
+            print(f"✅ Snapshot cargado: {snapshot_dir} ({len(articles)} artículos)")
+            return True
+        
+        except Exception as e:
+            print(f"❌ Error cargando snapshot {snapshot_dir}: {str(e)}")
+            return False
+    
     def get_index_stats(self) -> Dict:
         """
-        Obtener estadísticas del sistema de embeddings (MODO DEGRADADO)
+        Obtener estadísticas del sistema de embeddings
         
         Returns:
             Dict: Estadísticas del sistema
         """
+        embeddings_loaded = self.model is not None
+        shard_stats = self.shard_pool.get_stats() if self.shard_pool is not None else None
+        total_passages = len(self._passages) - self._tombstones
+        if not self.index_locally and shard_stats and shard_stats["running"]:
+            total_passages = sum(shard_stats["passages_per_shard"])
         return {
             "total_articles": len(self.articles_data),
-            "embeddings_loaded": False,  # Siempre False en modo degradado
-            "model_name": "MODO_DEGRADADO",
-            "search_mode": "text_search"
+            "total_passages": total_passages,
+            "generation": self.generation,
+            "facets": self.facet_index.get_stats(),
+            "index_slots": len(self._passages),
+            "tombstones": self._tombstones,
+            "embeddings_loaded": embeddings_loaded,
+            "model_name": type(self.model).__name__ if embeddings_loaded else "MODO_DEGRADADO",
+            "search_mode": self._resolve_search_mode("auto"),
+            "indexed_terms": self.lexical_index.vocabulary_size,
+            "vector_dtype": self.embeddings_matrix.dtype,
+            "embeddings_matrix_bytes": self.embeddings_matrix.nbytes,
+            "embeddings_storage": (
+                "mmap" if self.embeddings_matrix.is_mapped
+                else "ram" if self.embeddings_matrix.keep_rows else "codes_only"
+            ),
+            "vector_index": self.vector_index.get_stats(),
+            "shards": shard_stats
         }
 
-# Instancia global del gestor de embeddings
-embedding_manager = EmbeddingManager()
\ No newline at end of file
+def _group_passages(passages: List[Optional[Tuple[str, int, int]]]) -> Dict[str, List[int]]:
+    """Agrupar las posiciones de los pasajes vivos por artículo"""
+    grouped: Dict[str, List[int]] = {}
+    for slot, passage in enumerate(passages):
+        if passage is not None:
+            grouped.setdefault(passage[0], []).append(slot)
+    return grouped
+
+# Archivo de bloqueo de los guardados en un directorio de snapshots
+SNAPSHOT_LOCK_NAME = "snapshot.lock"
+
+def _snapshot_generation(name: str) -> int:
+    """Número de generación de un directorio snapshot-NNNNNN (-1 si no lo es)"""
+    prefix, _, number = name.partition("-")
+    return int(number) if prefix == "snapshot" and number.isdigit() else -1
+
+def _latest_snapshot_generation(root: str) -> int:
+    """Mayor generación existente en el directorio raíz (0 si no hay)"""
+    generations = [_snapshot_generation(name) for name in os.listdir(root)]
+    return max([0] + generations)
+
+@contextmanager
+def _locked_snapshot_root(root: str):
+    """Bloqueo exclusivo del directorio de snapshots entre procesos (sin fcntl, no bloquea)"""
+    with open(os.path.join(root, SNAPSHOT_LOCK_NAME), "a") as lock_file:
+        if fcntl is not None:
+            # Se libera al cerrar el archivo
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        yield
+
+def _read_current_snapshot(root: str) -> Optional[str]:
+    """Nombre del snapshot vigente según el archivo CURRENT"""
+    try:
+        with open(os.path.join(root, "CURRENT"), encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+def _write_current_snapshot(root: str, name: str):
+    """Actualizar CURRENT de forma atómica"""
+    tmp_path = os.path.join(root, "CURRENT.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(name)
+    os.replace(tmp_path, os.path.join(root, "CURRENT"))
+
+def _prune_snapshots(root: str, keep: int):
+    """Eliminar snapshots antiguos conservando los `keep` más recientes"""
+    snapshots = sorted(
+        (name for name in os.listdir(root) if _snapshot_generation(name) >= 0),
+        key=_snapshot_generation
+    )
+    for name in snapshots[:max(len(snapshots) - keep, 0)]:
+        shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+
+# Instancia global del gestor de embeddings (vectorizador local por defecto)
+embedding_manager = EmbeddingManager(
+    model=HashingVectorizer(n_features=int(os.getenv("EMBEDDINGS_FEATURES", 2 ** 11))),
+    vector_dtype=os.getenv("EMBEDDINGS_DTYPE", "float32"),
+    vector_index=os.getenv("VECTOR_INDEX", "exact"),
+    # Solo para int8/pq: candidatos reordenados con los vectores completos (0 = solo códigos)
+    vector_index_params={"rerank": int(os.getenv("VECTOR_INDEX_RERANK"))} if os.getenv("VECTOR_INDEX_RERANK") else None,
+    query_cache=QueryCache(
+        max_entries=int(os.getenv("QUERY_CACHE_SIZE", 1024)),
+        ttl_seconds=float(os.getenv("QUERY_CACHE_TTL", 300))
+    ),
+    shards=int(os.getenv("SEARCH_SHARDS", 1)),
+    vector_storage_dir=os.getenv("VECTOR_STORAGE_DIR") or None,
+    mmr_lambda=float(os.getenv("SEARCH_MMR_LAMBDA", 0.7)),
+    max_passages_per_article=int(os.getenv("SEARCH_MAX_PASSAGES_PER_ARTICLE", 3)),
+    rerank_weight=float(os.getenv("SEARCH_RERANK_WEIGHT", 0.0))
+)
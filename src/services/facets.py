@@ -0,0 +1,129 @@
+import numpy as np
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Campos de metadatos filtrables
+FACET_FIELDS = ("category", "tags", "visibility", "status")
+
+def _normalize_value(value) -> str:
+    return str(value).strip().lower()
+
+def article_facets(article: Dict) -> Dict[str, List[str]]:
+    """
+    Extraer los valores de faceta de un registro de artículo
+
+    Args:
+        article: Registro del artículo (category, tags, visibility, status)
+
+    Returns:
+        Dict[str, List[str]]: Campo -> valores normalizados (minúsculas)
+    """
+    facets = {}
+    for field in FACET_FIELDS:
+        value = article.get(field)
+        if value is None or value == "":
+            continue
+        values = value if isinstance(value, (list, tuple, set)) else [value]
+        facets[field] = sorted({_normalize_value(v) for v in values if v not in (None, "")})
+    return facets
+
+class FacetIndex:
+    """
+    Bitmaps de metadatos sobre las posiciones del índice de búsqueda
+
+    Para cada valor de faceta (por ejemplo category=redes) guarda un bitmap
+    empaquetado (1 bit por pasaje). Un filtro se resuelve con OR de bits
+    dentro de un campo y AND entre campos, y el resultado se aplica antes de
+    puntuar: los recuperadores solo evalúan los pasajes permitidos.
+    """
+
+    def __init__(self):
+        self._bitmaps: Dict[Tuple[str, str], np.ndarray] = {}
+
+    @staticmethod
+    def _grow(bitmap: np.ndarray, slot: int) -> np.ndarray:
+        """Ampliar un bitmap (duplicando su tamaño) para que contenga la posición"""
+        words = len(bitmap)
+        if slot >> 3 < words:
+            return bitmap
+        grown = np.zeros(max(words * 2, (slot >> 3) + 1, 8), dtype=np.uint8)
+        grown[:words] = bitmap
+        return grown
+
+    def add(self, slot: int, facets: Dict[str, List[str]]):
+        """
+        Marcar una posición con los valores de faceta de su artículo
+
+        Args:
+            slot: Posición del pasaje en el índice
+            facets: Campo -> valores (ver article_facets)
+        """
+        for field, values in facets.items():
+            for value in values:
+                key = (field, value)
+                bitmap = self._grow(self._bitmaps.get(key, np.zeros(0, dtype=np.uint8)), slot)
+                bitmap[slot >> 3] |= np.uint8(1 << (slot & 7))
+                self._bitmaps[key] = bitmap
+
+    def remove(self, slot: int, facets: Dict[str, List[str]]):
+        """
+        Desmarcar una posición
+
+        Args:
+            slot: Posición del pasaje en el índice
+            facets: Valores con los que se marcó la posición
+        """
+        for field, values in facets.items():
+            for value in values:
+                bitmap = self._bitmaps.get((field, value))
+                if bitmap is not None and slot >> 3 < len(bitmap):
+                    bitmap[slot >> 3] &= np.uint8(~(1 << (slot & 7)) & 0xFF)
+
+    def rebuild(self, passages: List[Optional[Tuple[str, int, int]]], articles: Dict[str, Dict]):
+        """
+        Reconstruir todos los bitmaps (tras compactar o cargar un snapshot)
+
+        Args:
+            passages: Posición -> (artículo, inicio, fin); None = lápida
+            articles: Registros de artículos por ID
+        """
+        self._bitmaps = {}
+        facets_by_article: Dict[str, Dict[str, List[str]]] = {}
+        for slot, passage in enumerate(passages):
+            if passage is None:
+                continue
+            article_id = passage[0]
+            if article_id not in facets_by_article:
+                facets_by_article[article_id] = article_facets(articles[article_id])
+            self.add(slot, facets_by_article[article_id])
+
+    def mask(self, filters: Dict[str, Iterable[str]], size: int) -> np.ndarray:
+        """
+        Resolver un filtro a una máscara booleana de posiciones
+
+        Args:
+            filters: Campo -> valores aceptados (OR dentro del campo, AND entre campos)
+            size: Número de posiciones del índice
+
+        Returns:
+            np.ndarray: Máscara booleana de longitud size
+        """
+        words = (size + 7) >> 3
+        result = None
+        for field, values in filters.items():
+            union = np.zeros(words, dtype=np.uint8)
+            for value in values:
+                bitmap = self._bitmaps.get((field, _normalize_value(value)))
+                if bitmap is not None:
+                    n = min(len(bitmap), words)
+                    union[:n] |= bitmap[:n]
+            result = union if result is None else result & union
+
+        if result is None:
+            return np.ones(size, dtype=bool)
+        return np.unpackbits(result, count=size, bitorder="little").astype(bool)
+
+    def get_stats(self) -> Dict:
+        return {
+            "facet_values": len(self._bitmaps),
+            "bitmap_bytes": int(sum(bitmap.nbytes for bitmap in self._bitmaps.values()))
+        }
@@ -1,30 +1,104 @@
 # import google.generativeai as genai  # DESACTIVADO
+import contextlib
 import os
-from typing import List, Dict
+from typing import AsyncIterator, List, Dict, Optional, Sequence
+from .answer_cache import AnswerCache, AnswerSource
+from .llm_scheduler import LLMScheduler
+from .stub_llm import StubLLMModel
+from .tokenizer import count_tokens
 
 class GeminiService:
     """Servicio para interactuar con Gemini API (MODO DEGRADADO)"""
     
-    def __init__(self):
-        """Inicializar servicio de Gemini en modo degradado"""
-        print("⚠️  GeminiService en MODO DEGRADADO - IA desactivada")
+    # Tokens de respuesta que se reservan por llamada en el límite de tokens por minuto
+    EXPECTED_OUTPUT_TOKENS = 512
+    
+    def __init__(self, answer_cache: Optional[AnswerCache] = None,
+                 scheduler: Optional[LLMScheduler] = None, model=None):
+        """
+        Inicializar servicio de Gemini en modo degradado
+        
+        Args:
+            answer_cache: Caché de respuestas (None = sin caché)
+            scheduler: Planificador de llamadas al modelo (None = sin límites)
+            model: Modelo con generate_content_async (None = modo degradado;
+                por ejemplo, StubLLMModel para pruebas de carga sin conexión)
+        """
+        # API de Gemini desactivada para arranque rápido
+        self.model = model
+        if model is None:
+            print("⚠️  GeminiService en MODO DEGRADADO - IA desactivada")
         
-        # API desactivada para arranque rápido
-        self.model = None
+        # Respuestas ya generadas para la misma pregunta y las mismas fuentes
+        self.answer_cache = answer_cache
         
-        print("✅ GeminiService inicializado en modo degradado")
+        # Concurrencia, límites por minuto y prioridad de las llamadas al modelo
+        self.scheduler = scheduler
+        
+        mode = f"con el modelo {self.model_name}" if model is not None else "en modo degradado"
+        print(f"✅ GeminiService inicializado {mode}")
+    
+    @property
+    def model_name(self) -> str:
+        """Modelo que genera las respuestas (forma parte de la clave de caché)"""
+        if self.model is None:
+            return "degradado"
+        return getattr(self.model, "model_name", "gemini-pro")
     
-    def generate_answer(self, query: str, context: str) -> str:
+    def _slot(self, prompt: str, priority: str):
+        """Hueco del planificador para una llamada al modelo"""
+        if self.scheduler is None:
+            return contextlib.nullcontext()
+        return self.scheduler.slot(priority, count_tokens(prompt) + self.EXPECTED_OUTPUT_TOKENS)
+    
+    async def generate_answer(self, query: str, context: str,
+                              sources: Optional[Sequence[AnswerSource]] = None,
+                              priority: str = "interactive") -> str:
         """
         Generar respuesta usando Gemini (MODO DEGRADADO)
         
+        Con Gemini activo usa generate_content_async, sin bloquear el event loop.
+        Si se indican las fuentes, la respuesta se busca y se guarda en la caché.
+        
         Args:
             query: Pregunta del usuario
             context: Contexto de artículos
+            sources: (ID, versión) de los artículos del contexto
+            priority: Carril del planificador ("interactive" o "batch")
             
         Returns:
             str: Respuesta generada (modo degradado)
+            
+        Raises:
+            LLMQueueFullError: Si la cola del planificador está llena
         """
+        key = self._cache_key(query, context, sources)
+        if key is not None:
+            cached = await self.answer_cache.get_async(key)
+            if cached is not None:
+                return cached
+        
+        if self.model is not None:
+            prompt = self._build_prompt(query, context)
+            async with self._slot(prompt, priority):
+                response = await self.model.generate_content_async(prompt)
+            answer = response.text
+        else:
+            answer = self._degraded_answer(query, context)
+        
+        if key is not None:
+            await self.answer_cache.put_async(key, answer, [article_id for article_id, _ in sources])
+        return answer
+    
+    def _cache_key(self, query: str, context: str,
+                   sources: Optional[Sequence[AnswerSource]]) -> Optional[str]:
+        """Clave de caché de la respuesta (None si no se cachea)"""
+        if self.answer_cache is None or sources is None:
+            return None
+        return self.answer_cache.make_key(query, sources, context, self.model_name)
+    
+    def _degraded_answer(self, query: str, context: str) -> str:
+        """Respuesta simple basada en el contexto, sin modelo"""
         print("⚠️  Modo degradado: Generando respuesta simple")
         
         # Respuesta simple basada en contexto
@@ -44,15 +118,98 @@ activa el servicio de Gemini en la configuración."""
 Por favor, verifica que los artículos relevantes estén cargados en el sistema.
 Modo degradado activo - respuestas limitadas."""
     
+    async def generate_answer_stream(self, query: str, context: str,
+                                     sources: Optional[Sequence[AnswerSource]] = None,
+                                     priority: str = "interactive") -> AsyncIterator[str]:
+        """
+        Generar respuesta por fragmentos, a medida que se producen
+        
+        Con Gemini activo usa generate_content_async(stream=True); en modo degradado
+        emite la respuesta simple línea a línea. Con fuentes, una respuesta
+        cacheada se emite en un solo fragmento y una nueva se cachea al terminar.
+        
+        Args:
+            query: Pregunta del usuario
+            context: Contexto de artículos
+            sources: (ID, versión) de los artículos del contexto
+            priority: Carril del planificador ("interactive" o "batch")
+            
+        Yields:
+            str: Fragmentos de la respuesta, en orden
+        """
+        key = self._cache_key(query, context, sources)
+        if key is not None:
+            cached = await self.answer_cache.get_async(key)
+            if cached is not None:
+                yield cached
+                return
+        
+        chunks = []
+        if self.model is not None:
+            prompt = self._build_prompt(query, context)
+            # El hueco se ocupa mientras dura el streaming
+            async with self._slot(prompt, priority):
+                response = await self.model.generate_content_async(prompt, stream=True)
+                async for chunk in response:
+                    if chunk.text:
+                        chunks.append(chunk.text)
+                        yield chunk.text
+        else:
+            for line in self._degraded_answer(query, context).splitlines(keepends=True):
+                chunks.append(line)
+                yield line
+        
+        # Solo se cachean respuestas completas
+        if key is not None:
+            await self.answer_cache.put_async(key, "".join(chunks), [article_id for article_id, _ in sources])
+    
+    def _build_prompt(self, query: str, context: str) -> str:
+        """Prompt para Gemini: responder solo con la información de los artículos"""
+        return f"""Eres el asistente de una biblioteca virtual educativa.
+Responde a la pregunta usando únicamente la información de los artículos.
+Si los artículos no contienen la respuesta, dilo.
+
+{context}
+Pregunta: {query}"""
+    
     def test_connection(self) -> bool:
         """
         Probar conexión con Gemini (MODO DEGRADADO)
         
         Returns:
-            bool: False (siempre en modo degradado)
+            bool: True si hay un modelo configurado (False en modo degradado)
         """
+        if self.model is not None:
+            return True
         print("⚠️  Modo degradado: Gemini desactivado")
         return False
+    
+    def get_stats(self) -> Dict:
+        """
+        Obtener estadísticas del servicio
+        
+        Returns:
+            Dict: Modelo, caché de respuestas y planificador de llamadas
+        """
+        return {
+            "model": self.model_name,
+            "answer_cache": self.answer_cache.get_stats() if self.answer_cache else None,
+            "scheduler": self.scheduler.get_stats() if self.scheduler else None
+        }
 
 # Instancia global del servicio de Gemini
-gemini_service = GeminiService()
\ No newline at end of file
+gemini_service = GeminiService(
+    answer_cache=AnswerCache(
+        max_entries=int(os.getenv("ANSWER_CACHE_SIZE", 512)),
+        ttl_seconds=float(os.getenv("ANSWER_CACHE_TTL", 3600)),
+        db_path=os.getenv("ANSWER_CACHE_DB") or None
+    ),
+    scheduler=LLMScheduler(
+        max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", 4)),
+        requests_per_minute=float(os.getenv("LLM_REQUESTS_PER_MINUTE", 60)),
+        tokens_per_minute=float(os.getenv("LLM_TOKENS_PER_MINUTE", 32000)),
+        max_queue=int(os.getenv("LLM_MAX_QUEUE", 100))
+    ),
+    # Servidor LLM local de pruebas (scripts/stub_llm_server.py)
+    model=StubLLMModel(os.getenv("LLM_STUB_URL")) if os.getenv("LLM_STUB_URL") else None
+)
\ No newline at end of file
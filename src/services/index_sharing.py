@@ -0,0 +1,321 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+from .embeddings import EmbeddingManager, embedding_manager, _read_current_snapshot
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin bloqueo de archivos, cada proceso es independiente
+    fcntl = None
+
+class SharedIndexCoordinator:
+    """
+    Índice compartido entre varios workers (uvicorn --workers / gunicorn)
+
+    Un único proceso constructor (builder) mantiene el índice: hace la carga
+    inicial, aplica las altas y bajas y publica cada generación como snapshot
+    en un directorio común. El resto de procesos (readers) abren el snapshot
+    vigente con mmap y de solo lectura, de modo que la matriz de embeddings,
+    los postings y los contenidos están una sola vez en memoria (caché de
+    páginas del sistema operativo). Cuando CURRENT apunta a una generación
+    nueva, los lectores cambian a ella.
+
+    Los lectores no modifican su copia: reenvían las altas y bajas al
+    constructor a través de un diario (changes.log) en el mismo directorio,
+    y las ven en cuanto se publica la siguiente generación.
+
+    Publicar reescribe el snapshot completo, así que el constructor no lo
+    hace con cada cambio: espera a acumular publish_min_changes generaciones
+    o a que pasen publish_max_delay segundos desde el primer cambio sin
+    publicar. Tras publicar, el diario se recorta a las entradas que el
+    snapshot todavía no cubre, de modo que no crece sin límite.
+
+    El rol se elige con un bloqueo de archivo: el primer proceso que lo
+    obtiene es el constructor. Si muere, el sistema libera el bloqueo y un
+    lector toma el relevo.
+    """
+
+    JOURNAL_NAME = "changes.log"
+    LOCK_NAME = "builder.lock"
+    JOURNAL_LOCK_NAME = "changes.lock"
+
+    def __init__(self, manager: EmbeddingManager, root: str,
+                 publish_interval: float = 5.0, poll_interval: float = 2.0,
+                 publish_min_changes: int = 100, publish_max_delay: float = 60.0):
+        """
+        Inicializar coordinador (no hace nada hasta llamar a start)
+
+        Args:
+            manager: Índice de este proceso
+            root: Directorio compartido de snapshots
+            publish_interval: Segundos entre vueltas del constructor (diario y publicación)
+            poll_interval: Segundos entre comprobaciones de los lectores
+            publish_min_changes: Generaciones sin publicar que fuerzan una publicación
+            publish_max_delay: Segundos máximos que un cambio espera a publicarse
+        """
+        self.manager = manager
+        self.root = root
+        self.publish_interval = publish_interval
+        self.poll_interval = poll_interval
+        self.publish_min_changes = publish_min_changes
+        self.publish_max_delay = publish_max_delay
+
+        self.role = "standalone"
+        self.published_generation: Optional[int] = None
+        # True si al asumir el rol de constructor el índice ya tenía un snapshot cargado
+        self.snapshot_loaded = False
+        self.publications = 0
+        self.attachments = 0
+        self.journal_entries_applied = 0
+        self.journal_truncations = 0
+        self.errors = []
+
+        # Callback para operaciones que solo ejecuta el constructor (p. ej. reindexar)
+        self.on_reindex_request: Optional[Callable[[Dict], None]] = None
+        # Callback al cargar la primera generación en un lector
+        self.on_attach: Optional[Callable[[], None]] = None
+
+        self._lock_file = None
+        self._journal_offset = 0
+        # Momento del primer cambio sin publicar
+        self._pending_since: Optional[float] = None
+        self._journal_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def is_builder(self) -> bool:
+        return self.role in ("builder", "standalone")
+
+    def _try_acquire_builder_lock(self) -> bool:
+        """Intentar convertirse en el proceso constructor (sin bloquear)"""
+        if fcntl is None:
+            return True
+
+        lock_file = open(os.path.join(self.root, self.LOCK_NAME), "a")
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+
+        self._lock_file = lock_file
+        return True
+
+    def start(self) -> str:
+        """
+        Elegir el rol de este proceso y arrancar su hilo
+
+        Returns:
+            str: "builder" o "reader"
+        """
+        os.makedirs(self.root, exist_ok=True)
+
+        if self._try_acquire_builder_lock():
+            self._become_builder()
+        else:
+            self.role = "reader"
+            self.manager.change_sink = self._append_to_journal
+            print(f"✅ Índice compartido: proceso lector (pid {os.getpid()})")
+
+        self._thread = threading.Thread(target=self._run, name="index-sharing", daemon=True)
+        self._thread.start()
+        return self.role
+
+    def stop(self):
+        self._stop.set()
+
+    def _become_builder(self):
+        """
+        Asumir el rol de constructor: aplicar cambios localmente y reaplicar el diario
+
+        El diario solo contiene las operaciones que el último snapshot
+        publicado no cubre (ver _truncate_journal), así que se parte de ese
+        snapshot y se reaplica el diario desde el principio. Reaplicar una
+        operación ya incluida es inocuo: las altas reemplazan y las bajas de
+        un artículo que no existe no hacen nada.
+        """
+        self.role = "builder"
+        self.manager.change_sink = None
+        name = _read_current_snapshot(self.root)
+        if name is not None and name != self.manager.snapshot_name:
+            self.manager.load_snapshot(self.root)
+        self.snapshot_loaded = self.manager.snapshot_name is not None
+        self._journal_offset = 0
+        self._pending_since = None
+        self.published_generation = self.manager.generation if self.manager.snapshot_name else None
+        print(f"✅ Índice compartido: proceso constructor (pid {os.getpid()})")
+
+    @contextmanager
+    def _locked_journal(self, exclusive: bool):
+        """
+        Bloqueo del diario entre procesos
+
+        Los lectores lo toman compartido para añadir entradas; el constructor,
+        exclusivo para recortarlo, así que nunca se pierde una entrada escrita
+        a mitad del recorte.
+        """
+        with open(os.path.join(self.root, self.JOURNAL_LOCK_NAME), "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            yield
+
+    def _append_to_journal(self, operation: str, payload):
+        """Reenviar una operación al constructor (lectores)"""
+        line = json.dumps({"op": operation, "payload": payload}, ensure_ascii=False, default=str) + "\n"
+        with self._journal_lock, self._locked_journal(exclusive=False):
+            # O_APPEND: cada escritura se añade al final aunque escriban varios procesos
+            fd = os.open(os.path.join(self.root, self.JOURNAL_NAME), os.O_WRONLY | os.O_APPEND | os.O_CREAT)
+            try:
+                os.write(fd, line.encode("utf-8"))
+            finally:
+                os.close(fd)
+
+    def request_reindex(self, params: Dict):
+        """Pedir una reindexación al constructor (lectores)"""
+        self._append_to_journal("reindex", params)
+
+    def _apply_journal(self):
+        """Aplicar las operaciones nuevas del diario (constructor)"""
+        journal_path = os.path.join(self.root, self.JOURNAL_NAME)
+        if not os.path.exists(journal_path):
+            return
+
+        with open(journal_path, "rb") as f:
+            f.seek(self._journal_offset)
+            data = f.read()
+
+        # Solo líneas completas; una escritura a medias se lee en la siguiente vuelta
+        complete = data[:data.rfind(b"\n") + 1]
+        self._journal_offset += len(complete)
+
+        for line in complete.splitlines():
+            entry = json.loads(line)
+            operation, payload = entry["op"], entry["payload"]
+            if operation == "upsert":
+                self.manager.add_articles_bulk([payload])
+            elif operation == "remove":
+                self.manager.remove_article(payload)
+            elif operation == "reindex" and self.on_reindex_request is not None:
+                self.on_reindex_request(payload)
+            self.journal_entries_applied += 1
+
+    def _should_publish(self) -> bool:
+        """Decidir si toca publicar: primera generación, suficientes cambios o espera máxima"""
+        generation = self.manager.generation
+        if generation == self.published_generation:
+            self._pending_since = None
+            return False
+        if self.published_generation is None:
+            return True
+
+        now = time.monotonic()
+        if self._pending_since is None:
+            self._pending_since = now
+        return (generation - self.published_generation >= self.publish_min_changes
+                or now - self._pending_since >= self.publish_max_delay)
+
+    def _publish(self, force: bool = False):
+        """
+        Publicar una generación nueva si el índice cambió (constructor)
+
+        Args:
+            force: Publicar aunque no se haya llegado al umbral de cambios ni a la espera máxima
+        """
+        if self.manager.generation == self.published_generation:
+            self._pending_since = None
+            return
+        if not force and not self._should_publish():
+            return
+
+        generation = self.manager.generation
+        # Todo lo leído del diario hasta aquí ya está aplicado y entra en el snapshot
+        covered = self._journal_offset
+        self.manager.save_snapshot(self.root)
+        self.published_generation = generation
+        self.publications += 1
+        self._pending_since = None
+        self._truncate_journal(covered)
+
+    def flush(self):
+        """Publicar ya los cambios pendientes (constructor, por ejemplo al apagar)"""
+        if self.role == "builder":
+            self._publish(force=True)
+
+    def _truncate_journal(self, covered: int):
+        """
+        Quitar del diario las entradas que ya cubre el snapshot publicado (constructor)
+
+        Args:
+            covered: Bytes iniciales del diario aplicados antes del snapshot
+        """
+        if covered <= 0:
+            return
+
+        journal_path = os.path.join(self.root, self.JOURNAL_NAME)
+        with self._locked_journal(exclusive=True):
+            with open(journal_path, "rb") as f:
+                f.seek(covered)
+                pending = f.read()
+
+            tmp_path = journal_path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(pending)
+            os.replace(tmp_path, journal_path)
+            self._journal_offset -= covered
+
+        self.journal_truncations += 1
+
+    def _attach(self):
+        """Cambiar a la generación publicada si es nueva (lectores)"""
+        name = _read_current_snapshot(self.root)
+        if name is None or name == self.manager.snapshot_name:
+            return
+        if self.manager.load_snapshot(self.root):
+            self.attachments += 1
+            if self.attachments == 1 and self.on_attach is not None:
+                self.on_attach()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                if self.role == "builder":
+                    self._apply_journal()
+                    self._publish()
+                else:
+                    self._attach()
+                    # Relevo si el constructor terminó
+                    if self._try_acquire_builder_lock():
+                        self._become_builder()
+            except Exception as e:
+                self.errors.append(str(e))
+                print(f"❌ Error en el índice compartido ({self.role}): {str(e)}")
+
+            self._stop.wait(self.publish_interval if self.role == "builder" else self.poll_interval)
+
+    def get_status(self) -> Dict:
+        return {
+            "role": self.role,
+            "pid": os.getpid(),
+            "snapshot": self.manager.snapshot_name,
+            "index_generation": self.manager.generation,
+            "published_generation": self.published_generation,
+            "publications": self.publications,
+            "attachments": self.attachments,
+            "journal_entries_applied": self.journal_entries_applied,
+            "journal_truncations": self.journal_truncations,
+            "errors": self.errors[-5:]
+        }
+
+# Instancia global del coordinador (main.py la arranca si INDEX_SHARING_ENABLED=true)
+index_sharing = SharedIndexCoordinator(
+    embedding_manager,
+    os.getenv("INDEX_SNAPSHOT_DIR") or "/tmp/wiki-index",
+    publish_interval=float(os.getenv("INDEX_PUBLISH_INTERVAL", 5)),
+    poll_interval=float(os.getenv("INDEX_POLL_INTERVAL", 2)),
+    publish_min_changes=int(os.getenv("INDEX_PUBLISH_MIN_CHANGES", 100)),
+    publish_max_delay=float(os.getenv("INDEX_PUBLISH_MAX_DELAY", 60))
+)
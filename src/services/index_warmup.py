@@ -0,0 +1,122 @@
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+from utils.firestore_utils import FirestoreManager
+from .embeddings import EmbeddingManager, embedding_manager
+
+class IndexWarmup:
+    """
+    Carga en segundo plano de los artículos de Firestore en el índice
+
+    Recorre la colección `articles` por páginas (cursores) en un hilo aparte e
+    indexa cada página como un lote. Expone un indicador de disponibilidad y
+    contadores de progreso para que el balanceador solo envíe tráfico de chat
+    cuando el índice está caliente.
+    """
+
+    def __init__(self, manager: EmbeddingManager,
+                 page_source: Callable[[int], Iterable[List[Dict]]],
+                 batch_size: int = 200):
+        """
+        Inicializar carga (no arranca hasta llamar a start)
+
+        Args:
+            manager: Índice a poblar
+            page_source: Función batch_size -> iterable de páginas de artículos
+            batch_size: Artículos por página
+        """
+        self.manager = manager
+        self.page_source = page_source
+        self.batch_size = batch_size
+
+        self.status = "idle"
+        self.articles_loaded = 0
+        self.pages_loaded = 0
+        self.errors: List[str] = []
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+        self._ready = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def is_ready(self) -> bool:
+        return self._ready.is_set()
+
+    def mark_ready(self):
+        """Marcar el índice como disponible (por ejemplo, tras cargar un snapshot)"""
+        self._ready.set()
+
+    def start(self):
+        """Arrancar la carga en un hilo en segundo plano (idempotente)"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+
+        self._thread = threading.Thread(target=self._run, name="index-warmup", daemon=True)
+        self._thread.start()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Esperar a que el índice esté disponible
+
+        Args:
+            timeout: Segundos máximos de espera
+
+        Returns:
+            bool: True si el índice está disponible
+        """
+        return self._ready.wait(timeout)
+
+    def _run(self):
+        """Recorrer las páginas de artículos e indexarlas"""
+        self.status = "loading"
+        self.started_at = time.time()
+        self.finished_at = None
+        print("🔄 Cargando artículos de Firestore en el índice...")
+
+        try:
+            for page in self.page_source(self.batch_size):
+                try:
+                    self.articles_loaded += self.manager.add_articles_bulk(page)
+                except Exception as e:
+                    self.errors.append(f"Página {self.pages_loaded + 1}: {str(e)}")
+                    print(f"❌ Error indexando página {self.pages_loaded + 1}: {str(e)}")
+                self.pages_loaded += 1
+
+            self.status = "ready"
+            print(f"✅ Índice cargado: {self.articles_loaded} artículos en {self.pages_loaded} páginas")
+
+        except Exception as e:
+            # Sin Firestore no hay nada más que cargar: se sirve lo que haya
+            self.status = "failed"
+            self.errors.append(str(e))
+            print(f"❌ Error cargando artículos de Firestore: {str(e)}")
+
+        finally:
+            self.finished_at = time.time()
+            self._ready.set()
+
+    def get_status(self) -> Dict:
+        """
+        Obtener estado y progreso de la carga
+
+        Returns:
+            Dict: Estado, contadores y velocidad de carga
+        """
+        elapsed = 0.0
+        if self.started_at is not None:
+            elapsed = (self.finished_at or time.time()) - self.started_at
+
+        return {
+            "ready": self.is_ready,
+            "status": self.status,
+            "articles_loaded": self.articles_loaded,
+            "pages_loaded": self.pages_loaded,
+            "elapsed_seconds": round(elapsed, 2),
+            "docs_per_second": round(self.articles_loaded / elapsed, 1) if elapsed else 0.0,
+            "indexed_articles": len(self.manager.articles_data),
+            "errors": self.errors[-5:]
+        }
+
+# Instancia global de la carga inicial del índice
+index_warmup = IndexWarmup(embedding_manager, FirestoreManager.iter_article_pages)
@@ -0,0 +1,239 @@
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Deque, Dict, Optional, Tuple
+
+class LLMQueueFullError(RuntimeError):
+    """La cola de llamadas al LLM de un carril está llena"""
+
+class TokenBucket:
+    """
+    Cubeta de tokens con recarga continua (límite por minuto)
+
+    Admite ráfagas de hasta `capacity` unidades y después limita al ritmo
+    medio de `per_minute` unidades por minuto.
+    """
+
+    def __init__(self, per_minute: float, capacity: Optional[float] = None):
+        """
+        Args:
+            per_minute: Unidades por minuto (peticiones o tokens)
+            capacity: Ráfaga máxima (por defecto, lo de un minuto)
+        """
+        self.per_minute = per_minute
+        self.capacity = capacity or per_minute
+        self._rate = per_minute / 60.0
+        self._level = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._level = min(self.capacity, self._level + (now - self._updated) * self._rate)
+        self._updated = now
+
+    def time_until(self, amount: float) -> float:
+        """Segundos hasta que haya `amount` unidades disponibles (0 = ya)"""
+        self._refill()
+        missing = min(amount, self.capacity) - self._level
+        return missing / self._rate if missing > 0 else 0.0
+
+    def take(self, amount: float):
+        """Consumir unidades (llamar solo si time_until(amount) es 0)"""
+        self._refill()
+        self._level -= min(amount, self.capacity)
+
+    @property
+    def available(self) -> float:
+        self._refill()
+        return self._level
+
+class LLMScheduler:
+    """
+    Planificador de llamadas al LLM: concurrencia acotada, límites por minuto y carriles
+
+    Cada llamada pide un hueco con slot(carril, tokens). Se concede cuando:
+    - hay menos de max_concurrency llamadas en curso (y el carril no supera
+      su propio límite),
+    - la cubeta de peticiones por minuto tiene al menos una petición y
+    - la cubeta de tokens por minuto cubre la estimación de la llamada.
+
+    Los carriles se atienden por prioridad estricta ("interactive" antes que
+    "batch"); el carril batch además solo puede ocupar una parte de la
+    concurrencia, así que siempre queda sitio para el chat interactivo. Dentro
+    de cada carril el orden es FIFO. Un carril con la cola llena rechaza las
+    llamadas nuevas con LLMQueueFullError en lugar de acumular latencia.
+
+    Vive en el event loop de cada worker (no es seguro entre hilos).
+    """
+
+    # Carriles, de mayor a menor prioridad
+    LANES = ("interactive", "batch")
+
+    # Muestras de tiempo en cola que se conservan por carril para los percentiles
+    QUEUE_TIME_SAMPLES = 1000
+
+    def __init__(self, max_concurrency: int = 4, requests_per_minute: float = 60,
+                 tokens_per_minute: float = 32000, max_queue: int = 100,
+                 batch_share: float = 0.5):
+        """
+        Inicializar planificador
+
+        Args:
+            max_concurrency: Llamadas simultáneas como máximo
+            requests_per_minute: Límite de peticiones por minuto (0 = sin límite)
+            tokens_per_minute: Límite de tokens por minuto (0 = sin límite)
+            max_queue: Llamadas en espera como máximo por carril
+            batch_share: Fracción de la concurrencia que puede usar el carril batch
+
+        Raises:
+            ValueError: Si max_concurrency es menor que 1
+        """
+        if max_concurrency < 1:
+            raise ValueError(f"Concurrencia no válida: {max_concurrency}")
+
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.lane_limits = {
+            "interactive": max_concurrency,
+            "batch": max(1, int(max_concurrency * batch_share))
+        }
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+
+        # Por carril: (futuro, tokens, momento de llegada)
+        self._queues: Dict[str, Deque[Tuple[asyncio.Future, int, float]]] = {lane: deque() for lane in self.LANES}
+        self._running = {lane: 0 for lane in self.LANES}
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+        self._started = {lane: 0 for lane in self.LANES}
+        self._rejected = {lane: 0 for lane in self.LANES}
+        self._throttled = 0
+        self._queue_times: Dict[str, Deque[float]] = {
+            lane: deque(maxlen=self.QUEUE_TIME_SAMPLES) for lane in self.LANES
+        }
+
+    @asynccontextmanager
+    async def slot(self, lane: str = "interactive", tokens: int = 0):
+        """
+        Ocupar un hueco para una llamada al LLM durante el bloque
+
+        Args:
+            lane: Carril de prioridad ("interactive" o "batch")
+            tokens: Tokens estimados de la llamada (prompt + respuesta)
+
+        Raises:
+            ValueError: Si el carril no existe
+            LLMQueueFullError: Si la cola del carril está llena
+        """
+        await self.acquire(lane, tokens)
+        try:
+            yield
+        finally:
+            self.release(lane)
+
+    async def acquire(self, lane: str, tokens: int = 0) -> float:
+        """
+        Esperar un hueco (hay que llamar a release al terminar)
+
+        Returns:
+            float: Segundos que la llamada esperó en cola
+        """
+        if lane not in self._queues:
+            raise ValueError(f"Carril no soportado: {lane}")
+
+        queue = self._queues[lane]
+        if len(queue) >= self.max_queue:
+            self._rejected[lane] += 1
+            raise LLMQueueFullError(f"Cola del LLM llena en el carril {lane} ({self.max_queue} en espera)")
+
+        enqueued_at = time.monotonic()
+        future = asyncio.get_running_loop().create_future()
+        queue.append((future, tokens, enqueued_at))
+        self._dispatch()
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            # Si el hueco ya se había concedido, se devuelve; si no, la entrada
+            # cancelada se descarta al despachar
+            if future.done() and not future.cancelled():
+                self.release(lane)
+            raise
+
+        return time.monotonic() - enqueued_at
+
+    def release(self, lane: str):
+        """Liberar el hueco de una llamada terminada"""
+        self._running[lane] -= 1
+        self._dispatch()
+
+    def _dispatch(self):
+        """Conceder huecos a las llamadas en espera, por prioridad, mientras haya capacidad"""
+        while sum(self._running.values()) < self.max_concurrency:
+            lane = next((lane for lane in self.LANES
+                         if self._queues[lane] and self._running[lane] < self.lane_limits[lane]), None)
+            if lane is None:
+                return
+
+            queue = self._queues[lane]
+            future, tokens, enqueued_at = queue[0]
+            if future.done():
+                queue.popleft()
+                continue
+
+            wait = max(
+                self.requests.time_until(1) if self.requests else 0.0,
+                self.tokens.time_until(tokens) if self.tokens else 0.0
+            )
+            if wait > 0:
+                # Límite por minuto alcanzado: reintentar cuando se recarguen las cubetas
+                if self._timer is None:
+                    self._throttled += 1
+                    self._timer = asyncio.get_running_loop().call_later(wait, self._on_timer)
+                return
+
+            queue.popleft()
+            if self.requests:
+                self.requests.take(1)
+            if self.tokens:
+                self.tokens.take(tokens)
+            self._running[lane] += 1
+            self._started[lane] += 1
+            self._queue_times[lane].append(time.monotonic() - enqueued_at)
+            future.set_result(None)
+
+    def _on_timer(self):
+        self._timer = None
+        self._dispatch()
+
+    def get_stats(self) -> Dict:
+        """
+        Obtener métricas del planificador
+
+        Returns:
+            Dict: Por carril, llamadas en cola, en curso, iniciadas, rechazadas y
+                percentiles del tiempo en cola; y el estado de los límites por minuto
+        """
+        lanes = {}
+        for lane in self.LANES:
+            samples = sorted(self._queue_times[lane])
+            lanes[lane] = {
+                "queued": sum(1 for future, _, _ in self._queues[lane] if not future.done()),
+                "running": self._running[lane],
+                "max_running": self.lane_limits[lane],
+                "started": self._started[lane],
+                "rejected": self._rejected[lane],
+                "queue_ms_p50": round(1000 * samples[len(samples) // 2], 2) if samples else 0.0,
+                "queue_ms_p95": round(1000 * samples[int(len(samples) * 0.95)], 2) if samples else 0.0,
+                "queue_ms_max": round(1000 * samples[-1], 2) if samples else 0.0
+            }
+        return {
+            "max_concurrency": self.max_concurrency,
+            "requests_per_minute": self.requests.per_minute if self.requests else None,
+            "tokens_per_minute": self.tokens.per_minute if self.tokens else None,
+            "requests_available": int(self.requests.available) if self.requests else None,
+            "tokens_available": int(self.tokens.available) if self.tokens else None,
+            "throttled": self._throttled,
+            "lanes": lanes
+        }
@@ -0,0 +1,110 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+class QueryCache:
+    """
+    Caché LRU con caducidad (TTL) para resultados de búsqueda
+
+    Cada entrada guarda la generación del índice con la que se calculó; si
+    el índice cambió desde entonces (altas, ediciones o bajas), la entrada se
+    descarta al consultarla, así que nunca se sirven resultados obsoletos.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 300.0):
+        """
+        Inicializar caché
+
+        Args:
+            max_entries: Número máximo de entradas (0 = caché desactivada)
+            ttl_seconds: Segundos de validez de cada entrada
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable, generation: int) -> Optional[Any]:
+        """
+        Obtener un resultado cacheado
+
+        Args:
+            key: Clave de la consulta
+            generation: Generación actual del índice
+
+        Returns:
+            Optional[Any]: Resultado cacheado o None si no hay uno vigente
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            entry_generation, expires_at, value = entry
+            if entry_generation != generation:
+                del self._entries[key]
+                self.invalidations += 1
+                self.misses += 1
+                return None
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, generation: int, value: Any):
+        """
+        Guardar un resultado
+
+        Args:
+            key: Clave de la consulta
+            generation: Generación del índice con la que se calculó el resultado
+            value: Resultado a cachear
+        """
+        if self.max_entries <= 0:
+            return
+
+        with self._lock:
+            self._entries[key] = (generation, time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Vaciar la caché (los contadores se conservan)"""
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict:
+        """
+        Obtener contadores de uso de la caché
+
+        Returns:
+            Dict: Aciertos, fallos, expulsiones y tamaño actual
+        """
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations
+        }
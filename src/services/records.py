@@ -0,0 +1,206 @@
+import os
+import sys
+import numpy as np
+from collections.abc import Mapping
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+class TextBuffer:
+    """
+    Contenidos de los artículos concatenados en UTF-8 y mapeados en memoria
+
+    Los procesos que abren el mismo snapshot comparten el archivo a través de
+    la caché del sistema operativo en lugar de tener cada uno su copia.
+    """
+
+    def __init__(self, path: str):
+        # np.memmap no admite archivos vacíos
+        self._data = np.memmap(path, dtype=np.uint8, mode="r") if os.path.getsize(path) else b""
+
+    def read(self, offset: int, size: int) -> str:
+        return bytes(self._data[offset:offset + size]).decode("utf-8")
+
+    @staticmethod
+    def write(path: str, texts: Iterable[str]) -> List[Tuple[int, int]]:
+        """
+        Escribir textos concatenados
+
+        Args:
+            path: Archivo de destino
+            texts: Textos a escribir
+
+        Returns:
+            List[Tuple[int, int]]: (offset, tamaño en bytes) de cada texto
+        """
+        spans = []
+        offset = 0
+        with open(path, "wb") as f:
+            for text in texts:
+                data = text.encode("utf-8")
+                f.write(data)
+                spans.append((offset, len(data)))
+                offset += len(data)
+        return spans
+
+class BufferSlice:
+    """Referencia a un texto dentro de un TextBuffer"""
+
+    __slots__ = ("buffer", "offset", "size")
+
+    def __init__(self, buffer: TextBuffer, offset: int, size: int):
+        self.buffer = buffer
+        self.offset = offset
+        self.size = size
+
+    def read(self) -> str:
+        return self.buffer.read(self.offset, self.size)
+
+class ArticleRecord:
+    """
+    Registro compacto de un artículo indexado
+
+    Usa __slots__ en lugar de un dict por artículo y no duplica el texto:
+    el texto de cada pasaje se obtiene con offsets sobre `content`. Los
+    identificadores y los valores de metadatos repetidos se internan. El
+    contenido puede vivir en memoria o en un TextBuffer compartido.
+    """
+
+    __slots__ = ("id", "title", "_content", "category", "tags", "visibility", "status", "version")
+
+    FIELDS = ("id", "title", "content", "category", "tags", "visibility", "status", "version")
+
+    def __init__(self, id: str, title: str, content: Union[str, BufferSlice],
+                 category: Optional[str] = None, tags: Tuple[str, ...] = (),
+                 visibility: Optional[str] = None, status: str = "published",
+                 version: Optional[int] = None):
+        self.id = sys.intern(id)
+        self.title = title
+        self._content = content
+        self.category = sys.intern(category) if category else None
+        self.tags = tuple(sys.intern(tag) for tag in tags)
+        self.visibility = sys.intern(visibility) if visibility else None
+        self.status = sys.intern(status)
+        # Versión del artículo en Firestore (None si no se conoce)
+        self.version = version
+
+    @classmethod
+    def from_dict(cls, article: Dict) -> "ArticleRecord":
+        """
+        Crear un registro desde un dict de Firestore o de un snapshot
+
+        Args:
+            article: Artículo con id, title, content y metadatos opcionales
+
+        Returns:
+            ArticleRecord: Registro compacto
+        """
+        return cls(
+            id=article["id"],
+            title=article.get("title") or "",
+            content=article.get("content") or "",
+            category=article.get("category"),
+            tags=tuple(article.get("tags") or ()),
+            visibility=article.get("visibility"),
+            status=article.get("status") or "published",
+            version=article.get("version")
+        )
+
+    @classmethod
+    def from_buffer(cls, article: Dict, buffer: TextBuffer) -> "ArticleRecord":
+        """
+        Crear un registro cuyo contenido se lee de un TextBuffer
+
+        Args:
+            article: Metadatos del artículo con content_offset y content_size
+            buffer: Buffer compartido con los contenidos
+
+        Returns:
+            ArticleRecord: Registro compacto
+        """
+        content = BufferSlice(buffer, article["content_offset"], article["content_size"])
+        return cls.from_dict({**article, "content": content})
+
+    @property
+    def content(self) -> str:
+        content = self._content
+        return content if isinstance(content, str) else content.read()
+
+    def get(self, field: str, default=None):
+        return getattr(self, field, default)
+
+    def passage_text(self, start: int, end: int) -> str:
+        """Texto indexado de un pasaje: título del artículo más el fragmento"""
+        return f"{self.title}\n\n{self.content[start:end]}"
+
+    def to_dict(self) -> Dict:
+        article = {field: getattr(self, field) for field in self.FIELDS}
+        article["tags"] = list(self.tags)
+        return article
+
+class PassageView(Mapping):
+    """Vista de solo lectura de un pasaje coincidente (el texto se corta al leerlo)"""
+
+    __slots__ = ("record", "start", "end", "similarity_score")
+
+    KEYS = ("start", "end", "text", "similarity_score")
+
+    def __init__(self, record: ArticleRecord, start: int, end: int, similarity_score: float):
+        self.record = record
+        self.start = start
+        self.end = end
+        self.similarity_score = similarity_score
+
+    @property
+    def text(self) -> str:
+        return self.record.content[self.start:self.end]
+
+    def __getitem__(self, key: str):
+        if key not in self.KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.KEYS)
+
+    def __len__(self) -> int:
+        return len(self.KEYS)
+
+class SearchResult(Mapping):
+    """
+    Resultado de búsqueda: vista de solo lectura sobre un ArticleRecord
+
+    Se comporta como el dict que devolvía la búsqueda (id, title, content,
+    metadatos, puntuaciones y "passages") pero no copia el registro. Al ser
+    inmutable puede compartirse entre peticiones (por ejemplo, desde caché).
+    """
+
+    __slots__ = ("record", "scores", "passages")
+
+    def __init__(self, record: ArticleRecord, scores: Dict[str, float],
+                 passages: List[PassageView]):
+        self.record = record
+        self.scores = scores
+        self.passages = passages
+
+    def __getitem__(self, key: str):
+        if key == "passages":
+            return self.passages
+        if key in self.scores:
+            return self.scores[key]
+        if key in ArticleRecord.FIELDS:
+            return getattr(self.record, key)
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        yield from ArticleRecord.FIELDS
+        yield from self.scores
+        yield "passages"
+
+    def __len__(self) -> int:
+        return len(ArticleRecord.FIELDS) + len(self.scores) + 1
+
+    def to_dict(self) -> Dict:
+        """Copia serializable (JSON) del resultado"""
+        result = self.record.to_dict()
+        result.update(self.scores)
+        result["passages"] = [dict(passage) for passage in self.passages]
+        return result
@@ -0,0 +1,219 @@
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional
+from utils.firestore_utils import FirestoreManager
+from .embeddings import EmbeddingManager, embedding_manager
+
+class ReindexJob:
+    """
+    Trabajo de reindexación en segundo plano
+
+    Fases:
+    - reading: lectura por lotes de Firestore hacia un índice en sombra
+    - vectorizing: vectorización por lotes de los pasajes del corpus leído
+    - swapping: intercambio atómico con el índice que sirve las búsquedas
+    """
+
+    def __init__(self, requested_by: Optional[str], batch_size: int,
+                 max_docs_per_second: Optional[float]):
+        self.id = str(uuid.uuid4())
+        self.requested_by = requested_by
+        self.batch_size = batch_size
+        self.max_docs_per_second = max_docs_per_second
+
+        self.status = "pending"
+        self.phase = "pending"
+        self.total_articles: Optional[int] = None
+        self.articles_read = 0
+        self.total_passages: Optional[int] = None
+        self.passages_vectorized = 0
+        self.errors: List[str] = []
+        # Problemas que no invalidan el trabajo (p. ej. no se pudo guardar el snapshot)
+        self.warnings: List[str] = []
+        self.created_at = datetime.utcnow()
+        self.started_at: Optional[float] = None
+        self.phase_started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    def set_phase(self, phase: str):
+        self.phase = phase
+        self.phase_started_at = time.time()
+
+    def _rate_and_eta(self):
+        """Calcular unidades/segundo (artículos al leer, pasajes al vectorizar) y ETA de la fase actual"""
+        if self.phase_started_at is None:
+            return 0.0, None
+
+        started_at = self.phase_started_at
+        if self.phase == "vectorizing":
+            processed, total = self.passages_vectorized, self.total_passages
+        else:
+            processed, total = self.articles_read, self.total_articles
+            if self.status != "running":
+                # Trabajo terminado: velocidad media de todo el trabajo
+                started_at = self.started_at
+
+        elapsed = (self.finished_at or time.time()) - started_at
+        rate = processed / elapsed if elapsed > 0 else 0.0
+
+        if self.status != "running" or not rate or total is None:
+            return rate, None
+
+        return rate, max(total - processed, 0) / rate
+
+    def to_dict(self) -> Dict:
+        rate, eta = self._rate_and_eta()
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "phase": self.phase,
+            "requested_by": self.requested_by,
+            "total_articles": self.total_articles,
+            "articles_read": self.articles_read,
+            "total_passages": self.total_passages,
+            "passages_vectorized": self.passages_vectorized,
+            "docs_per_second": round(rate, 1),
+            "eta_seconds": round(eta, 1) if eta is not None else None,
+            "batch_size": self.batch_size,
+            "max_docs_per_second": self.max_docs_per_second,
+            "errors": self.errors[-10:],
+            "warnings": self.warnings[-10:],
+            "created_at": self.created_at.isoformat()
+        }
+
+class ReindexJobManager:
+    """
+    Gestor de trabajos de reindexación
+
+    Construye un índice en sombra a partir de Firestore y lo intercambia de
+    forma atómica con el índice activo, que sigue atendiendo búsquedas
+    durante toda la reconstrucción. Solo se ejecuta un trabajo a la vez.
+    """
+
+    def __init__(self, manager: EmbeddingManager,
+                 page_source: Callable[[int], Iterable[List[Dict]]],
+                 count_source: Callable[[], Optional[int]],
+                 snapshot_dir: Optional[str] = None, max_jobs: int = 20):
+        """
+        Inicializar gestor
+
+        Args:
+            manager: Índice activo
+            page_source: Función batch_size -> iterable de páginas de artículos
+            count_source: Función que devuelve el total de artículos (o None)
+            snapshot_dir: Directorio donde guardar un snapshot tras cada reindexación
+                (None con el índice compartido: publica el constructor)
+            max_jobs: Trabajos terminados que se conservan para consulta
+        """
+        self.manager = manager
+        self.page_source = page_source
+        self.count_source = count_source
+        self.snapshot_dir = snapshot_dir
+        self.max_jobs = max_jobs
+
+        self._jobs: "OrderedDict[str, ReindexJob]" = OrderedDict()
+        self._current: Optional[ReindexJob] = None
+        self._lock = threading.Lock()
+
+    def start_job(self, requested_by: Optional[str] = None, batch_size: int = 200,
+                  max_docs_per_second: Optional[float] = None) -> ReindexJob:
+        """
+        Iniciar una reindexación (o devolver la que ya está en curso)
+
+        Args:
+            requested_by: Email del usuario que la solicita
+            batch_size: Artículos por lectura y pasajes por lote de vectorización
+            max_docs_per_second: Límite de lectura para no saturar Firestore
+
+        Returns:
+            ReindexJob: Trabajo iniciado o en curso
+        """
+        with self._lock:
+            if self._current is not None and self._current.status in ("pending", "running"):
+                return self._current
+
+            job = ReindexJob(requested_by, batch_size, max_docs_per_second)
+            self._jobs[job.id] = job
+            while len(self._jobs) > self.max_jobs:
+                self._jobs.popitem(last=False)
+            self._current = job
+
+        threading.Thread(target=self._run, args=(job,), name=f"reindex-{job.id[:8]}",
+                         daemon=True).start()
+        return job
+
+    def get_job(self, job_id: str) -> Optional[ReindexJob]:
+        return self._jobs.get(job_id)
+
+    def _run(self, job: ReindexJob):
+        """Ejecutar la reindexación completa"""
+        job.status = "running"
+        job.started_at = time.time()
+        print(f"🔄 Reindexación {job.id} iniciada")
+
+        shadow = self.manager.create_shadow()
+        self.manager.start_change_capture()
+
+        try:
+            job.set_phase("reading")
+            job.total_articles = self.count_source()
+
+            for page in self.page_source(job.batch_size):
+                page_started = time.time()
+                try:
+                    # Solo índice léxico y registros; se vectoriza al final con el IDF completo
+                    shadow.add_articles_bulk(page, encode=False)
+                except Exception as e:
+                    job.errors.append(f"Lote desde artículo {job.articles_read}: {str(e)}")
+                job.articles_read += len(page)
+
+                if job.max_docs_per_second:
+                    min_duration = len(page) / job.max_docs_per_second
+                    time.sleep(max(0.0, min_duration - (time.time() - page_started)))
+
+            if job.total_articles is None:
+                job.total_articles = job.articles_read
+
+            job.set_phase("vectorizing")
+
+            def report(done: int, total: int):
+                job.passages_vectorized = done
+                job.total_passages = total
+
+            shadow._rebuild_embeddings_matrix(batch_size=job.batch_size, progress=report)
+
+            job.set_phase("swapping")
+            self.manager.swap_index(shadow)
+
+            if self.snapshot_dir:
+                # El índice nuevo ya está activo: un fallo al guardar no invalida el trabajo
+                try:
+                    self.manager.save_snapshot(self.snapshot_dir)
+                except Exception as e:
+                    job.warnings.append(f"Snapshot no guardado: {str(e)}")
+                    print(f"⚠️  Reindexación {job.id}: snapshot no guardado: {str(e)}")
+
+            job.status = "completed"
+            job.phase = "done"
+            print(f"✅ Reindexación {job.id} completada: {len(self.manager.articles_data)} artículos")
+
+        except Exception as e:
+            self.manager.stop_change_capture()
+            job.status = "failed"
+            job.errors.append(str(e))
+            print(f"❌ Error en reindexación {job.id}: {str(e)}")
+
+        finally:
+            job.finished_at = time.time()
+
+# Instancia global del gestor de reindexación
+reindex_manager = ReindexJobManager(
+    embedding_manager,
+    FirestoreManager.iter_article_pages,
+    FirestoreManager.count_articles,
+    snapshot_dir=os.getenv("INDEX_SNAPSHOT_DIR") or None
+)
@@ -0,0 +1,391 @@
+import heapq
+import json
+import math
+import os
+import re
+import numpy as np
+from collections import Counter
+from collections.abc import Mapping
+from operator import itemgetter
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+# Tokens alfanuméricos (incluye letras acentuadas y ñ)
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+def tokenize(text: str) -> List[str]:
+    """
+    Dividir un texto en tokens en minúsculas
+
+    Args:
+        text: Texto a tokenizar
+
+    Returns:
+        List[str]: Lista de tokens
+    """
+    return _TOKEN_RE.findall(text.lower())
+
+class FrozenPostings(Mapping):
+    """
+    Postings de solo lectura en formato CSR (término -> rango de arrays)
+
+    Los arrays suelen venir de np.load(mmap_mode="r"): varios procesos que
+    abren el mismo snapshot comparten esas páginas a través de la caché del
+    sistema operativo en lugar de tener cada uno su copia.
+
+    Las consultas usan doc_freq y arrays, que leen los rangos sin construir
+    diccionarios; el acceso como Mapping (term -> {doc_id: tf}) queda para
+    copiar el índice a memoria o guardarlo.
+    """
+
+    def __init__(self, terms: List[str], offsets: np.ndarray, doc_ids: np.ndarray, tfs: np.ndarray):
+        self._terms = {term: i for i, term in enumerate(terms)}
+        self._offsets = offsets
+        self._doc_ids = doc_ids
+        self._tfs = tfs
+
+    def __getitem__(self, term: str) -> Dict[int, int]:
+        i = self._terms[term]
+        start, end = int(self._offsets[i]), int(self._offsets[i + 1])
+        return dict(zip(self._doc_ids[start:end].tolist(), self._tfs[start:end].tolist()))
+
+    def __contains__(self, term) -> bool:
+        return term in self._terms
+
+    def doc_freq(self, term: str) -> int:
+        """Documentos que contienen el término (0 si no está en el vocabulario)"""
+        i = self._terms.get(term)
+        if i is None:
+            return 0
+        return int(self._offsets[i + 1] - self._offsets[i])
+
+    def arrays(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Vistas (doc_ids, tfs) de los postings de un término, sin copiarlos"""
+        i = self._terms[term]
+        start, end = int(self._offsets[i]), int(self._offsets[i + 1])
+        return self._doc_ids[start:end], self._tfs[start:end]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._terms)
+
+    def __len__(self) -> int:
+        return len(self._terms)
+
+class InvertedIndex:
+    """
+    Índice invertido con puntuación BM25
+
+    Mantiene las listas de postings (término -> {doc_id: frecuencia}) a medida
+    que se agregan documentos, de modo que una consulta solo recorre los
+    postings de sus propios términos en lugar de todo el corpus.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        """
+        Inicializar índice vacío
+
+        Args:
+            k1: Saturación de la frecuencia del término
+            b: Peso de la normalización por longitud del documento
+        """
+        self.k1 = k1
+        self.b = b
+
+        # Diccionarios en memoria, o arrays de solo lectura tras load (ver _thaw)
+        self.postings: Dict[str, Dict[int, int]] = {}
+        self.doc_lengths: Dict[int, int] = {}
+        self.total_length = 0
+
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+
+    @property
+    def vocabulary_size(self) -> int:
+        return len(self.postings)
+
+    @property
+    def is_frozen(self) -> bool:
+        return isinstance(self.postings, FrozenPostings)
+
+    def _thaw(self):
+        """Copiar a memoria un índice de solo lectura antes de modificarlo (copia en escritura)"""
+        if not self.is_frozen:
+            return
+        self.postings = {term: self.postings[term] for term in self.postings}
+        self.doc_lengths = {doc_id: int(length) for doc_id, length in enumerate(self.doc_lengths)}
+
+    def add_document(self, doc_id: int, tokens: Iterable[str]):
+        """
+        Indexar un documento
+
+        Args:
+            doc_id: ID interno del documento
+            tokens: Tokens del documento
+        """
+        self._thaw()
+        counts = Counter(tokens)
+        length = sum(counts.values())
+
+        for term, tf in counts.items():
+            self.postings.setdefault(term, {})[doc_id] = tf
+
+        self.doc_lengths[doc_id] = length
+        self.total_length += length
+
+    def remove_document(self, doc_id: int, tokens: Iterable[str]):
+        """
+        Eliminar un documento de los postings
+
+        Args:
+            doc_id: ID interno del documento
+            tokens: Tokens con los que se indexó el documento
+        """
+        self._thaw()
+        if doc_id not in self.doc_lengths:
+            return
+
+        for term in set(tokens):
+            postings = self.postings.get(term)
+            if postings is None:
+                continue
+            postings.pop(doc_id, None)
+            if not postings:
+                del self.postings[term]
+
+        self.total_length -= self.doc_lengths.pop(doc_id)
+
+    def remap(self, mapping: Dict[int, int]):
+        """
+        Renumerar los IDs internos (usado al compactar)
+
+        Args:
+            mapping: ID interno anterior -> ID interno nuevo
+        """
+        self._thaw()
+        self.postings = {
+            term: {mapping[doc_id]: tf for doc_id, tf in postings.items()}
+            for term, postings in self.postings.items()
+        }
+        self.doc_lengths = {
+            mapping[doc_id]: length for doc_id, length in self.doc_lengths.items()
+        }
+
+    def save(self, directory: str):
+        """
+        Guardar el índice en formato CSR (arrays .npy mapeables en memoria)
+
+        Los IDs internos deben ser contiguos (0..n-1), como tras compactar.
+
+        Args:
+            directory: Directorio del snapshot
+        """
+        if not self.is_frozen and list(self.doc_lengths) != list(range(len(self.doc_lengths))):
+            raise ValueError("El índice debe compactarse antes de guardarse")
+
+        terms = list(self.postings)
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        doc_ids, tfs = [], []
+        for i, term in enumerate(terms):
+            postings = self.postings[term]
+            doc_ids.extend(postings.keys())
+            tfs.extend(postings.values())
+            offsets[i + 1] = offsets[i] + len(postings)
+
+        lengths = [int(self.doc_lengths[doc_id]) for doc_id in range(len(self.doc_lengths))]
+        with open(os.path.join(directory, "lexical.json"), "w", encoding="utf-8") as f:
+            json.dump({"k1": self.k1, "b": self.b, "total_length": self.total_length, "terms": terms}, f,
+                      ensure_ascii=False)
+        np.save(os.path.join(directory, "lexical_offsets.npy"), offsets)
+        np.save(os.path.join(directory, "lexical_doc_ids.npy"), np.asarray(doc_ids, dtype=np.int32))
+        np.save(os.path.join(directory, "lexical_tfs.npy"), np.asarray(tfs, dtype=np.int32))
+        np.save(os.path.join(directory, "lexical_doc_lengths.npy"), np.asarray(lengths, dtype=np.int32))
+
+    @classmethod
+    def load(cls, directory: str) -> "InvertedIndex":
+        """
+        Abrir un índice guardado con save, en modo solo lectura y mapeado en memoria
+
+        Las consultas leen los arrays directamente; la primera modificación
+        copia el índice a memoria.
+
+        Args:
+            directory: Directorio del snapshot
+
+        Returns:
+            InvertedIndex: Índice listo para consultas
+        """
+        with open(os.path.join(directory, "lexical.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+
+        index = cls(k1=meta["k1"], b=meta["b"])
+        index.total_length = meta["total_length"]
+        index.postings = FrozenPostings(
+            meta["terms"],
+            np.load(os.path.join(directory, "lexical_offsets.npy"), mmap_mode="r"),
+            np.load(os.path.join(directory, "lexical_doc_ids.npy"), mmap_mode="r"),
+            np.load(os.path.join(directory, "lexical_tfs.npy"), mmap_mode="r")
+        )
+        index.doc_lengths = np.load(os.path.join(directory, "lexical_doc_lengths.npy"), mmap_mode="r")
+        return index
+
+    def doc_freq(self, term: str) -> int:
+        """
+        Número de documentos que contienen un término
+
+        Args:
+            term: Término a consultar
+
+        Returns:
+            int: Frecuencia documental (0 si no está en el vocabulario)
+        """
+        if self.is_frozen:
+            return self.postings.doc_freq(term)
+        postings = self.postings.get(term)
+        return len(postings) if postings else 0
+
+    def idf(self, term: str) -> float:
+        """
+        Calcular IDF (variante BM25, siempre positiva) de un término
+
+        Args:
+            term: Término a consultar
+
+        Returns:
+            float: IDF del término (0.0 si no está en el vocabulario)
+        """
+        return self._idf(self.doc_freq(term))
+
+    def _idf(self, df: int) -> float:
+        if not df:
+            return 0.0
+        n_docs = len(self.doc_lengths)
+        return math.log(1.0 + (n_docs - df + 0.5) / (df + 0.5))
+
+    def search(self, query_tokens: Iterable[str], k: int,
+               allowed: Optional[Sequence[bool]] = None) -> List[Tuple[int, float, float]]:
+        """
+        Buscar los k documentos con mayor puntuación BM25
+
+        Args:
+            query_tokens: Tokens de la consulta
+            k: Número de documentos a retornar
+            allowed: Máscara de documentos permitidos (None = todos); los
+                demás se saltan sin puntuarlos
+
+        Returns:
+            List[Tuple[int, float, float]]: (doc_id, puntuación BM25,
+            puntuación normalizada en [0, 1]) ordenados de mayor a menor
+        """
+        return self.search_many([query_tokens], k, allowed)[0]
+
+    def search_many(self, queries: Sequence[Iterable[str]], k: int,
+                    allowed: Optional[Sequence[bool]] = None) -> List[List[Tuple[int, float, float]]]:
+        """
+        Buscar varias consultas recorriendo una sola vez los postings de cada término
+
+        Un término presente en varias consultas (habitual en un lote de
+        preguntas del mismo tema) se lee y se puntúa una vez, y su aportación
+        se suma a cada consulta que lo contiene.
+
+        Args:
+            queries: Tokens de cada consulta
+            k: Número de documentos a retornar por consulta
+            allowed: Máscara de documentos permitidos (None = todos)
+
+        Returns:
+            List[List[Tuple[int, float, float]]]: Resultados de cada consulta (ver search)
+        """
+        results: List[List[Tuple[int, float, float]]] = [[] for _ in queries]
+        if not len(self.doc_lengths) or k <= 0:
+            return results
+
+        avg_length = self.total_length / len(self.doc_lengths) or 1.0
+        k1 = self.k1
+        b = self.b
+
+        queries_by_term: Dict[str, List[int]] = {}
+        for i, tokens in enumerate(queries):
+            for term in set(tokens):
+                queries_by_term.setdefault(term, []).append(i)
+
+        scores: List[Dict[int, float]] = [{} for _ in queries]
+        # Puntuación de un documento de longitud media que contiene cada
+        # término una vez; sirve para normalizar la puntuación a [0, 1]
+        reference_scores = [0.0] * len(queries)
+
+        # Índice de solo lectura: se puntúa sobre los rangos CSR con numpy y
+        # las aportaciones se suman al final, sin diccionarios por término
+        frozen = self.is_frozen
+        frozen_parts: List[List[Tuple[np.ndarray, np.ndarray]]] = [[] for _ in queries]
+        allowed_mask = np.asarray(allowed, dtype=bool) if frozen and allowed is not None else None
+
+        for term, query_ids in queries_by_term.items():
+            df = self.doc_freq(term)
+            if not df:
+                continue
+
+            idf = self._idf(df)
+            for i in query_ids:
+                reference_scores[i] += idf
+
+            if frozen:
+                part = self._frozen_weights(term, idf, avg_length, allowed_mask)
+                for i in query_ids:
+                    frozen_parts[i].append(part)
+                continue
+
+            postings = self.postings[term]
+
+            single = scores[query_ids[0]] if len(query_ids) == 1 else None
+            for doc_id, tf in postings.items():
+                if allowed is not None and not allowed[doc_id]:
+                    continue
+                norm = k1 * (1.0 - b + b * self.doc_lengths[doc_id] / avg_length)
+                weight = idf * tf * (k1 + 1.0) / (tf + norm)
+                if single is not None:
+                    single[doc_id] = single.get(doc_id, 0.0) + weight
+                    continue
+                for i in query_ids:
+                    scores[i][doc_id] = scores[i].get(doc_id, 0.0) + weight
+
+        for i, query_scores in enumerate(scores):
+            if frozen:
+                top = self._frozen_top(frozen_parts[i], k)
+            elif query_scores:
+                top = heapq.nlargest(k, query_scores.items(), key=itemgetter(1))
+            else:
+                continue
+            if not top:
+                continue
+            results[i] = [
+                (doc_id, score, min(score / reference_scores[i], 1.0))
+                for doc_id, score in top
+            ]
+        return results
+
+    def _frozen_weights(self, term: str, idf: float, avg_length: float,
+                        allowed: Optional[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        """Aportación BM25 de un término a cada documento que lo contiene (índice de solo lectura)"""
+        doc_ids, tfs = self.postings.arrays(term)
+        if allowed is not None:
+            keep = allowed[doc_ids]
+            doc_ids, tfs = doc_ids[keep], tfs[keep]
+        tfs = tfs.astype(np.float64)
+        norm = self.k1 * (1.0 - self.b + self.b * self.doc_lengths[doc_ids] / avg_length)
+        return doc_ids, idf * tfs * (self.k1 + 1.0) / (tfs + norm)
+
+    @staticmethod
+    def _frozen_top(parts: List[Tuple[np.ndarray, np.ndarray]], k: int) -> List[Tuple[int, float]]:
+        """Sumar las aportaciones de los términos de una consulta y elegir los k mejores documentos"""
+        if not parts:
+            return []
+        doc_ids = np.concatenate([ids for ids, _ in parts])
+        if not len(doc_ids):
+            return []
+        docs, positions = np.unique(doc_ids, return_inverse=True)
+        totals = np.bincount(positions, weights=np.concatenate([weights for _, weights in parts]))
+        if len(totals) > k:
+            best = np.argpartition(-totals, k - 1)[:k]
+        else:
+            best = np.arange(len(totals))
+        best = best[np.argsort(-totals[best], kind="stable")]
+        return list(zip(docs[best].tolist(), totals[best].tolist()))
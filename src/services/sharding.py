@@ -0,0 +1,339 @@
+import heapq
+import itertools
+import multiprocessing
+import os
+import sys
+import threading
+import zlib
+from concurrent.futures import Future
+from itertools import chain
+from typing import Dict, List, Optional, Tuple
+
+# Resultado de un shard: (ID del artículo, puntuaciones, [(inicio, fin, similitud) de sus pasajes])
+ShardHit = Tuple[str, Dict[str, float], List[Tuple[int, int, float]]]
+
+def _shard_worker(connection, manager_params: Dict):
+    """
+    Bucle de un proceso shard: mantiene su propio EmbeddingManager con su
+    parte del corpus y atiende las peticiones que llegan por la tubería
+
+    Cada respuesta lleva el ID de su petición, así que el proceso principal
+    puede tener varias peticiones en curso en la misma tubería.
+    """
+    from .embeddings import EmbeddingManager
+
+    # Los mensajes de cada alta y consulta ya los imprime el proceso principal;
+    # los errores vuelven por la tubería
+    sys.stdout = open(os.devnull, "w")
+
+    manager = EmbeddingManager(**manager_params)
+    while True:
+        request_id, operation, payload = connection.recv()
+        if operation == "close":
+            break
+
+        try:
+            if operation == "upsert":
+                result = manager.add_articles_bulk(payload)
+            elif operation == "remove":
+                result = sum(manager.remove_article(article_id) for article_id in payload)
+            elif operation == "reset":
+                manager._retriever_pool.shutdown(wait=False)
+                manager = EmbeddingManager(**manager_params)
+                result = manager.add_articles_bulk(payload)
+            elif operation == "search":
+                result = [
+                    (
+                        hit.record.id,
+                        hit.scores,
+                        [(passage.start, passage.end, passage.similarity_score) for passage in hit.passages]
+                    )
+                    for hit in manager.search_similar_articles(*payload)
+                ]
+            elif operation == "stats":
+                result = manager.get_index_stats()
+            else:
+                raise ValueError(f"Operación de shard desconocida: {operation}")
+            connection.send((request_id, True, result))
+        except Exception as e:
+            connection.send((request_id, False, str(e)))
+
+    connection.close()
+
+def _fuse_shard_hits(hits: List[ShardHit], lexical_weight: float, vector_weight: float,
+                     rrf_k: int) -> List[ShardHit]:
+    """
+    Recalcular la fusión RRF de los resultados de todos los shards
+
+    Cada resultado conserva su BM25 y su coseno brutos; con ellos se forman
+    los rankings globales y se suma peso / (rrf_k + posición) de cada uno.
+
+    Returns:
+        List[ShardHit]: Los mismos resultados con rrf_score global
+    """
+    fused = [0.0] * len(hits)
+    for score_key, weight in (("bm25_score", lexical_weight), ("vector_score", vector_weight)):
+        ranked = sorted(
+            (position for position, hit in enumerate(hits) if score_key in hit[1]),
+            key=lambda position: hits[position][1][score_key], reverse=True
+        )
+        for rank, position in enumerate(ranked, start=1):
+            fused[position] += weight / (rrf_k + rank)
+
+    return [
+        (article_id, {**scores, "rrf_score": score}, passages)
+        for (article_id, scores, passages), score in zip(hits, fused)
+    ]
+
+class ShardedSearchPool:
+    """
+    Búsqueda scatter-gather sobre shards en procesos locales
+
+    El corpus se reparte por artículo (hash estable del ID) entre N procesos,
+    cada uno con su propio índice BM25 + vectorial. Una consulta se envía a
+    todos los shards a la vez, cada uno puntúa su parte en su propio núcleo y
+    devuelve su top-k; los resultados se fusionan con un heap.
+
+    Como en cualquier índice distribuido, cada shard usa sus estadísticas
+    locales (IDF de BM25 y del vectorizador), así que el orden global es una
+    aproximación del que daría un único índice; con shards de tamaño parecido
+    la diferencia es pequeña.
+
+    Los procesos se arrancan en el primer uso (con "spawn", para no heredar
+    hilos ni locks del proceso principal). Las peticiones concurrentes no se
+    esperan entre sí: cada una lleva un ID y un hilo por tubería entrega cada
+    respuesta a la petición que la espera.
+    """
+
+    def __init__(self, shards: int, manager_params: Dict):
+        """
+        Inicializar pool (sin arrancar procesos)
+
+        Args:
+            shards: Número de shards (procesos)
+            manager_params: Argumentos del EmbeddingManager de cada shard
+
+        Raises:
+            ValueError: Si shards es menor que 1
+        """
+        if shards < 1:
+            raise ValueError(f"Número de shards no válido: {shards}")
+
+        self.shards = shards
+        self.manager_params = manager_params
+
+        self._connections = []
+        self._processes = []
+        # Protege el arranque y la parada de los procesos
+        self._lock = threading.Lock()
+        # Un envío a la vez por tubería; las respuestas las lee su hilo receptor
+        self._send_locks: List[threading.Lock] = []
+        self._receivers: List[threading.Thread] = []
+        # Peticiones en curso: ID -> (shard, futuro de la respuesta)
+        self._pending: Dict[int, Tuple[int, Future]] = {}
+        self._pending_lock = threading.Lock()
+        self._request_ids = itertools.count()
+
+    @property
+    def is_running(self) -> bool:
+        return bool(self._processes)
+
+    def _ensure_started(self):
+        """Arrancar los procesos shard (requiere tener el lock)"""
+        if self._processes:
+            return
+
+        context = multiprocessing.get_context("spawn")
+        for shard in range(self.shards):
+            parent_end, child_end = context.Pipe()
+            process = context.Process(
+                target=_shard_worker, args=(child_end, self.manager_params),
+                name=f"search-shard-{shard}", daemon=True
+            )
+            process.start()
+            child_end.close()
+            self._connections.append(parent_end)
+            self._processes.append(process)
+            self._send_locks.append(threading.Lock())
+
+            receiver = threading.Thread(
+                target=self._receive, args=(shard, parent_end),
+                name=f"search-shard-{shard}-receiver", daemon=True
+            )
+            receiver.start()
+            self._receivers.append(receiver)
+
+        print(f"✅ {self.shards} shards de búsqueda iniciados")
+
+    def _receive(self, shard: int, connection):
+        """Entregar las respuestas de un shard a sus peticiones (hilo receptor)"""
+        while True:
+            try:
+                request_id, ok, result = connection.recv()
+            except (EOFError, OSError):
+                break
+
+            with self._pending_lock:
+                _, future = self._pending.pop(request_id)
+            if ok:
+                future.set_result(result)
+            else:
+                future.set_exception(RuntimeError(f"Error en el shard {shard}: {result}"))
+
+        # Tubería cerrada: las peticiones pendientes de este shard ya no tendrán respuesta
+        with self._pending_lock:
+            orphaned = [request_id for request_id, (owner, _) in self._pending.items() if owner == shard]
+            futures = [self._pending.pop(request_id)[1] for request_id in orphaned]
+        for future in futures:
+            future.set_exception(RuntimeError(f"El shard {shard} se detuvo"))
+
+    def _submit(self, shard: int, request: Tuple[str, object]) -> Future:
+        """Enviar una petición a un shard sin esperar su respuesta"""
+        request_id = next(self._request_ids)
+        future = Future()
+        with self._pending_lock:
+            self._pending[request_id] = (shard, future)
+        try:
+            with self._send_locks[shard]:
+                self._connections[shard].send((request_id, *request))
+        except Exception:
+            with self._pending_lock:
+                self._pending.pop(request_id, None)
+            raise
+        return future
+
+    def shard_of(self, article_id: str) -> int:
+        """Shard que guarda un artículo (crc32: estable entre procesos y reinicios)"""
+        return zlib.crc32(article_id.encode("utf-8")) % self.shards
+
+    def _scatter(self, requests: Dict[int, Tuple[str, object]]) -> Dict[int, object]:
+        """
+        Enviar una petición a cada shard indicado y esperar todas las respuestas
+
+        Solo se espera a las respuestas propias: otras peticiones pueden estar
+        en curso a la vez en los mismos shards.
+
+        Raises:
+            RuntimeError: Si algún shard falla
+        """
+        with self._lock:
+            self._ensure_started()
+        futures = {shard: self._submit(shard, request) for shard, request in requests.items()}
+        return {shard: future.result() for shard, future in futures.items()}
+
+    def _partition(self, articles: List[Dict]) -> Dict[int, List[Dict]]:
+        partitions: Dict[int, List[Dict]] = {}
+        for article in articles:
+            partitions.setdefault(self.shard_of(article["id"]), []).append(article)
+        return partitions
+
+    def upsert(self, articles: List[Dict]) -> int:
+        """
+        Agregar o reemplazar artículos en sus shards
+
+        Args:
+            articles: Artículos (dicts con id, title, content y metadatos)
+
+        Returns:
+            int: Número de artículos indexados
+        """
+        requests = {shard: ("upsert", batch) for shard, batch in self._partition(articles).items()}
+        return sum(self._scatter(requests).values())
+
+    def remove(self, article_ids: List[str]) -> int:
+        """
+        Retirar artículos de sus shards
+
+        Returns:
+            int: Número de artículos que estaban indexados
+        """
+        partitions: Dict[int, List[str]] = {}
+        for article_id in article_ids:
+            partitions.setdefault(self.shard_of(article_id), []).append(article_id)
+        requests = {shard: ("remove", batch) for shard, batch in partitions.items()}
+        return sum(self._scatter(requests).values())
+
+    def reset(self, articles: List[Dict]) -> int:
+        """
+        Reemplazar el contenido de todos los shards (tras cargar o intercambiar el índice)
+
+        Returns:
+            int: Número de artículos indexados
+        """
+        partitions = self._partition(articles)
+        requests = {shard: ("reset", partitions.get(shard, [])) for shard in range(self.shards)}
+        return sum(self._scatter(requests).values())
+
+    def search(self, query: str, k: int, mode: str, lexical_weight: float = 1.0,
+               vector_weight: float = 1.0, filters: Optional[Dict[str, List[str]]] = None,
+               rrf_k: int = 60) -> List[ShardHit]:
+        """
+        Buscar en todos los shards en paralelo y fusionar sus top-k
+
+        Los resultados léxicos se ordenan por BM25 bruto y los híbridos se
+        vuelven a fusionar con RRF sobre los rankings globales de BM25 y coseno.
+
+        Args:
+            query: Consulta del usuario
+            k: Número de artículos a retornar
+            mode: Modo de búsqueda ya resuelto (hybrid, vector o lexical)
+            lexical_weight: Peso del ranking BM25 en la fusión híbrida
+            vector_weight: Peso del ranking vectorial en la fusión híbrida
+            filters: Filtros de metadatos en forma canónica
+            rrf_k: Constante de la fusión RRF (como EmbeddingManager.RRF_K)
+
+        Returns:
+            List[ShardHit]: Los k mejores artículos de todos los shards
+        """
+        request = ("search", (query, k, mode, lexical_weight, vector_weight, filters))
+        replies = self._scatter({shard: request for shard in range(self.shards)})
+        hits = list(chain.from_iterable(replies.values()))
+
+        # La similitud léxica y la fusión RRF de cada shard son relativas a sus
+        # propios resultados (su mejor artículo siempre puntúa lo máximo): se
+        # fusiona con las puntuaciones brutas, comparables entre shards
+        if mode == "hybrid":
+            hits = _fuse_shard_hits(hits, lexical_weight, vector_weight, rrf_k)
+            score_key = "rrf_score"
+        elif mode == "lexical":
+            score_key = "bm25_score"
+        else:
+            score_key = "similarity_score"
+        return heapq.nlargest(
+            k, hits,
+            key=lambda hit: (hit[1].get(score_key, 0.0), hit[1]["similarity_score"])
+        )
+
+    def close(self):
+        """Detener los procesos shard"""
+        with self._lock:
+            for connection, send_lock in zip(self._connections, self._send_locks):
+                try:
+                    with send_lock:
+                        connection.send((None, "close", None))
+                except OSError:
+                    pass
+            for process in self._processes:
+                process.join(timeout=5)
+            for connection in self._connections:
+                connection.close()
+            for receiver in self._receivers:
+                receiver.join(timeout=5)
+            self._connections = []
+            self._processes = []
+            self._send_locks = []
+            self._receivers = []
+
+    def get_stats(self) -> Dict:
+        """
+        Obtener estadísticas de los shards
+
+        Returns:
+            Dict: Número de shards y, si están en marcha, artículos y pasajes de cada uno
+        """
+        stats = {"shards": self.shards, "running": self.is_running}
+        if self.is_running:
+            replies = self._scatter({shard: ("stats", None) for shard in range(self.shards)})
+            stats["articles_per_shard"] = [replies[shard]["total_articles"] for shard in range(self.shards)]
+            stats["passages_per_shard"] = [replies[shard]["total_passages"] for shard in range(self.shards)]
+        return stats
@@ -0,0 +1,63 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+class SingleFlight:
+    """
+    Agrupación de peticiones idénticas en curso (single-flight)
+
+    La primera petición con una clave lanza el trabajo; las que llegan con la
+    misma clave mientras sigue en curso esperan ese mismo futuro en lugar de
+    repetirlo, y todas reciben su resultado (o su excepción). Al terminar, la
+    clave se libera: las peticiones posteriores vuelven a ejecutar el trabajo
+    (o lo sirven desde las cachés).
+
+    El trabajo compartido está protegido con asyncio.shield: si un cliente
+    se desconecta, se cancela su espera pero no el trabajo de los demás.
+    Pensado para el event loop de cada worker (no es seguro entre hilos).
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[Hashable, asyncio.Future] = {}
+
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, work: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Ejecutar el trabajo de una clave o unirse al que ya está en curso
+
+        Args:
+            key: Clave de la petición (peticiones iguales, misma clave)
+            work: Función sin argumentos que devuelve la corrutina del trabajo
+
+        Returns:
+            El resultado del trabajo compartido
+        """
+        future = self._in_flight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(work())
+            self._in_flight[key] = future
+            future.add_done_callback(lambda _: self._in_flight.pop(key, None))
+            self.leaders += 1
+        else:
+            self.coalesced += 1
+
+        return await asyncio.shield(future)
+
+    def get_stats(self) -> Dict:
+        """
+        Obtener contadores de agrupación
+
+        Returns:
+            Dict: Trabajos ejecutados, peticiones agrupadas y trabajos en curso
+        """
+        requests = self.leaders + self.coalesced
+        return {
+            "in_flight": len(self._in_flight),
+            "executed": self.leaders,
+            "coalesced": self.coalesced,
+            "coalesced_ratio": round(self.coalesced / requests, 3) if requests else 0.0
+        }
+
+# Instancia global para el pipeline de chat
+chat_single_flight = SingleFlight()
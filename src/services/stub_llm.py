@@ -0,0 +1,100 @@
+import asyncio
+import json
+from typing import AsyncIterator, Dict, Tuple
+from urllib.parse import urlsplit
+
+class StubLLMResponse:
+    """Respuesta del LLM local: mismo acceso (.text) que las de Gemini"""
+
+    __slots__ = ("text", "usage")
+
+    def __init__(self, text: str, usage: Dict):
+        self.text = text
+        self.usage = usage
+
+class StubLLMModel:
+    """
+    Cliente del servidor LLM local de pruebas (scripts/stub_llm_server.py)
+
+    Expone generate_content_async(prompt, stream=...) como el modelo de
+    Gemini, así que GeminiService lo usa sin cambios para pruebas de carga
+    sin conexión (LLM_STUB_URL). Habla HTTP directamente sobre asyncio, sin
+    ocupar hilos mientras espera.
+    """
+
+    model_name = "stub"
+
+    def __init__(self, base_url: str, timeout: float = 60.0):
+        """
+        Args:
+            base_url: URL del servidor (por ejemplo, http://127.0.0.1:8090)
+            timeout: Segundos máximos de espera por llamada
+        """
+        parts = urlsplit(base_url)
+        self.host = parts.hostname or "127.0.0.1"
+        self.port = parts.port or 80
+        self.timeout = timeout
+
+        print(f"✅ LLM local de pruebas en {self.host}:{self.port}")
+
+    async def generate_content_async(self, prompt: str, stream: bool = False):
+        """
+        Generar una respuesta
+
+        Args:
+            prompt: Prompt completo
+            stream: True = devolver un iterador asíncrono de fragmentos
+
+        Returns:
+            StubLLMResponse, o un iterador asíncrono de StubLLMResponse si stream
+
+        Raises:
+            RuntimeError: Si el servidor responde con un error (por ejemplo, 429)
+        """
+        reader, writer = await asyncio.wait_for(self._request(prompt, stream), self.timeout)
+        if stream:
+            return self._iter_chunks(reader, writer)
+
+        try:
+            body = await asyncio.wait_for(reader.read(), self.timeout)
+        finally:
+            writer.close()
+        data = json.loads(body)
+        return StubLLMResponse(data["text"], data.get("usage", {}))
+
+    async def _request(self, prompt: str, stream: bool) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        """Enviar la petición y leer la cabecera de la respuesta"""
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        payload = json.dumps({"prompt": prompt, "stream": stream}).encode("utf-8")
+        writer.write(
+            f"POST /v1/generate HTTP/1.1\r\nHost: {self.host}\r\n"
+            f"Content-Type: application/json\r\nContent-Length: {len(payload)}\r\n"
+            f"Connection: close\r\n\r\n".encode("ascii") + payload
+        )
+        await writer.drain()
+
+        status_line = await reader.readline()
+        status = int(status_line.split()[1])
+        while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+            pass
+
+        if status != 200:
+            body = await reader.read()
+            writer.close()
+            raise RuntimeError(f"El LLM local respondió {status}: {body.decode('utf-8', 'replace')}")
+        return reader, writer
+
+    async def _iter_chunks(self, reader: asyncio.StreamReader,
+                           writer: asyncio.StreamWriter) -> AsyncIterator[StubLLMResponse]:
+        """Leer los fragmentos (una línea JSON cada uno) hasta el final"""
+        try:
+            while True:
+                line = await asyncio.wait_for(reader.readline(), self.timeout)
+                if not line:
+                    return
+                data = json.loads(line)
+                if data.get("done"):
+                    return
+                yield StubLLMResponse(data["text"], {})
+        finally:
+            writer.close()
@@ -0,0 +1,44 @@
+import re
+
+# Piezas de hasta 6 caracteres de palabra o un signo: se parece a cómo los
+# tokenizadores BPE / SentencePiece parten el texto en español (las palabras
+# cortas son un token, las largas se dividen) sin cargar ningún vocabulario
+_TOKEN_PATTERN = re.compile(r"\w{1,6}|[^\w\s]")
+
+def count_tokens(text: str) -> int:
+    """
+    Contar tokens de forma aproximada (rápido, sin modelo)
+
+    Args:
+        text: Texto a contar
+
+    Returns:
+        int: Tokens aproximados
+    """
+    return len(_TOKEN_PATTERN.findall(text))
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    Recortar un texto a un máximo de tokens, sin partir palabras
+
+    Args:
+        text: Texto a recortar
+        max_tokens: Tokens máximos
+
+    Returns:
+        str: Prefijo del texto con como mucho max_tokens tokens
+    """
+    if max_tokens <= 0:
+        return ""
+
+    cut = None
+    for count, match in enumerate(_TOKEN_PATTERN.finditer(text), 1):
+        if count > max_tokens:
+            cut = match.start()
+            break
+    if cut is None:
+        return text
+
+    # Volver al último espacio para no dejar media palabra
+    space = text.rfind(" ", 0, cut)
+    return text[:space if space > 0 else cut].rstrip()
@@ -0,0 +1,503 @@
+import os
+import tempfile
+import numpy as np
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Tipos de almacenamiento soportados para los vectores
+SUPPORTED_DTYPES = {
+    "float32": np.float32,
+    "float16": np.float16,
+}
+
+# Filas por bloque al puntuar matrices float16 (acota la memoria temporal)
+_FLOAT16_BLOCK_ROWS = 8192
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """
+    Normalizar vectores (L2) para que el producto punto sea la similitud coseno
+
+    Args:
+        vectors: Matriz (n, d) o vector (d,)
+
+    Returns:
+        np.ndarray: Vectores normalizados en float32
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0.0] = 1.0
+    return vectors / norms
+
+class VectorMatrix:
+    """
+    Matriz de embeddings creciente, contigua y preasignada
+
+    Las filas se agregan en O(d) amortizado (la capacidad se duplica al
+    llenarse) y se reemplazan en el mismo lugar al actualizar un artículo.
+    Los vectores se guardan normalizados, así que la similitud coseno
+    top-k es un único producto matriz-vector seguido de argpartition.
+
+    Con storage_dir las filas viven en un archivo mapeado en memoria en lugar
+    de en RAM: el sistema operativo carga y descarga páginas según se usan.
+    Es útil con índices comprimidos (int8, pq), que solo leen unas pocas filas
+    en precisión completa para reordenar sus candidatos.
+
+    Con keep_rows=False las filas solo se conservan hasta que el índice las
+    codifica y las libera (release): es el modo de los índices comprimidos
+    sin reordenación, que solo necesitan sus códigos. La matriz mantiene
+    entonces únicamente las marcas de filas vivas.
+    """
+
+    def __init__(self, dim: Optional[int] = None, dtype: str = "float32",
+                 initial_capacity: int = 64, storage_dir: Optional[str] = None,
+                 keep_rows: bool = True):
+        """
+        Inicializar matriz vacía
+
+        Args:
+            dim: Dimensión de los vectores (se infiere del primer vector si es None)
+            dtype: Tipo de almacenamiento ("float32" o "float16")
+            initial_capacity: Número de filas preasignadas
+            storage_dir: Directorio (en disco) para guardar las filas mapeadas en
+                memoria (None = en RAM)
+            keep_rows: False para descartar cada fila cuando el índice la libera
+        """
+        if dtype not in SUPPORTED_DTYPES:
+            raise ValueError(f"Tipo de almacenamiento no soportado: {dtype}")
+
+        self.dtype = dtype
+        self.dim = dim
+        self.initial_capacity = max(1, initial_capacity)
+        self.storage_dir = storage_dir
+        self.keep_rows = keep_rows
+
+        self._data: Optional[np.ndarray] = None
+        self._live: Optional[np.ndarray] = None
+        self._rows = 0
+        # Filas aún no liberadas cuando keep_rows=False (fila -> vector normalizado)
+        self._pending: Dict[int, np.ndarray] = {}
+
+        if dim is not None:
+            self._allocate(self.initial_capacity)
+
+    @classmethod
+    def from_array(cls, array: np.ndarray, storage_dir: Optional[str] = None,
+                   keep_rows: bool = True) -> "VectorMatrix":
+        """
+        Crear una matriz sobre un arreglo existente (por ejemplo, np.load con mmap)
+
+        El arreglo se usa sin copiarlo; si es de solo lectura se copia a
+        memoria la primera vez que se modifica una fila.
+
+        Args:
+            array: Matriz (n, d) de vectores ya normalizados
+            storage_dir: Directorio de las filas al copiarlas (ver __init__)
+            keep_rows: False para que las filas (vistas del arreglo) se descarten al liberarlas
+
+        Returns:
+            VectorMatrix: Matriz con todas las filas vivas
+        """
+        dtype = next(name for name, np_type in SUPPORTED_DTYPES.items() if np_type == array.dtype)
+        matrix = cls(dim=None, dtype=dtype, storage_dir=storage_dir, keep_rows=keep_rows)
+        matrix.dim = array.shape[1]
+        matrix._live = np.ones(array.shape[0], dtype=bool)
+        matrix._rows = array.shape[0]
+        if keep_rows:
+            matrix._data = array
+        else:
+            matrix._pending = {row: array[row] for row in range(array.shape[0])}
+        return matrix
+
+    @classmethod
+    def released(cls, dim: int, rows: int, dtype: str = "float32") -> "VectorMatrix":
+        """
+        Crear una matriz sin filas en precisión completa (keep_rows=False) con n filas vivas
+
+        Sirve para cargar un snapshot de un índice comprimido que solo guardó sus códigos.
+
+        Args:
+            dim: Dimensión de los vectores
+            rows: Número de filas vivas
+            dtype: Tipo de almacenamiento
+
+        Returns:
+            VectorMatrix: Matriz con todas las filas vivas y ya liberadas
+        """
+        matrix = cls(dim=dim, dtype=dtype, initial_capacity=max(rows, 1), keep_rows=False)
+        matrix._live[:rows] = True
+        matrix._rows = rows
+        return matrix
+
+    def __len__(self) -> int:
+        return self._rows
+
+    @property
+    def capacity(self) -> int:
+        return 0 if self._live is None else self._live.shape[0]
+
+    @property
+    def matrix(self) -> np.ndarray:
+        """
+        Vista (sin copia) de las filas ocupadas
+
+        Raises:
+            RuntimeError: Si la matriz no conserva las filas (keep_rows=False)
+        """
+        if not self.keep_rows:
+            raise RuntimeError("La matriz no conserva los vectores en precisión completa")
+        if self._data is None:
+            return np.empty((0, self.dim or 0), dtype=SUPPORTED_DTYPES[self.dtype])
+        return self._data[:self._rows]
+
+    @property
+    def has_rows(self) -> bool:
+        """True si todas las filas vivas siguen disponibles en precisión completa"""
+        return self.keep_rows or len(self._pending) == int(self.live_mask().sum())
+
+    @property
+    def nbytes(self) -> int:
+        if not self.keep_rows:
+            return sum(vector.nbytes for vector in self._pending.values())
+        return 0 if self._data is None else self._data.nbytes
+
+    @property
+    def is_mapped(self) -> bool:
+        """True si las filas están en un archivo mapeado en memoria y no en RAM"""
+        return isinstance(self._data, np.memmap)
+
+    def _allocate(self, capacity: int):
+        """Asignar (o ampliar) el almacenamiento a la capacidad indicada"""
+        live = np.zeros(capacity, dtype=bool)
+        if self._live is not None:
+            live[:self._rows] = self._live[:self._rows]
+        if not self.keep_rows:
+            self._live = live
+            return
+
+        shape = (capacity, self.dim)
+        if self.storage_dir is None:
+            data = np.zeros(shape, dtype=SUPPORTED_DTYPES[self.dtype])
+        else:
+            # Archivo anónimo: se borra del directorio en cuanto se mapea, así que
+            # dos matrices (por ejemplo, un índice en sombra) nunca comparten archivo
+            os.makedirs(self.storage_dir, exist_ok=True)
+            fd, path = tempfile.mkstemp(dir=self.storage_dir, suffix=".vectors")
+            os.close(fd)
+            data = np.memmap(path, dtype=SUPPORTED_DTYPES[self.dtype], mode="w+", shape=shape)
+            os.unlink(path)
+
+        if self._data is not None:
+            data[:self._rows] = self._data[:self._rows]
+
+        self._data = data
+        self._live = live
+
+    def _ensure_capacity(self, rows: int):
+        if self.capacity >= rows:
+            if self.keep_rows and not self._data.flags.writeable:
+                # Copia en escritura de una matriz mapeada en memoria
+                self._allocate(self.capacity)
+            return
+        self._allocate(max(rows, 2 * self.capacity, self.initial_capacity))
+
+    def _prepare(self, vectors: np.ndarray) -> np.ndarray:
+        vectors = normalize_rows(vectors)
+        if self.dim is None:
+            self.dim = vectors.shape[-1]
+        elif vectors.shape[-1] != self.dim:
+            raise ValueError(f"Dimensión {vectors.shape[-1]} distinta de la esperada ({self.dim})")
+        return vectors
+
+    def set_row(self, row: int, vector: np.ndarray):
+        """
+        Escribir un vector en una fila (la agrega si row == len(self))
+
+        Args:
+            row: Fila destino
+            vector: Vector de dimensión d
+        """
+        vector = self._prepare(vector)
+        if row > self._rows:
+            raise IndexError(f"Fila {row} fuera de rango ({self._rows} filas)")
+
+        self._ensure_capacity(row + 1)
+        if self.keep_rows:
+            self._data[row] = vector
+        else:
+            self._pending[row] = vector.astype(SUPPORTED_DTYPES[self.dtype])
+        self._live[row] = True
+        if row == self._rows:
+            self._rows += 1
+
+    def append(self, vector: np.ndarray) -> int:
+        """
+        Agregar un vector al final
+
+        Args:
+            vector: Vector de dimensión d
+
+        Returns:
+            int: Fila asignada
+        """
+        row = self._rows
+        self.set_row(row, vector)
+        return row
+
+    def extend(self, vectors: np.ndarray) -> List[int]:
+        """
+        Agregar varios vectores en bloque
+
+        Args:
+            vectors: Matriz (n, d)
+
+        Returns:
+            List[int]: Filas asignadas
+        """
+        vectors = self._prepare(np.atleast_2d(vectors))
+        start = self._rows
+        end = start + vectors.shape[0]
+
+        self._ensure_capacity(end)
+        if self.keep_rows:
+            self._data[start:end] = vectors
+        else:
+            stored = vectors.astype(SUPPORTED_DTYPES[self.dtype])
+            self._pending.update(zip(range(start, end), stored))
+        self._live[start:end] = True
+        self._rows = end
+        return list(range(start, end))
+
+    def delete(self, row: int):
+        """Marcar una fila como eliminada (se excluye de las búsquedas)"""
+        if 0 <= row < self._rows:
+            self._live[row] = False
+            self._pending.pop(row, None)
+
+    def release(self, rows: Sequence[int]):
+        """
+        Descartar las filas que el índice ya codificó (solo con keep_rows=False)
+
+        Args:
+            rows: Filas que ya no se necesitan en precisión completa
+        """
+        if self.keep_rows:
+            return
+        for row in rows:
+            self._pending.pop(int(row), None)
+
+    def _gather(self, rows: np.ndarray) -> np.ndarray:
+        """Filas indicadas en su tipo de almacenamiento (copia)"""
+        if self.keep_rows:
+            return self._data[rows]
+        if len(rows) == 0:
+            return np.empty((0, self.dim or 0), dtype=SUPPORTED_DTYPES[self.dtype])
+        try:
+            return np.stack([self._pending[int(row)] for row in rows])
+        except KeyError as e:
+            raise RuntimeError(f"La fila {e.args[0]} ya no está en precisión completa") from None
+
+    def rows_for(self, rows: np.ndarray) -> np.ndarray:
+        """
+        Vectores en precisión completa de unas filas, en float32
+
+        Args:
+            rows: Filas a leer
+
+        Returns:
+            np.ndarray: Matriz (len(rows), d)
+
+        Raises:
+            RuntimeError: Si alguna fila ya se liberó (keep_rows=False)
+        """
+        return self._gather(np.asarray(rows, dtype=np.int64)).astype(np.float32, copy=False)
+
+    def save(self, path: str):
+        """
+        Guardar las filas vivas en un archivo .npy
+
+        Args:
+            path: Ruta del archivo
+        """
+        np.save(path, np.ascontiguousarray(self._gather(self.live_rows())))
+
+    def live_mask(self) -> np.ndarray:
+        """Máscara booleana (vista sin copia) de las filas ocupadas no eliminadas"""
+        if self._live is None:
+            return np.zeros(0, dtype=bool)
+        return self._live[:self._rows]
+
+    def live_rows(self) -> np.ndarray:
+        """Filas ocupadas que no están marcadas como eliminadas"""
+        if self._live is None:
+            return np.empty(0, dtype=np.int64)
+        return np.flatnonzero(self._live[:self._rows])
+
+    def compact(self, rows: Sequence[int]):
+        """
+        Conservar solo las filas indicadas, en ese orden
+
+        Args:
+            rows: Filas a conservar (su posición pasa a ser la nueva fila)
+        """
+        if self._live is None:
+            return
+
+        keep = np.asarray(rows, dtype=np.int64)
+        if not self.keep_rows:
+            self._pending = {
+                new_row: self._pending[int(old_row)]
+                for new_row, old_row in enumerate(keep) if int(old_row) in self._pending
+            }
+            self._live = np.zeros(max(len(keep), self.initial_capacity), dtype=bool)
+            self._live[:len(keep)] = True
+            self._rows = len(keep)
+            return
+
+        kept = self._data[keep]
+        self._rows = 0
+        self._data = None
+        self._live = None
+        self._allocate(max(len(keep), self.initial_capacity))
+        self._data[:len(keep)] = kept
+        self._live[:len(keep)] = True
+        self._rows = len(keep)
+
+    def scores(self, query: np.ndarray) -> np.ndarray:
+        """
+        Similitud coseno de la consulta contra todas las filas ocupadas
+
+        Args:
+            query: Vector de consulta de dimensión d
+
+        Returns:
+            np.ndarray: Puntuaciones float32 (las filas eliminadas valen -inf)
+        """
+        query = normalize_rows(query)
+        matrix = self.matrix
+
+        if self.dtype == "float32":
+            scores = matrix @ query
+        else:
+            # float16 no tiene BLAS: se convierte por bloques a float32
+            scores = np.empty(self._rows, dtype=np.float32)
+            for start in range(0, self._rows, _FLOAT16_BLOCK_ROWS):
+                block = matrix[start:start + _FLOAT16_BLOCK_ROWS].astype(np.float32)
+                scores[start:start + block.shape[0]] = block @ query
+
+        scores[~self._live[:self._rows]] = -np.inf
+        return scores
+
+    def scores_for(self, rows: np.ndarray, query: np.ndarray) -> np.ndarray:
+        """
+        Similitud coseno de la consulta contra un subconjunto de filas
+
+        Args:
+            rows: Filas a puntuar
+            query: Vector de consulta de dimensión d
+
+        Returns:
+            np.ndarray: Puntuaciones float32 (las filas eliminadas valen -inf)
+        """
+        query = normalize_rows(query)
+        candidates = self._gather(rows)
+        if self.dtype != "float32":
+            candidates = candidates.astype(np.float32)
+
+        scores = candidates @ query
+        scores[~self._live[rows]] = -np.inf
+        return scores
+
+    def search(self, query: np.ndarray, k: int,
+               allowed: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        """
+        Buscar las k filas más similares a la consulta
+
+        Args:
+            query: Vector de consulta de dimensión d
+            k: Número de filas a retornar
+            allowed: Máscara booleana de filas permitidas (None = todas)
+
+        Returns:
+            List[Tuple[int, float]]: (fila, similitud coseno) de mayor a menor
+        """
+        if not self._rows or k <= 0:
+            return []
+
+        if not self.keep_rows:
+            # Solo las filas aún no liberadas (p. ej. antes de entrenar un índice PQ)
+            rows = np.array(sorted(self._pending), dtype=np.int64)
+            if allowed is not None:
+                rows = rows[allowed[rows]]
+            return top_k(rows, self.scores_for(rows, query), k)
+
+        if allowed is None:
+            return top_k(np.arange(self._rows), self.scores(query), k)
+
+        rows = np.flatnonzero(allowed[:self._rows])
+        if len(rows) == 0:
+            return []
+        if len(rows) * 2 > self._rows:
+            # Filtro poco selectivo: es más barato puntuar todo y enmascarar
+            scores = self.scores(query)
+            return top_k(rows, scores[rows], k)
+        return top_k(rows, self.scores_for(rows, query), k)
+
+    def search_batch(self, queries: np.ndarray, k: int,
+                     allowed: Optional[np.ndarray] = None) -> List[List[Tuple[int, float]]]:
+        """
+        Buscar varias consultas con un único producto matriz-matriz
+
+        Cada bloque de la matriz se lee una vez para todas las consultas en
+        lugar de una vez por consulta.
+
+        Args:
+            queries: Matriz (m, d) de consultas
+            k: Número de filas a retornar por consulta
+            allowed: Máscara booleana de filas permitidas (None = todas)
+
+        Returns:
+            List[List[Tuple[int, float]]]: Resultados de cada consulta, en orden
+        """
+        queries = normalize_rows(np.atleast_2d(queries))
+        if not self._rows or k <= 0:
+            return [[] for _ in queries]
+        if not self.keep_rows:
+            return [self.search(query, k, allowed) for query in queries]
+
+        rows = np.arange(self._rows) if allowed is None else np.flatnonzero(allowed[:self._rows])
+        if len(rows) == 0:
+            return [[] for _ in queries]
+
+        # Filtro selectivo: puntuar solo las filas permitidas
+        gathered = len(rows) * 2 <= self._rows
+        source = self._data[rows] if gathered else self.matrix
+        scores = np.empty((source.shape[0], len(queries)), dtype=np.float32)
+        for start in range(0, source.shape[0], _FLOAT16_BLOCK_ROWS):
+            block = source[start:start + _FLOAT16_BLOCK_ROWS]
+            if self.dtype != "float32":
+                block = block.astype(np.float32)
+            scores[start:start + block.shape[0]] = block @ queries.T
+        if not gathered and allowed is not None:
+            scores = scores[rows]
+
+        scores[~self._live[rows]] = -np.inf
+        return [top_k(rows, scores[:, i], k) for i in range(len(queries))]
+
+def top_k(rows: np.ndarray, scores: np.ndarray, k: int) -> List[Tuple[int, float]]:
+    """
+    Seleccionar las k mejores puntuaciones con argpartition
+
+    Args:
+        rows: Fila correspondiente a cada puntuación
+        scores: Puntuaciones (las -inf se descartan)
+        k: Número de resultados
+
+    Returns:
+        List[Tuple[int, float]]: (fila, puntuación) de mayor a menor
+    """
+    k = min(k, len(scores))
+    if k <= 0:
+        return []
+
+    top = np.argpartition(-scores, k - 1)[:k]
+    top = top[np.argsort(-scores[top])]
+    return [(int(rows[i]), float(scores[i])) for i in top if np.isfinite(scores[i])]
@@ -0,0 +1,219 @@
+import json
+import math
+import os
+import threading
+import zlib
+import numpy as np
+from collections import Counter
+from typing import Dict, List, Tuple
+from .analyzer import spanish_analyzer
+
+class HashingVectorizer:
+    """
+    Vectorizador local sin modelo (feature hashing + TF-IDF)
+
+    Alternativa ligera a SentenceTransformer: no descarga nada y arranca en
+    milisegundos. Cada texto se convierte en n-gramas de palabras y de
+    caracteres que se proyectan con un hash estable a `n_features`
+    dimensiones. Se aplica TF sublineal (1 + log tf), IDF aprendido de los
+    documentos indexados y normalización L2, así que el producto punto entre
+    dos vectores es su similitud coseno.
+
+    Expone encode(textos) con la misma forma que SentenceTransformer, de
+    modo que EmbeddingManager lo usa como cualquier otro modelo.
+    """
+
+    # Las similitudes TF-IDF son más bajas que las de un modelo neuronal:
+    # una coincidencia clara de pocos términos ronda 0.1-0.4
+    relevance_threshold = 0.08
+
+    def __init__(self, n_features: int = 2 ** 11, word_ngrams: Tuple[int, int] = (1, 2),
+                 char_ngrams: Tuple[int, int] = (3, 4)):
+        """
+        Inicializar vectorizador
+
+        Args:
+            n_features: Dimensión del espacio de hashing
+            word_ngrams: Rango (min, max) de n-gramas de palabras
+            char_ngrams: Rango (min, max) de n-gramas de caracteres dentro de
+                cada palabra ((0, 0) para desactivarlos)
+        """
+        self.n_features = n_features
+        self.word_ngrams = word_ngrams
+        self.char_ngrams = char_ngrams
+
+        # Frecuencia documental por dimensión (para el IDF)
+        self.document_frequency = np.zeros(n_features, dtype=np.int64)
+        self.n_documents = 0
+        self._lock = threading.Lock()
+
+    def get_params(self) -> Dict:
+        """Parámetros de construcción (para crear una instancia equivalente vacía)"""
+        return {
+            "n_features": self.n_features,
+            "word_ngrams": self.word_ngrams,
+            "char_ngrams": self.char_ngrams
+        }
+
+    def __getstate__(self) -> Dict:
+        # El lock no se serializa (para enviar el modelo a procesos shard)
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state: Dict):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _ngrams(self, text: str) -> Counter:
+        """Contar los n-gramas (palabras y caracteres) de un texto"""
+        # Tokens plegados (sin tildes): "programación" y "programacion" coinciden
+        tokens = spanish_analyzer.normalize(text)
+        counts = Counter()
+
+        low, high = self.word_ngrams
+        for n in range(max(low, 1), high + 1):
+            for i in range(len(tokens) - n + 1):
+                counts["w:" + " ".join(tokens[i:i + n])] += 1
+
+        low, high = self.char_ngrams
+        if high > 0:
+            for token in tokens:
+                padded = f"<{token}>"
+                for n in range(low, high + 1):
+                    for i in range(len(padded) - n + 1):
+                        counts["c:" + padded[i:i + n]] += 1
+
+        return counts
+
+    def _hashed_tf(self, text: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        TF sublineal con signo, proyectado al espacio de hashing
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: (índices únicos, pesos)
+        """
+        counts = self._ngrams(text)
+        if not counts:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        indices = np.empty(len(counts), dtype=np.int64)
+        weights = np.empty(len(counts), dtype=np.float32)
+        for i, (feature, count) in enumerate(counts.items()):
+            # crc32 es estable entre procesos (hash() de Python no lo es)
+            h = zlib.crc32(feature.encode("utf-8"))
+            indices[i] = h % self.n_features
+            # El bit alto decide el signo y compensa las colisiones
+            sign = 1.0 if h & 0x80000000 else -1.0
+            weights[i] = sign * (1.0 + math.log(count))
+
+        unique, inverse = np.unique(indices, return_inverse=True)
+        return unique, np.bincount(inverse, weights=weights).astype(np.float32)
+
+    def partial_fit(self, texts: List[str]):
+        """
+        Actualizar las frecuencias documentales con nuevos documentos
+
+        Args:
+            texts: Textos de los documentos indexados
+        """
+        updates = [self._hashed_tf(text)[0] for text in texts]
+        with self._lock:
+            for indices in updates:
+                self.document_frequency[indices] += 1
+            self.n_documents += len(texts)
+
+    def fit(self, texts: List[str]):
+        """
+        Reiniciar las frecuencias documentales y aprenderlas de nuevo
+
+        Args:
+            texts: Textos de todos los documentos indexados
+        """
+        with self._lock:
+            self.document_frequency[:] = 0
+            self.n_documents = 0
+        self.partial_fit(texts)
+
+    def save(self, directory: str):
+        """
+        Guardar configuración y frecuencias documentales
+
+        Args:
+            directory: Directorio del snapshot
+        """
+        config = {
+            "n_features": self.n_features,
+            "word_ngrams": list(self.word_ngrams),
+            "char_ngrams": list(self.char_ngrams),
+            "n_documents": self.n_documents
+        }
+        with open(os.path.join(directory, "vectorizer.json"), "w", encoding="utf-8") as f:
+            json.dump(config, f)
+        np.save(os.path.join(directory, "vectorizer_df.npy"), self.document_frequency)
+
+    def load(self, directory: str):
+        """
+        Cargar frecuencias documentales guardadas con save
+
+        Args:
+            directory: Directorio del snapshot
+
+        Raises:
+            ValueError: Si el snapshot usa otra configuración de hashing
+        """
+        with open(os.path.join(directory, "vectorizer.json"), encoding="utf-8") as f:
+            config = json.load(f)
+
+        expected = (self.n_features, list(self.word_ngrams), list(self.char_ngrams))
+        found = (config["n_features"], config["word_ngrams"], config["char_ngrams"])
+        if found != expected:
+            raise ValueError(f"Configuración del vectorizador incompatible: {found} != {expected}")
+
+        document_frequency = np.load(os.path.join(directory, "vectorizer_df.npy"))
+        with self._lock:
+            self.document_frequency = document_frequency
+            self.n_documents = config["n_documents"]
+
+    def idf(self) -> np.ndarray:
+        """IDF suavizado por dimensión"""
+        return np.log((1.0 + self.n_documents) / (1.0 + self.document_frequency)) + 1.0
+
+    def transform_sparse(self, texts: List[str]) -> List[Dict[int, float]]:
+        """
+        Vectorizar textos en formato disperso
+
+        Args:
+            texts: Textos a vectorizar
+
+        Returns:
+            List[Dict[int, float]]: Por texto, {dimensión: peso} normalizado (L2)
+        """
+        idf = self.idf()
+        vectors = []
+        for text in texts:
+            indices, weights = self._hashed_tf(text)
+            weights = weights * idf[indices]
+            norm = float(np.linalg.norm(weights)) or 1.0
+            vectors.append(dict(zip(indices.tolist(), (weights / norm).tolist())))
+        return vectors
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """
+        Vectorizar textos en formato denso
+
+        Args:
+            texts: Textos a vectorizar
+
+        Returns:
+            np.ndarray: Matriz (n, n_features) float32 normalizada (L2)
+        """
+        idf = self.idf()
+        dense = np.zeros((len(texts), self.n_features), dtype=np.float32)
+        for row, text in enumerate(texts):
+            indices, weights = self._hashed_tf(text)
+            dense[row, indices] = weights * idf[indices]
+
+        norms = np.linalg.norm(dense, axis=1, keepdims=True)
+        norms[norms == 0.0] = 1.0
+        return dense / norms
@@ -1,6 +1,6 @@
-from firebase_admin import firestore
+from firebase_admin import firestore, firestore_async
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional
 import uuid
 
 # Cliente de Firestore (lazy initialization)
@@ -17,12 +17,99 @@ def get_db():
             return None
     return db
 
+# Cliente asíncrono de Firestore (lazy initialization), para los handlers async
+async_db = None
+
+def get_async_db():
+    """Obtener cliente AsyncClient de Firestore con lazy initialization"""
+    global async_db
+    if async_db is None:
+        try:
+            async_db = firestore_async.client()
+        except Exception as e:
+            print(f"⚠️  Firestore (async) no disponible: {str(e)}")
+            return None
+    return async_db
+
 class FirestoreManager:
     """
-        Clase para manejar operaciones de Firestore    
+        Lecturas síncronas de la colección de artículos
+
+        Las usan la reindexación y el precalentamiento del índice, que corren
+        en hilos propios. Las operaciones de la API están en AsyncFirestoreManager.
+    """
+    @staticmethod
+    def count_articles() -> Optional[int]:
+        """
+            Contar los artículos de la colección con una consulta de agregación
+
+            Returns:
+                Optional[int]: Número de artículos o None si no se puede contar
+        """
+        try:
+            db_client = get_db()
+            if db_client is None:
+                raise Exception("Firestore no disponible")
+
+            result = db_client.collection("articles").count().get()
+            return int(result[0][0].value)
+
+        except Exception as e:
+            print(f"⚠️  No se pudo contar artículos: {str(e)}")
+            return None
+
+    @staticmethod
+    def iter_article_pages(batch_size: int = 200) -> Iterator[List[Dict]]:
+        """
+            Recorrer toda la colección de artículos por páginas
+
+            Usa cursores (start_after) ordenando por ID de documento, así que
+            cada página cuesta lo mismo sin importar su posición.
+
+            Args:
+                batch_size: Artículos por página
+
+            Yields:
+                List[Dict]: Página de artículos (incluye archivados)
+        """
+        db_client = get_db()
+        if db_client is None:
+            raise Exception("Firestore no disponible")
+
+        query = db_client.collection("articles")\
+            .order_by("__name__")\
+            .limit(batch_size)
+
+        last_doc = None
+        while True:
+            page_query = query.start_after(last_doc) if last_doc is not None else query
+            docs = list(page_query.stream())
+            if not docs:
+                return
+
+            yield [{"id": doc.id, **doc.to_dict()} for doc in docs]
+
+            if len(docs) < batch_size:
+                return
+            last_doc = docs[-1]
+
+class AsyncFirestoreManager:
+    """
+        Operaciones de artículos en Firestore con el cliente asíncrono
+
+        Las usan los handlers async de la API: las llamadas a Firestore se
+        esperan sin ocupar un hilo. La reindexación y el precalentamiento, que
+        corren en hilos propios, leen con FirestoreManager.
     """
     @staticmethod
-    def create_article(article_data: Dict) -> str:
+    def _client():
+        db_client = get_async_db()
+        if db_client is None:
+            raise Exception("Firestore no disponible")
+        return db_client
+
+    @staticmethod
+    async def create_article(article_data: Dict) -> str:
         """
             Crear un nuevo artículo en Firestore
 
@@ -32,7 +119,6 @@ class FirestoreManager:
             Returns:
                 str: ID del artículo creado
         """
-
         try:
             # Generar ID único
             article_id = str(uuid.uuid4())
@@ -40,56 +126,50 @@ class FirestoreManager:
             # Agregar metadatos
             article_data.update({
                 "id": article_id,
-                "version" : 1,
+                "version": 1,
                 "created_at": datetime.utcnow(),
                 "updated_at": datetime.utcnow(),
                 "status": "published"
             })
 
             # Guardar en Firestore
-            db_client = get_db()
-            if db_client is None:
-                raise Exception("Firestore no disponible")
-            db_client.collection("articles").document(article_id).set(article_data)
+            await AsyncFirestoreManager._client().collection("articles").document(article_id).set(article_data)
 
             # Crear versión inicial
-            FirestoreManager.create_article_version(article_id, article_data, 1)
+            await AsyncFirestoreManager.create_article_version(article_id, article_data, 1)
 
             print(f"✅ Artículo creado: {article_id}")
             return article_id
-        
+
         except Exception as e:
             print(f"❌ Error al crear artículo: {str(e)}")
-            return e
+            raise e
 
     @staticmethod
-    def get_article(article_id: str) -> Optional[Dict]:
+    async def get_article(article_id: str) -> Optional[Dict]:
         """
             Obtener un artículo por su ID
-        
+
             Args:
                 article_id: ID del artículo
 
             Returns:
                 Optional[Dict]: Datos del artículo o None si no existe
         """
-        try: 
-            db_client = get_db()
-            if db_client is None:
-                raise Exception("Firestore no disponible")
-            doc = db_client.collection("articles").document(article_id).get()
+        try:
+            doc = await AsyncFirestoreManager._client().collection("articles").document(article_id).get()
 
             if doc.exists:
                 return {"id": doc.id, **doc.to_dict()}
             else:
                 return None
-            
+
         except Exception as e:
             print(f"❌ Error al obtener artículo: {str(e)}")
             raise e
-        
+
     @staticmethod
-    def list_articles(
+    async def list_articles(
         category: Optional[str] = None,
         limit: int = 10,
         page: int = 1
@@ -105,12 +185,9 @@ class FirestoreManager:
             Returns:
                 List[Dict]: Lista de artículos
         """
-        try: 
+        try:
             # Construir consulta
-            db_client = get_db()
-            if db_client is None:
-                raise Exception("Firestore no disponible")
-            query = db_client.collection("articles").where("visibility", "==", "public")
+            query = AsyncFirestoreManager._client().collection("articles").where("visibility", "==", "public")
 
             if category:
                 query = query.where("category", "==", category)
@@ -120,38 +197,31 @@ class FirestoreManager:
             query = query.offset(offset).limit(limit)
 
             # Ejecutar consulta
-            docs = query.stream()
+            articles = [{"id": doc.id, **doc.to_dict()} async for doc in query.stream()]
 
-            articles = []
-            for doc in docs:
-                articles.append({"id": doc.id, **doc.to_dict()})
-            
             print(f"✅ {len(articles)} artículos encontrados")
             return articles
 
         except Exception as e:
             print(f"❌ Error al listar artículos: {str(e)}")
             raise e
-        
+
     @staticmethod
-    def update_article(article_id: str, update_data: Dict) -> int:
+    async def update_article(article_id: str, update_data: Dict) -> int:
         """
-            Actualizar un artículo  (crea nueva versión)
+            Actualizar un artículo (crea nueva versión)
 
-            Args: 
+            Args:
                 article_id: ID del artículo
                 update_data: Datos actualizados
-            
+
             Returns:
                 int: Número de versión actualizada
         """
         try:
             # Obtener artículo actual
-            db_client = get_db()
-            if db_client is None:
-                raise Exception("Firestore no disponible")
-            doc_ref = db_client.collection("articles").document(article_id)
-            doc = doc_ref.get()
+            doc_ref = AsyncFirestoreManager._client().collection("articles").document(article_id)
+            doc = await doc_ref.get()
 
             if not doc.exists:
                 raise ValueError(f"Artículo con ID {article_id} no encontrado")
@@ -164,11 +234,11 @@ class FirestoreManager:
             update_data["version"] = new_version
 
             # Guardar en Firestore
-            doc_ref.update(update_data)
+            await doc_ref.update(update_data)
 
             # Crear nueva versión
             new_data = {**current_data, **update_data}
-            FirestoreManager.create_article_version(article_id, new_data, new_version)
+            await AsyncFirestoreManager.create_article_version(article_id, new_data, new_version)
 
             print(f"✅ Artículo actualizado: {article_id} (versión {new_version})")
             return new_version
@@ -176,24 +246,21 @@ class FirestoreManager:
         except Exception as e:
             print(f"❌ Error al actualizar artículo: {str(e)}")
             raise e
-    
+
     @staticmethod
-    def delete_article(article_id: str) -> bool:
+    async def delete_article(article_id: str) -> bool:
         """
             Eliminar un artículo (soft delete)
 
             Args:
                 article_id: ID del artículo
-            
+
             Returns:
                 bool: True si se eliminó correctamente
         """
         try:
             # Soft delete: actualizar status a "archived"
-            db_client = get_db()
-            if db_client is None:
-                raise Exception("Firestore no disponible")
-            db_client.collection("articles").document(article_id).update({
+            await AsyncFirestoreManager._client().collection("articles").document(article_id).update({
                 "status": "archived",
                 "updated_at": datetime.utcnow()
             })
@@ -204,9 +271,9 @@ class FirestoreManager:
         except Exception as e:
             print(f"❌ Error al eliminar (archivar) artículo: {str(e)}")
             raise e
-        
+
     @staticmethod
-    def create_article_version(article_id: str, article_data: Dict, version: int):
+    async def create_article_version(article_id: str, article_data: Dict, version: int):
         """
             Crear versión del artículo en colección separada
 
@@ -223,41 +290,35 @@ class FirestoreManager:
                 "created_at": datetime.utcnow()
             }
 
-            db_client = get_db()
+            db_client = get_async_db()
             if db_client is None:
                 print("⚠️  Firestore no disponible, saltando creación de versión")
                 return
-            db_client.collection("article_versions").add(version_data)
+            await db_client.collection("article_versions").add(version_data)
             print(f"✅ Versión {version} creada para artículo {article_id}")
 
         except Exception as e:
-            print(f"❌ Error al crear versión del artículo: {str(e)}")
             # No re-lanzar la excepción para no interrumpir la creación del artículo
-            pass
-        
+            print(f"❌ Error al crear versión del artículo: {str(e)}")
+
     @staticmethod
-    def get_article_versions(article_id: str) -> List[Dict]:
+    async def get_article_versions(article_id: str) -> List[Dict]:
         """
             Obtener historial de versiones de un artículo
 
-            Args: 
+            Args:
                 article_id: ID del artículo
-            
+
             Returns:
                 List[Dict]: Lista de versiones
         """
         try:
-            db_client = get_db()
-            if db_client is None:
-                raise Exception("Firestore no disponible")
-            versions = db_client.collection("article_versions")\
+            versions = AsyncFirestoreManager._client().collection("article_versions")\
                 .where("article_id", "==", article_id)\
                 .order_by("version", direction=firestore.Query.DESCENDING)\
                 .stream()
 
-            version_list = []
-            for doc in versions:
-                version_list.append({"id": doc.id, **doc.to_dict()})
+            version_list = [{"id": doc.id, **doc.to_dict()} async for doc in versions]
 
             print(f"✅ {len(version_list)} versiones encontradas para artículo {article_id}")
             return version_list
@@ -265,4 +326,3 @@ class FirestoreManager:
         except Exception as e:
             print(f"❌ Error al obtener versiones del artículo: {str(e)}")
             raise e
-            
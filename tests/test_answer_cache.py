@@ -0,0 +1,97 @@
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+
+# Agregar src al path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from services.answer_cache import AnswerCache
+from services.gemini_service import GeminiService
+
+CONTEXT = "Artículo 1: Redes\nPasaje: " + "Las redes de computadoras usan TCP/IP. " * 5
+
+def test_answer_cache():
+    """Probar la caché de respuestas: clave normalizada, versiones e invalidación"""
+
+    service = GeminiService(answer_cache=AnswerCache(max_entries=8))
+    cache = service.answer_cache
+
+    print("🧪 Repitiendo una pregunta con las mismas fuentes...")
+    first = asyncio.run(service.generate_answer("¿Qué son las redes?", CONTEXT, [("redes", 1)]))
+    again = asyncio.run(service.generate_answer("que son las REDES", CONTEXT, [("redes", 1)]))
+    assert first == again
+    assert cache.get_stats()["hits"] == 1 and cache.get_stats()["misses"] == 1
+
+    print("🧪 Cambiando la versión del artículo...")
+    asyncio.run(service.generate_answer("que son las redes", CONTEXT, [("redes", 2)]))
+    assert cache.get_stats()["misses"] == 2
+
+    print("🧪 Invalidando por artículo...")
+    assert cache.invalidate_article("redes") == 2
+    assert cache.get_stats()["entries"] == 0
+    print("✅ Caché de respuestas correcta")
+
+def test_answer_cache_disk():
+    """Probar que el nivel SQLite sobrevive a un reinicio"""
+
+    with tempfile.TemporaryDirectory() as root:
+        db_path = os.path.join(root, "answers.db")
+        cache = AnswerCache(db_path=db_path)
+        key = cache.make_key("¿Qué es SQL?", [("sql", 3)], CONTEXT, "gemini-pro")
+        cache.put(key, "SQL es un lenguaje de consulta.", ["sql"])
+        cache.close()
+
+        print("🧪 Leyendo desde disco tras reiniciar...")
+        restarted = AnswerCache(db_path=db_path)
+        assert restarted.get(key) == "SQL es un lenguaje de consulta."
+        assert restarted.get_stats()["disk_hits"] == 1
+        assert restarted.get(key) is not None and restarted.get_stats()["hits"] == 1
+
+        restarted.invalidate_article("sql")
+        restarted.close()
+        assert AnswerCache(db_path=db_path).get(key) is None
+        print("✅ Respuesta persistida e invalidada en disco")
+
+def test_answer_cache_async_disk():
+    """Probar que desde código async el nivel SQLite se consulta fuera del event loop"""
+
+    with tempfile.TemporaryDirectory() as root:
+        cache = AnswerCache(db_path=os.path.join(root, "answers.db"))
+        key = cache.make_key("¿Qué es TCP?", [("redes", 1)], CONTEXT, "gemini-pro")
+        disk_threads = []
+
+        for name in ("_disk_get", "_disk_put", "_disk_invalidate"):
+            def wrapper(*args, _method=getattr(cache, name), **kwargs):
+                disk_threads.append(threading.current_thread())
+                return _method(*args, **kwargs)
+            setattr(cache, name, wrapper)
+
+        async def main():
+            print("🧪 Fallo, escritura y acierto desde el event loop...")
+            assert await cache.get_async(key) is None
+            await cache.put_async(key, "TCP es un protocolo fiable.", ["redes"])
+            # Acierto en memoria: no toca el disco
+            assert await cache.get_async(key) == "TCP es un protocolo fiable."
+            assert len(disk_threads) == 2
+
+            print("🧪 Promoción desde disco e invalidación...")
+            cache._entries.clear()
+            cache._by_article.clear()
+            assert await cache.get_async(key) == "TCP es un protocolo fiable."
+            assert await cache.invalidate_article_async("redes") == 1
+            cache._entries.clear()
+            assert await cache.get_async(key) is None
+
+        asyncio.run(main())
+        assert disk_threads and all(thread is not threading.main_thread() for thread in disk_threads)
+        stats = cache.get_stats()
+        assert stats["disk_hits"] == 1 and stats["disk_entries"] == 0
+        cache.close()
+        print("✅ El disco se consulta en hilos, sin bloquear el event loop")
+
+if __name__ == "__main__":
+    test_answer_cache()
+    test_answer_cache_disk()
+    test_answer_cache_async_disk()
@@ -0,0 +1,95 @@
+import json
+import os
+import sys
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+# Agregar src al path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from api import chat
+from core.auth import verify_token
+from services.embeddings import embedding_manager
+from services.gemini_service import gemini_service
+
+QUESTION = "¿Qué es el protocolo TCP en las redes?"
+
+class FakeChunk:
+    def __init__(self, text):
+        self.text = text
+
+class FakeStreamingModel:
+    """Modelo falso: emite fragmentos fijos y opcionalmente falla tras ellos"""
+
+    model_name = "modelo-falso"
+
+    def __init__(self, chunks, fail_after=None):
+        self.chunks = chunks
+        self.fail_after = fail_after
+
+    async def generate_content_async(self, prompt, stream=False):
+        async def response():
+            for i, text in enumerate(self.chunks):
+                if i == self.fail_after:
+                    raise RuntimeError("conexión con el modelo perdida")
+                yield FakeChunk(text)
+        return response()
+
+def _client() -> TestClient:
+    app = FastAPI()
+    app.include_router(chat.router)
+    app.dependency_overrides[verify_token] = lambda: {"email": "test@example.com"}
+    return TestClient(app)
+
+def _events(body: str):
+    """Separar el cuerpo SSE en (evento, datos)"""
+    events = []
+    for block in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+def _stream(model):
+    """Enviar QUESTION a /chat/stream con el modelo indicado, sin caché de respuestas"""
+    embedding_manager.add_article_embedding(
+        "tcp", "Protocolo TCP", "El protocolo TCP de las redes garantiza la entrega ordenada de los datos."
+    )
+    previous = gemini_service.model, gemini_service.answer_cache
+    gemini_service.model, gemini_service.answer_cache = model, None
+    try:
+        response = _client().post("/chat/stream", json={"message": QUESTION, "search_mode": "lexical"})
+    finally:
+        gemini_service.model, gemini_service.answer_cache = previous
+        embedding_manager.remove_article("tcp")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    return _events(response.text)
+
+def test_chat_stream_events():
+    """Probar el orden y el contenido de los eventos: sources, chunk* y done"""
+
+    print("🧪 Respuesta en streaming...")
+    events = _stream(FakeStreamingModel(["TCP es ", "un protocolo ", "fiable."]))
+    assert [name for name, _ in events] == ["sources", "chunk", "chunk", "chunk", "done"]
+
+    sources = events[0][1]
+    assert sources["query"] == QUESTION and sources["confidence"] > 0
+    assert [source["id"] for source in sources["sources"]] == ["tcp"]
+    assert sources["context_tokens"] > 0
+    assert "".join(data["text"] for name, data in events if name == "chunk") == "TCP es un protocolo fiable."
+    print("✅ Fuentes primero, fragmentos en orden y fin")
+
+def test_chat_stream_error():
+    """Probar que un fallo del modelo a mitad del streaming se notifica como evento error"""
+
+    print("🧪 El modelo falla tras el primer fragmento...")
+    events = _stream(FakeStreamingModel(["TCP es ", "un protocolo"], fail_after=1))
+    assert [name for name, _ in events] == ["sources", "chunk", "error"]
+    assert events[1][1] == {"text": "TCP es "}
+    assert "conexión con el modelo perdida" in events[2][1]["detail"]
+    print("✅ Evento error tras las fuentes, sin done")
+
+if __name__ == "__main__":
+    test_chat_stream_events()
+    test_chat_stream_error()
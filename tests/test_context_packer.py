@@ -0,0 +1,56 @@
+import os
+import sys
+
+# Agregar src al path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from services.context_packer import ContextPacker
+from services.embeddings import EmbeddingManager
+from services.tokenizer import count_tokens, truncate_to_tokens
+
+def test_tokenizer():
+    """Probar el conteo aproximado y el recorte por tokens"""
+
+    print("🧪 Contando tokens...")
+    assert count_tokens("") == 0
+    assert count_tokens("red TCP") == 2
+    # Las palabras largas cuentan como varios tokens
+    assert count_tokens("computadoras") == 2
+    assert count_tokens("¿Qué es?") == 4
+
+    print("🧪 Recortando sin partir palabras...")
+    text = "las redes de computadoras permiten la comunicación"
+    cut = truncate_to_tokens(text, 5)
+    assert text.startswith(cut) and count_tokens(cut) <= 5 and not cut.endswith("comput")
+    assert truncate_to_tokens(text, 100) == text
+    print("✅ Tokenizador aproximado correcto")
+
+def test_context_packer():
+    """Probar el presupuesto de tokens, el orden por similitud y la deduplicación"""
+
+    manager = EmbeddingManager(passage_size=200, passage_overlap=80)
+    filler = " ".join(["texto de relleno sobre la historia de la informática"] * 12)
+    manager.add_articles_bulk([
+        {"id": "ospf", "title": "Enrutamiento", "content": f"{filler} OSPF calcula rutas con Dijkstra. OSPF usa áreas. {filler}"},
+        {"id": "rip", "title": "RIP", "content": f"RIP cuenta saltos. OSPF lo reemplaza en redes grandes. {filler}"},
+    ])
+    articles = manager.search_similar_articles("OSPF", 2, mode="lexical")
+    assert len(articles) == 2 and len(articles[0]["passages"]) > 1
+
+    print("🧪 Empaquetando con presupuesto holgado...")
+    packed = ContextPacker(token_budget=2000).pack(articles)
+    assert packed.tokens_used <= 2000 and packed.articles == 2
+    assert packed.text.index("Artículo 1: Enrutamiento") < packed.text.index("Artículo 2: RIP")
+    assert "Dijkstra" in packed.text
+    # Los pasajes solapados del mismo artículo se fusionan: ninguna frase se repite
+    assert packed.text.count("OSPF calcula rutas con Dijkstra") == 1
+
+    print("🧪 Empaquetando con presupuesto ajustado...")
+    tight = ContextPacker(token_budget=60).pack(articles)
+    assert tight.tokens_used <= 60 and tight.passages >= 1
+    assert "OSPF" in tight.text
+    print(f"✅ Contexto de {tight.tokens_used}/{tight.token_budget} tokens")
+
+if __name__ == "__main__":
+    test_tokenizer()
+    test_context_packer()
@@ -0,0 +1,79 @@
+import os
+import sys
+import time
+
+import numpy as np
+
+# Agregar src al path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from services.diversity import lexical_overlap, mmr_select
+from services.embeddings import EmbeddingManager
+
+def test_mmr_select():
+    """Probar MMR, el máximo por artículo y el tiempo sobre 100 candidatos"""
+
+    print("🧪 Ventanas solapadas del mismo artículo...")
+    # Tres ventanas casi idénticas del artículo 0 y una algo menos relevante del 1
+    relevance = np.array([1.0, 0.98, 0.97, 0.8], dtype=np.float32)
+    articles = np.array([0, 0, 0, 1])
+    starts = np.array([0, 20, 40, 0])
+    ends = np.array([200, 220, 240, 200])
+    assert mmr_select(relevance, articles, starts, ends, limit=2, mmr_lambda=1.0) == [0, 1]
+    assert mmr_select(relevance, articles, starts, ends, limit=2, mmr_lambda=0.7) == [0, 3]
+
+    print("🧪 Máximo de pasajes por artículo...")
+    selected = mmr_select(relevance, articles, starts, ends, limit=4, mmr_lambda=1.0, max_per_article=2)
+    assert selected == [0, 1, 3]
+
+    print("🧪 Similitud por vectores entre artículos distintos...")
+    vectors = np.array([[1.0, 0.0], [1.0, 0.0], [0.0, 1.0]], dtype=np.float32)
+    selected = mmr_select(
+        np.array([1.0, 0.95, 0.7], dtype=np.float32), np.array([0, 1, 2]),
+        np.zeros(3, dtype=np.int64), np.full(3, 100), limit=2, mmr_lambda=0.5, vectors=vectors
+    )
+    assert selected == [0, 2]
+
+    print("🧪 Tiempo con 100 candidatos...")
+    rng = np.random.default_rng(0)
+    candidates = rng.standard_normal((100, 256)).astype(np.float32)
+    candidates /= np.linalg.norm(candidates, axis=1, keepdims=True)
+    arguments = (rng.random(100, dtype=np.float32), rng.integers(0, 20, 100),
+                 rng.integers(0, 500, 100), rng.integers(500, 1000, 100))
+    started = time.perf_counter()
+    for _ in range(20):
+        selected = mmr_select(*arguments, limit=15, max_per_article=3, vectors=candidates)
+    elapsed_ms = (time.perf_counter() - started) * 1000 / 20
+    assert len(selected) == 15
+    print(f"✅ MMR correcto ({elapsed_ms:.2f} ms por consulta)")
+
+def test_search_diversity():
+    """Probar la etapa de diversidad y el re-ranking léxico dentro de la búsqueda"""
+
+    print("🧪 Cobertura de los términos de la consulta...")
+    coverage = lexical_overlap(["ospf", "area"], [["ospf", "area", "ruta"], ["ospf"], []], {"ospf": 1.0, "area": 3.0})
+    assert np.allclose(coverage, [1.0, 0.25, 0.0])
+
+    filler = " ".join(["OSPF enrutamiento dinámico"] * 40)
+    articles = [
+        {"id": "ospf", "title": "OSPF", "content": f"{filler} OSPF divide la red en áreas. {filler}"},
+        {"id": "rip", "title": "RIP", "content": "RIP usa OSPF como alternativa en redes grandes con áreas."},
+    ]
+
+    print("🧪 Máximo de pasajes por artículo en los resultados...")
+    capped = EmbeddingManager(passage_size=120, passage_overlap=40, max_passages_per_article=2)
+    capped.add_articles_bulk(articles)
+    results = capped.search_similar_articles("OSPF áreas", 2, mode="lexical")
+    assert len(results) == 2 and all(len(result["passages"]) <= 2 for result in results)
+
+    print("🧪 Re-ranking léxico...")
+    reranked = EmbeddingManager(passage_size=120, passage_overlap=40, rerank_weight=0.5)
+    reranked.add_articles_bulk(articles)
+    results = reranked.search_similar_articles("OSPF áreas", 2, mode="lexical")
+    # El mejor pasaje de cada artículo contiene los dos términos de la consulta
+    assert all("áreas" in result["passages"][0]["text"] for result in results)
+    print("✅ Diversidad y re-ranking integrados en la búsqueda")
+
+if __name__ == "__main__":
+    test_mmr_select()
+    test_search_diversity()
@@ -1,3 +1,4 @@
+import asyncio
 import os
 import sys
 from dotenv import load_dotenv
@@ -41,7 +42,7 @@ def test_gemini():
         Contenido: Las redes neuronales son modelos computacionales inspirados en el funcionamiento del cerebro humano...
         """
         
-        answer = gemini_service.generate_answer(query, context)
+        answer = asyncio.run(gemini_service.generate_answer(query, context))
         print(f"✅ Respuesta: {answer[:200]}...")
     
     print("\n�� Test de Gemini completado!")
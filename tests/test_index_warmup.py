@@ -0,0 +1,103 @@
+import os
+import sys
+import threading
+
+# Agregar src al path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from services.embeddings import EmbeddingManager
+from services.index_warmup import IndexWarmup
+
+PAGES = [
+    [{"id": f"articulo-{page}-{i}", "title": f"Artículo {page}-{i}", "content": f"Apuntes {i} sobre redes y protocolos."}
+     for i in range(3)]
+    for page in range(3)
+]
+
+class GatedPages:
+    """Fuente de páginas falsa que entrega cada página solo cuando el test lo permite"""
+
+    def __init__(self, pages, fail_after=None):
+        self.pages = pages
+        self.fail_after = fail_after
+        # gates[i]: permite entregar la página i (la última permite terminar)
+        self.gates = [threading.Event() for _ in range(len(pages) + 1)]
+        # consumed[i]: el warmup ya indexó la página i y pidió la siguiente
+        self.consumed = [threading.Event() for _ in pages]
+
+    def __call__(self, batch_size):
+        for i, page in enumerate(self.pages):
+            if i == self.fail_after:
+                raise ConnectionError("Firestore no disponible")
+            self.gates[i].wait(5)
+            yield page
+            self.consumed[i].set()
+        self.gates[-1].wait(5)
+
+def test_warmup_progress():
+    """Probar los contadores de progreso y que la disponibilidad llega tras la última página"""
+
+    manager = EmbeddingManager()
+    source = GatedPages(PAGES)
+    warmup = IndexWarmup(manager, source, batch_size=3)
+    assert not warmup.is_ready and warmup.get_status()["status"] == "idle"
+    warmup.start()
+
+    for i in range(len(PAGES)):
+        print(f"🧪 Entregando la página {i + 1}...")
+        source.gates[i].set()
+        assert source.consumed[i].wait(5)
+        status = warmup.get_status()
+        assert status["pages_loaded"] == i + 1
+        assert status["articles_loaded"] == status["indexed_articles"] == 3 * (i + 1)
+        assert not status["ready"] and status["status"] == "loading"
+    print("✅ Contadores por página, sin disponibilidad antes de terminar")
+
+    source.gates[-1].set()
+    assert warmup.wait(5)
+    status = warmup.get_status()
+    assert status["status"] == "ready" and status["errors"] == []
+    assert status["articles_loaded"] == 9 and status["pages_loaded"] == 3
+    print("✅ Índice disponible tras la última página")
+
+def test_warmup_page_error():
+    """Probar que una página con error se informa y la carga sigue hasta estar disponible"""
+
+    manager = EmbeddingManager()
+    add_articles_bulk = manager.add_articles_bulk
+
+    def failing_bulk(articles, *args, **kwargs):
+        if articles is PAGES[1]:
+            raise ValueError("artículo mal formado")
+        return add_articles_bulk(articles, *args, **kwargs)
+
+    manager.add_articles_bulk = failing_bulk
+    source = GatedPages(PAGES)
+    for gate in source.gates:
+        gate.set()
+
+    print("🧪 Cargando con una página que falla...")
+    warmup = IndexWarmup(manager, source, batch_size=3)
+    warmup.start()
+    assert warmup.wait(5)
+    status = warmup.get_status()
+    assert status["ready"] and status["status"] == "ready"
+    assert status["pages_loaded"] == 3 and status["articles_loaded"] == 6
+    assert len(status["errors"]) == 1 and "Página 2" in status["errors"][0]
+    assert "articulo-1-0" not in manager.articles_data
+    print("✅ Error informado y el resto de páginas indexadas")
+
+    print("🧪 La fuente de páginas falla a mitad de la carga...")
+    source = GatedPages(PAGES, fail_after=1)
+    source.gates[0].set()
+    warmup = IndexWarmup(EmbeddingManager(), source, batch_size=3)
+    warmup.start()
+    assert warmup.wait(5)
+    status = warmup.get_status()
+    assert status["ready"] and status["status"] == "failed"
+    assert status["pages_loaded"] == 1 and "Firestore no disponible" in status["errors"][0]
+    print("✅ Disponible con lo cargado, sin quedarse bloqueado")
+
+if __name__ == "__main__":
+    test_warmup_progress()
+    test_warmup_page_error()
@@ -0,0 +1,115 @@
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+
+# Agregar src al path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from services.gemini_service import GeminiService
+from services.llm_scheduler import LLMQueueFullError, LLMScheduler
+from services.stub_llm import StubLLMModel
+
+STUB_SERVER = os.path.join(os.path.dirname(__file__), "..", "scripts", "stub_llm_server.py")
+
+def test_llm_scheduler():
+    """Probar concurrencia acotada, prioridad de carriles, límites por minuto y cola llena"""
+
+    async def main():
+        scheduler = LLMScheduler(max_concurrency=2, requests_per_minute=0, tokens_per_minute=0, max_queue=3)
+        running, peak, order = 0, 0, []
+
+        async def call(lane: str, name: str):
+            nonlocal running, peak
+            async with scheduler.slot(lane):
+                running += 1
+                peak = max(peak, running)
+                order.append(name)
+                await asyncio.sleep(0.01)
+                running -= 1
+
+        print("🧪 Concurrencia acotada y prioridad del chat interactivo...")
+        tasks = [asyncio.ensure_future(call("batch", f"lote-{i}")) for i in range(3)]
+        await asyncio.sleep(0)
+        tasks += [asyncio.ensure_future(call("interactive", f"chat-{i}")) for i in range(2)]
+        await asyncio.gather(*tasks)
+        assert peak == 2
+        # El carril batch solo ocupa un hueco; los chats adelantan a los lotes en espera
+        assert order[:3] == ["lote-0", "chat-0", "chat-1"]
+        stats = scheduler.get_stats()["lanes"]
+        assert stats["batch"]["started"] == 3 and stats["interactive"]["queue_ms_max"] > 0
+
+        print("🧪 Cola llena...")
+        blockers = [asyncio.ensure_future(call("batch", "x")) for _ in range(4)]
+        await asyncio.sleep(0)
+        try:
+            await call("batch", "rechazada")
+            assert False, "La cola debería estar llena"
+        except LLMQueueFullError:
+            pass
+        await asyncio.gather(*blockers)
+        assert scheduler.get_stats()["lanes"]["batch"]["rejected"] == 1
+
+        print("🧪 Límite de peticiones por minuto...")
+        limited = LLMScheduler(max_concurrency=4, requests_per_minute=600, tokens_per_minute=0)
+        limited.requests._level = 1
+        started = time.monotonic()
+        await asyncio.gather(call_with(limited), call_with(limited))
+        # 600 por minuto = una cada 0,1 s
+        assert time.monotonic() - started >= 0.08
+        assert limited.get_stats()["throttled"] == 1
+
+    async def call_with(scheduler: LLMScheduler):
+        async with scheduler.slot("interactive", tokens=10):
+            pass
+
+    asyncio.run(main())
+    print("✅ Planificador correcto")
+
+def test_stub_llm_server():
+    """Probar GeminiService contra el servidor LLM local (respuesta completa y streaming)"""
+
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    server = subprocess.Popen(
+        [sys.executable, STUB_SERVER, "--port", str(port), "--first-token-ms", "10", "--jitter-ms", "0",
+         "--tokens-per-second", "2000", "--output-tokens", "20"],
+        stdout=subprocess.DEVNULL
+    )
+    try:
+        for _ in range(100):
+            with socket.socket() as probe:
+                if probe.connect_ex(("127.0.0.1", port)) == 0:
+                    break
+            time.sleep(0.05)
+
+        service = GeminiService(
+            scheduler=LLMScheduler(max_concurrency=2),
+            model=StubLLMModel(f"http://127.0.0.1:{port}")
+        )
+
+        async def main():
+            print("🧪 Respuestas completas a través del planificador...")
+            answers = await asyncio.gather(*(
+                service.generate_answer(f"pregunta {i}", "contexto") for i in range(5)
+            ))
+            assert all("Respuesta simulada" in answer for answer in answers)
+
+            print("🧪 Respuesta en streaming...")
+            chunks = [chunk async for chunk in service.generate_answer_stream("¿Qué es TCP?", "contexto")]
+            assert len(chunks) > 1 and "".join(chunks).startswith("Respuesta simulada a «Pregunta: ¿Qué es TCP?»")
+
+        asyncio.run(main())
+        stats = service.get_stats()
+        assert stats["model"] == "stub" and stats["scheduler"]["lanes"]["interactive"]["started"] == 6
+        print("✅ LLM local accesible desde GeminiService")
+    finally:
+        server.terminate()
+        server.wait()
+
+if __name__ == "__main__":
+    test_llm_scheduler()
+    test_stub_llm_server()
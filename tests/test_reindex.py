@@ -0,0 +1,107 @@
+import os
+import sys
+import tempfile
+import time
+
+# Agregar src al path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from services.embeddings import EmbeddingManager
+from services.reindex import ReindexJobManager
+from services.vectorizer import HashingVectorizer
+
+CORPUS = [
+    {"id": f"articulo-{i}", "title": f"Artículo {i}", "content": f"Contenido del artículo {i} sobre redes y protocolos."}
+    for i in range(6)
+]
+
+def _build_manager() -> EmbeddingManager:
+    manager = EmbeddingManager(model=HashingVectorizer(n_features=256))
+    manager.add_article_embedding("antiguo", "Antiguo", "Artículo que ya no está en Firestore")
+    manager.add_article_embedding("borrado", "Borrado", "Artículo que se borra durante la reindexación")
+    return manager
+
+def _wait(job, timeout: float = 10.0):
+    deadline = time.time() + timeout
+    while job.status in ("pending", "running") and time.time() < deadline:
+        time.sleep(0.01)
+    assert job.finished_at is not None, "La reindexación no terminó"
+
+def test_reindex_job():
+    """Probar fases, cambios durante la reconstrucción y el intercambio del índice"""
+
+    manager = _build_manager()
+    phases = []
+
+    def pages(batch_size: int):
+        for start in range(0, len(CORPUS), batch_size):
+            phases.append(jobs.get_job(job_id).phase)
+            # Cambios mientras se reconstruye: deben sobrevivir al intercambio
+            if start == 0:
+                manager.add_article_embedding("durante", "Durante", "Artículo creado durante la reindexación")
+                manager.remove_article("borrado")
+            yield CORPUS[start:start + batch_size]
+
+    jobs = ReindexJobManager(manager, pages, lambda: len(CORPUS))
+
+    print("🧪 Reindexando con cambios concurrentes...")
+    job = jobs.start_job(batch_size=2)
+    job_id = job.id
+    _wait(job)
+
+    assert job.status == "completed" and job.phase == "done", job.errors
+    assert phases == ["reading"] * 3
+    status = job.to_dict()
+    assert status["articles_read"] == 6 and status["total_articles"] == 6
+    assert status["total_passages"] == status["passages_vectorized"] > 0
+
+    ids = set(manager.articles_data)
+    assert {article["id"] for article in CORPUS} <= ids
+    assert "durante" in ids and "borrado" not in ids and "antiguo" not in ids
+    assert manager.search_similar_articles("creado durante la reindexación", 1)[0]["id"] == "durante"
+    print("✅ Cambios capturados y reaplicados tras el intercambio")
+
+    print("🧪 Otra reindexación tras terminar la anterior...")
+    assert jobs.start_job(batch_size=3).id != job_id
+
+def test_reindex_failure_keeps_index():
+    """Probar que una reconstrucción fallida deja el índice anterior intacto"""
+
+    manager = _build_manager()
+    generation = manager.generation
+
+    def failing_pages(batch_size: int):
+        yield CORPUS[:batch_size]
+        raise RuntimeError("Firestore no disponible")
+
+    print("🧪 Reindexación que falla a mitad...")
+    job = ReindexJobManager(manager, failing_pages, lambda: None).start_job(batch_size=2)
+    _wait(job)
+
+    assert job.status == "failed" and "Firestore no disponible" in job.errors[-1]
+    assert set(manager.articles_data) == {"antiguo", "borrado"}
+    assert manager.generation == generation
+    # Los cambios posteriores ya no se acumulan para un intercambio que no llegará
+    assert manager._change_capture is None
+    print("✅ El índice anterior sigue activo")
+
+def test_reindex_snapshot_failure():
+    """Probar que un fallo al guardar el snapshot tras el intercambio es solo un aviso"""
+
+    manager = _build_manager()
+
+    with tempfile.NamedTemporaryFile() as not_a_directory:
+        print("🧪 Snapshot en una ruta no válida...")
+        jobs = ReindexJobManager(manager, lambda batch_size: iter([CORPUS]), lambda: len(CORPUS),
+                                 snapshot_dir=not_a_directory.name)
+        job = jobs.start_job()
+        _wait(job)
+
+    assert job.status == "completed" and job.errors == []
+    assert job.to_dict()["warnings"] and "articulo-0" in manager.articles_data
+    print("✅ Reindexación completada con aviso")
+
+if __name__ == "__main__":
+    test_reindex_job()
+    test_reindex_failure_keeps_index()
+    test_reindex_snapshot_failure()
@@ -0,0 +1,445 @@
+import json
+import os
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Agregar src al path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from services.embeddings import EmbeddingManager
+from services.analyzer import spanish_analyzer
+from services.index_sharing import SharedIndexCoordinator
+
+ARTICLES = [
+    ("redes", "Introducción a Redes de Computadoras",
+     "Las redes de computadoras permiten la comunicación entre dispositivos usando TCP/IP."),
+    ("python", "Fundamentos de Programación en Python",
+     "Python es un lenguaje de programación de alto nivel, interpretado y de propósito general."),
+    ("sql", "Bases de Datos Relacionales",
+     "SQL es el lenguaje estándar para consultar bases de datos relacionales."),
+]
+
+def _build_manager() -> EmbeddingManager:
+    manager = EmbeddingManager()
+    for article_id, title, content in ARTICLES:
+        manager.add_article_embedding(article_id, title, content)
+    return manager
+
+def test_bm25_search():
+    """Probar búsqueda BM25 sobre el índice invertido"""
+
+    manager = _build_manager()
+
+    print("🧪 Buscando 'redes de computadoras'...")
+    results = manager.search_similar_articles("¿Qué son las redes de computadoras?", 3)
+    assert results, "No se encontraron resultados"
+    assert results[0]["id"] == "redes"
+    assert 0.0 < results[0]["similarity_score"] <= 1.0
+    # Los resultados son vistas sobre el registro indexado, sin copias
+    assert results[0].record is manager.articles_data["redes"]
+    print(f"✅ Mejor resultado: {results[0]['title']} ({results[0]['similarity_score']:.3f})")
+
+    print("🧪 Buscando término sin coincidencias...")
+    assert manager.search_similar_articles("astronomía", 3) == []
+    print("✅ Sin resultados para términos desconocidos")
+
+def test_spanish_analyzer():
+    """Probar plegado de tildes, palabras vacías y stemming ligero"""
+
+    print("🧪 Analizando texto en español...")
+    assert spanish_analyzer.analyze("¿Qué son las Redes?") == ["red"]
+    assert spanish_analyzer.analyze("programación") == spanish_analyzer.analyze("PROGRAMACION")
+    assert spanish_analyzer.analyze("computadoras") == spanish_analyzer.analyze("computadora")
+    assert spanish_analyzer.analyze("año") != spanish_analyzer.analyze("ano")
+    print("✅ Analizador correcto")
+
+    manager = _build_manager()
+    print("🧪 Buscando sin tildes y en singular...")
+    assert manager.search_similar_articles("programacion", 1)[0]["id"] == "python"
+    assert manager.search_similar_articles("red de computadora", 1)[0]["id"] == "redes"
+    print("✅ Coincidencias independientes de tildes y número")
+
+def test_upsert_and_remove():
+    """Probar reemplazo, archivado y compactación del índice"""
+
+    manager = EmbeddingManager(min_compaction_tombstones=2)
+    for article_id, title, content in ARTICLES:
+        manager.add_article_embedding(article_id, title, content)
+
+    print("🧪 Actualizando artículo existente...")
+    manager.add_article_embedding("redes", "Redes inalámbricas", "WiFi y Bluetooth")
+    assert manager.get_index_stats()["total_articles"] == 3
+    assert manager.search_similar_articles("TCP", 3) == []
+    assert manager.search_similar_articles("wifi", 3)[0]["id"] == "redes"
+    print("✅ Sin duplicados tras actualizar")
+
+    print("🧪 Archivando artículos...")
+    manager.add_article_embedding("python", "Python", "Python", status="archived")
+    assert manager.remove_article("sql")
+    assert manager.search_similar_articles("python", 3) == []
+
+    manager.compact()
+    stats = manager.get_index_stats()
+    assert stats["total_articles"] == 1
+    assert stats["index_slots"] == 1 and stats["tombstones"] == 0
+    assert manager.search_similar_articles("bluetooth", 3)[0]["id"] == "redes"
+    print("✅ Índice compactado al tamaño del corpus vivo")
+
+def test_upsert_compaction():
+    """Probar que las ediciones repetidas de un artículo disparan la compactación"""
+
+    manager = EmbeddingManager(passage_size=120, passage_overlap=30, min_compaction_tombstones=8)
+    long_content = " ".join(["el protocolo OSPF calcula rutas con Dijkstra"] * 30)
+    manager.add_article_embedding("rutas", "Enrutamiento", long_content)
+    long_passages = manager.get_index_stats()["total_passages"]
+    assert long_passages > 4
+
+    print("🧪 Alternando versiones larga y corta del mismo artículo...")
+    for _ in range(20):
+        manager.add_article_embedding("rutas", "Enrutamiento", "RIP usa el conteo de saltos.")
+        manager.add_article_embedding("rutas", "Enrutamiento", long_content)
+
+    stats = manager.get_index_stats()
+    assert stats["tombstones"] < manager.min_compaction_tombstones
+    assert stats["index_slots"] < long_passages + manager.min_compaction_tombstones
+    assert manager.search_similar_articles("OSPF", 3)[0]["id"] == "rutas"
+    print(f"✅ Índice compactado: {stats['index_slots']} posiciones para {stats['total_passages']} pasajes")
+
+def test_passages():
+    """Probar que los artículos largos se indexan por pasajes con offsets"""
+
+    manager = EmbeddingManager(passage_size=120, passage_overlap=30)
+    filler = " ".join(["introducción general al curso"] * 20)
+    content = f"{filler} El protocolo OSPF calcula rutas con el algoritmo de Dijkstra. {filler}"
+    manager.add_article_embedding("rutas", "Enrutamiento", content)
+
+    print("🧪 Buscando un término del medio del artículo...")
+    results = manager.search_similar_articles("OSPF", 3)
+    assert len(results) == 1 and results[0]["id"] == "rutas"
+    assert manager.get_index_stats()["total_passages"] > 1
+
+    best = results[0]["passages"][0]
+    assert "OSPF" in best["text"]
+    assert content[best["start"]:best["end"]] == best["text"]
+    print(f"✅ Mejor pasaje en [{best['start']}, {best['end']})")
+
+    print("🧪 Reemplazando por una versión más corta...")
+    manager.add_article_embedding("rutas", "Enrutamiento", "RIP usa el conteo de saltos.")
+    assert manager.get_index_stats()["total_passages"] == 1
+    assert manager.search_similar_articles("OSPF", 3) == []
+    print("✅ Pasajes sobrantes retirados")
+
+def test_query_cache():
+    """Probar la caché de resultados y su invalidación por generación"""
+
+    manager = _build_manager()
+
+    print("🧪 Repitiendo una consulta...")
+    first = manager.search_similar_articles("¿Qué es SQL?", 3)
+    again = manager.search_similar_articles("que es sql", 3)
+    assert [r["id"] for r in first] == [r["id"] for r in again]
+    stats = manager.query_cache.get_stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1
+
+    print("🧪 Invalidando al modificar el índice...")
+    manager.add_article_embedding("nosql", "Bases NoSQL", "Alternativas a SQL para datos no relacionales.")
+    ids = [r["id"] for r in manager.search_similar_articles("que es sql", 3)]
+    assert "nosql" in ids
+    assert manager.query_cache.get_stats()["invalidations"] == 1
+    print("✅ Caché invalidada tras el cambio")
+
+def test_metadata_filters():
+    """Probar filtros por categoría y etiquetas antes de puntuar"""
+
+    manager = EmbeddingManager()
+    manager.add_articles_bulk([
+        {"id": "tcp", "title": "TCP", "content": "Protocolo de redes TCP", "category": "Redes", "tags": ["protocolos"]},
+        {"id": "udp", "title": "UDP", "content": "Protocolo de redes UDP", "category": "Redes", "tags": ["protocolos", "tiempo-real"]},
+        {"id": "sql", "title": "SQL", "content": "Redes de bases de datos", "category": "Bases de datos"},
+    ])
+
+    print("🧪 Filtrando por categoría...")
+    ids = {r["id"] for r in manager.search_similar_articles("redes", 3, filters={"category": ["redes"]})}
+    assert ids == {"tcp", "udp"}
+
+    print("🧪 Filtrando por categoría y etiqueta...")
+    results = manager.search_similar_articles("redes", 1, filters={"category": ["Redes"], "tags": ["tiempo-real"]})
+    assert [r["id"] for r in results] == ["udp"]
+
+    print("🧪 Actualizando metadatos...")
+    manager.add_articles_bulk([{"id": "udp", "title": "UDP", "content": "Protocolo de redes UDP", "category": "Transporte"}])
+    assert manager.search_similar_articles("redes", 3, filters={"tags": ["tiempo-real"]}) == []
+    print("✅ Filtros de metadatos correctos")
+
+def test_snapshot_roundtrip():
+    """Probar guardado y carga de snapshots del índice"""
+
+    manager = _build_manager()
+
+    with tempfile.TemporaryDirectory() as root:
+        print("🧪 Guardando snapshot...")
+        manager.save_snapshot(root)
+        manager.add_article_embedding("extra", "Extra", "Contenido extra")
+        manager.save_snapshot(root, keep=1)
+        assert sorted(os.listdir(root)) == ["CURRENT", "snapshot-000002", "snapshot.lock"]
+
+        print("🧪 Cargando snapshot en una instancia nueva...")
+        restored = EmbeddingManager()
+        assert restored.load_snapshot(root)
+        assert restored.get_index_stats()["total_articles"] == 4
+        assert restored.search_similar_articles("SQL", 1)[0]["id"] == "sql"
+        print("✅ Snapshot restaurado correctamente")
+
+        print("🧪 Modificando un índice cargado (copia en escritura)...")
+        assert restored.lexical_index.is_frozen
+        restored.remove_article("extra")
+        assert not restored.lexical_index.is_frozen
+        assert restored.search_similar_articles("SQL", 1)[0]["id"] == "sql"
+        print("✅ El snapshot en disco no se modificó")
+
+def test_frozen_lexical_search():
+    """Probar que el índice de solo lectura puntúa sobre los arrays CSR igual que el de memoria"""
+
+    articles = [
+        {"id": f"id{i}", "title": f"Documento {i}",
+         "content": f"redes {'protocolos ' * (i % 4)}tema{i % 7} contenido general palabra{i}"}
+        for i in range(60)
+    ]
+    manager = EmbeddingManager()
+    manager.add_articles_bulk(articles)
+    queries = [["red", "protocol"], ["tema3", "contenid"], ["palabra7", "red"], ["astronomi"]]
+    allowed = [i % 2 == 0 for i in range(len(manager._passages))]
+
+    with tempfile.TemporaryDirectory() as root:
+        manager.save_snapshot(root)
+        restored = EmbeddingManager()
+        assert restored.load_snapshot(root)
+        frozen = restored.lexical_index
+        assert frozen.is_frozen
+
+        print("🧪 Consultas sin construir diccionarios de postings...")
+        def no_dicts(term):
+            raise AssertionError(f"postings de '{term}' copiados a un diccionario")
+        frozen.postings.__class__ = type("NoDictPostings", (type(frozen.postings),), {"__getitem__": no_dicts})
+        for mask in (None, allowed):
+            for k in (5, len(articles)):
+                expected = manager.lexical_index.search_many(queries, k, mask)
+                results = frozen.search_many(queries, k, mask)
+                for got, want in zip(results, expected):
+                    # Los empates pueden salir en otro orden: se comparan las puntuaciones
+                    assert [round(score, 9) for _, score, _ in got] == [round(score, 9) for _, score, _ in want]
+                    if k == len(articles):
+                        assert {doc_id: round(score, 9) for doc_id, score, _ in got} == \
+                            {doc_id: round(score, 9) for doc_id, score, _ in want}
+        assert frozen.idf("red") == manager.lexical_index.idf("red") > 0
+        assert frozen.doc_freq("astronomi") == 0
+        print("✅ Mismos resultados que el índice en memoria")
+
+def test_concurrent_snapshots():
+    """Probar guardados simultáneos en el mismo directorio"""
+
+    manager = _build_manager()
+    errors = []
+
+    def save():
+        try:
+            manager.save_snapshot(root, keep=10)
+        except Exception as e:
+            errors.append(e)
+
+    with tempfile.TemporaryDirectory() as root:
+        print("🧪 Guardando desde varios hilos a la vez...")
+        threads = [threading.Thread(target=save) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert errors == []
+        snapshots = sorted(name for name in os.listdir(root) if name.startswith("snapshot-"))
+        assert snapshots == [f"snapshot-{generation:06d}" for generation in range(1, 5)]
+        assert EmbeddingManager().load_snapshot(root)
+        print("✅ Cada guardado publicó su propia generación")
+
+def test_shared_index():
+    """Probar un índice compartido entre un proceso constructor y un lector"""
+
+    with tempfile.TemporaryDirectory() as root:
+        builder = SharedIndexCoordinator(_build_manager(), root, publish_min_changes=1)
+        reader = SharedIndexCoordinator(EmbeddingManager(), root)
+        # Sin hilos en segundo plano: los pasos se ejecutan a mano
+        builder.stop()
+        reader.stop()
+
+        print("🧪 Eligiendo roles...")
+        assert builder.start() == "builder"
+        assert reader.start() == "reader"
+
+        print("🧪 Publicando la primera generación...")
+        builder._publish()
+        reader._attach()
+        assert reader.manager.get_index_stats()["total_articles"] == 3
+        assert reader.manager.lexical_index.is_frozen
+
+        print("🧪 Escribiendo desde el lector...")
+        reader.manager.add_article_embedding("dns", "Sistema DNS", "El DNS traduce nombres de dominio.")
+        assert "dns" not in reader.manager.articles_data
+        builder._apply_journal()
+        builder._publish()
+        reader._attach()
+        assert reader.manager.search_similar_articles("dominio", 1)[0]["id"] == "dns"
+        assert reader.manager.lexical_index.is_frozen
+        print("✅ El lector ve los cambios publicados por el constructor")
+
+def test_shared_index_publication():
+    """Probar la publicación por umbral de cambios y el recorte del diario"""
+
+    with tempfile.TemporaryDirectory() as root:
+        builder = SharedIndexCoordinator(_build_manager(), root, publish_min_changes=3, publish_max_delay=3600)
+        reader = SharedIndexCoordinator(EmbeddingManager(), root)
+        builder.stop()
+        reader.stop()
+        assert builder.start() == "builder" and reader.start() == "reader"
+        assert not builder.snapshot_loaded
+        builder._publish()
+        assert builder.publications == 1
+        journal_path = os.path.join(root, SharedIndexCoordinator.JOURNAL_NAME)
+
+        print("🧪 Cambios por debajo del umbral...")
+        for i in range(2):
+            reader.manager.add_article_embedding(f"nota-{i}", f"Nota {i}", f"Contenido de la nota {i}")
+        builder._apply_journal()
+        builder._publish()
+        assert builder.publications == 1 and os.path.getsize(journal_path) > 0
+
+        print("🧪 Umbral alcanzado: publicar y recortar el diario...")
+        reader.manager.add_article_embedding("nota-2", "Nota 2", "Contenido de la nota 2")
+        builder._apply_journal()
+        # Entrada escrita después de leer el diario: el snapshot no la cubre
+        reader.manager.remove_article("redes")
+        builder._publish()
+        assert builder.publications == 2 and builder.journal_truncations == 1
+        with open(journal_path, encoding="utf-8") as f:
+            assert [json.loads(line)["op"] for line in f] == ["remove"]
+
+        print("🧪 Espera máxima...")
+        builder._apply_journal()
+        builder.publish_max_delay = 0
+        builder._publish()
+        assert builder.publications == 3 and os.path.getsize(journal_path) == 0
+        reader._attach()
+        assert "nota-2" in reader.manager.articles_data and "redes" not in reader.manager.articles_data
+
+        print("🧪 Relevo: el nuevo constructor reaplica lo que el snapshot no cubre...")
+        reader.manager.add_article_embedding("nota-3", "Nota 3", "Contenido de la nota 3")
+        builder._lock_file.close()
+        assert reader._try_acquire_builder_lock()
+        reader._become_builder()
+        assert reader.snapshot_loaded
+        reader._apply_journal()
+        assert "nota-3" in reader.manager.articles_data
+        print("✅ Publicación por lotes y diario acotado")
+
+def test_sharded_search():
+    """Probar la búsqueda repartida entre procesos shard"""
+
+    manager = EmbeddingManager(shards=2)
+    try:
+        for article_id, title, content in ARTICLES:
+            manager.add_article_embedding(article_id, title, content, category="datos" if article_id == "sql" else None)
+
+        print("🧪 Buscando en 2 shards...")
+        results = manager.search_similar_articles("¿Qué son las redes de computadoras?", 3)
+        assert results[0]["id"] == "redes"
+        assert results[0].record is manager.articles_data["redes"]
+        assert results[0]["passages"][0]["text"]
+        assert manager.search_similar_articles("lenguaje", 3, filters={"category": ["datos"]})[0]["id"] == "sql"
+
+        print("🧪 Retirando un artículo...")
+        manager.remove_article("redes")
+        assert all(result["id"] != "redes" for result in manager.search_similar_articles("redes", 3))
+
+        stats = manager.get_index_stats()
+        assert sum(stats["shards"]["articles_per_shard"]) == 2
+        assert stats["total_passages"] == sum(stats["shards"]["passages_per_shard"]) > 0
+        print(f"✅ Artículos por shard: {stats['shards']['articles_per_shard']}")
+
+        print("🧪 El proceso principal solo guarda registros...")
+        assert not manager.index_locally
+        assert manager._passages == [] and manager.lexical_index.vocabulary_size == 0
+        assert len(manager.embeddings_matrix) == 0
+
+        print("🧪 Snapshot de un índice con shards cargado sin shards...")
+        with tempfile.TemporaryDirectory() as root:
+            manager.save_snapshot(root)
+            restored = EmbeddingManager()
+            assert restored.load_snapshot(root)
+            assert restored.search_similar_articles("lenguaje SQL", 1)[0]["id"] == "sql"
+        print("✅ Indexación y vectorización solo en los shards")
+    finally:
+        manager.shard_pool.close()
+
+def test_sharded_merge_matches_single_index():
+    """Probar que los resultados fusionados de los shards siguen el orden de un único índice"""
+
+    # Cada término raro está en un solo artículo; "contenido" está en todos
+    articles = [
+        {"id": f"id{i}", "title": f"Documento {i}", "content": f"contenido general palabra{i} " + "contenido " * (i % 5)}
+        for i in range(200)
+    ]
+    single = EmbeddingManager()
+    single.add_articles_bulk(articles)
+    sharded = EmbeddingManager(shards=2)
+    try:
+        sharded.add_articles_bulk(articles)
+        for query in ("palabra12 contenido", "palabra12 palabra150 contenido"):
+            for mode in ("lexical", "hybrid"):
+                print(f"🧪 '{query}' ({mode}) con y sin shards...")
+                expected = [result["id"] for result in single.search_similar_articles(query, 3, mode=mode)]
+                merged = [result["id"] for result in sharded.search_similar_articles(query, 3, mode=mode)]
+                rare = len([term for term in query.split() if term.startswith("palabra")])
+                assert merged[:rare] == expected[:rare], (merged, expected)
+        print("✅ Mismos primeros resultados que el índice único")
+    finally:
+        sharded.shard_pool.close()
+
+def test_sharded_concurrent_queries():
+    """Probar que las consultas concurrentes comparten los shards y cada una recibe sus resultados"""
+
+    articles = [
+        {"id": f"id{i}", "title": f"Documento {i}", "content": f"contenido general palabra{i}"}
+        for i in range(100)
+    ]
+    manager = EmbeddingManager(shards=2)
+    try:
+        manager.add_articles_bulk(articles)
+        queries = [f"palabra{i} contenido" for i in range(0, 100, 5)]
+        expected = [manager.shard_pool.search(query, 3, "lexical") for query in queries]
+
+        print("🧪 20 consultas desde 8 hilos a la vez...")
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(lambda query: manager.shard_pool.search(query, 3, "lexical"), queries))
+        assert results == expected
+        assert all(hits[0][0] == query.split()[0].replace("palabra", "id") for query, hits in zip(queries, results))
+        assert manager.shard_pool._pending == {}
+        print("✅ Cada consulta recibió las respuestas de sus shards")
+    finally:
+        manager.shard_pool.close()
+
+if __name__ == "__main__":
+    test_bm25_search()
+    test_spanish_analyzer()
+    test_upsert_and_remove()
+    test_upsert_compaction()
+    test_passages()
+    test_query_cache()
+    test_metadata_filters()
+    test_snapshot_roundtrip()
+    test_frozen_lexical_search()
+    test_concurrent_snapshots()
+    test_shared_index()
+    test_shared_index_publication()
+    test_sharded_search()
+    test_sharded_merge_matches_single_index()
+    test_sharded_concurrent_queries()
@@ -0,0 +1,52 @@
+import asyncio
+import os
+import sys
+
+# Agregar src al path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from services.single_flight import SingleFlight
+
+def test_single_flight():
+    """Probar que las peticiones idénticas en curso comparten un solo trabajo"""
+
+    calls = []
+
+    async def work(question: str) -> str:
+        calls.append(question)
+        await asyncio.sleep(0.01)
+        if question == "falla":
+            raise ValueError("sin respuesta")
+        return f"respuesta a {question}"
+
+    async def main():
+        flight = SingleFlight()
+
+        print("🧪 30 preguntas idénticas a la vez...")
+        answers = await asyncio.gather(*(flight.do("redes", lambda: work("redes")) for _ in range(30)))
+        assert set(answers) == {"respuesta a redes"} and calls == ["redes"]
+        assert flight.get_stats()["coalesced"] == 29 and flight.get_stats()["in_flight"] == 0
+
+        print("🧪 Una pregunta nueva tras terminar vuelve a ejecutarse...")
+        await flight.do("redes", lambda: work("redes"))
+        assert calls == ["redes", "redes"]
+
+        print("🧪 Los errores llegan a todos los que esperan...")
+        results = await asyncio.gather(
+            *(flight.do("falla", lambda: work("falla")) for _ in range(3)), return_exceptions=True
+        )
+        assert all(isinstance(result, ValueError) for result in results)
+        assert calls.count("falla") == 1
+
+        print("🧪 Cancelar a un cliente no cancela a los demás...")
+        first = asyncio.ensure_future(flight.do("sql", lambda: work("sql")))
+        second = asyncio.ensure_future(flight.do("sql", lambda: work("sql")))
+        await asyncio.sleep(0)
+        first.cancel()
+        assert await second == "respuesta a sql"
+
+    asyncio.run(main())
+    print("✅ Peticiones agrupadas correctamente")
+
+if __name__ == "__main__":
+    test_single_flight()
@@ -0,0 +1,164 @@
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+# Agregar src al path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from services.vector_store import VectorMatrix
+from services.ann_index import IVFFlatIndex, Int8VectorIndex, PQVectorIndex
+from services.embeddings import EmbeddingManager
+from services.vectorizer import HashingVectorizer
+
+def test_vector_matrix():
+    """Probar altas, reemplazos y top-k coseno en la matriz incremental"""
+
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(200, 32)).astype(np.float32)
+
+    for dtype in ("float32", "float16"):
+        print(f"🧪 Matriz {dtype}...")
+        matrix = VectorMatrix(dtype=dtype, initial_capacity=4)
+        for vector in vectors:
+            matrix.append(vector)
+
+        assert len(matrix) == 200 and matrix.capacity >= 200
+        assert matrix.matrix.flags["C_CONTIGUOUS"]
+
+        hits = matrix.search(vectors[17], 3)
+        assert hits[0][0] == 17 and abs(hits[0][1] - 1.0) < 1e-2
+
+        # Reemplazo en el mismo lugar
+        matrix.set_row(17, vectors[42])
+        assert {row for row, _ in matrix.search(vectors[42], 2)} == {17, 42}
+
+        # Filas eliminadas no aparecen en resultados
+        matrix.delete(42)
+        assert matrix.search(vectors[42], 1)[0][0] == 17
+        print(f"✅ Matriz {dtype} correcta")
+
+def test_ivf_index():
+    """Probar inserción, borrado y recall del índice IVF"""
+
+    rng = np.random.default_rng(1)
+    centers = rng.normal(size=(20, 32)).astype(np.float32)
+    vectors = centers[rng.integers(0, 20, size=2000)] + 0.1 * rng.normal(size=(2000, 32)).astype(np.float32)
+
+    matrix = VectorMatrix()
+    index = IVFFlatIndex(matrix, nlist=20, nprobe=4, min_train_size=1000)
+    for vector in vectors:
+        index.add(matrix.append(vector))
+
+    assert index.is_trained
+    assert index.get_stats()["indexed_vectors"] == 2000
+
+    print("🧪 Recall del índice IVF...")
+    found = 0
+    for row in range(0, 2000, 50):
+        exact = {r for r, _ in matrix.search(vectors[row], 5)}
+        approx = {r for r, _ in index.search(vectors[row], 5)}
+        found += len(exact & approx)
+    recall = found / (40 * 5)
+    assert recall > 0.9, recall
+    print(f"✅ Recall@5: {recall:.3f}")
+
+    print("🧪 Búsqueda filtrada...")
+    allowed = np.zeros(2000, dtype=bool)
+    allowed[::100] = True
+    hits = index.search(vectors[3], 5, allowed)
+    assert len(hits) == 5 and all(allowed[r] for r, _ in hits)
+    print("✅ Solo filas permitidas")
+
+    print("🧪 Borrado incremental...")
+    index.remove(7)
+    matrix.delete(7)
+    assert 7 not in {r for r, _ in index.search(vectors[7], 5)}
+    print("✅ Fila eliminada fuera de los resultados")
+
+def test_compressed_indexes():
+    """Probar los índices int8 y PQ con reordenación sobre vectores mapeados en disco"""
+
+    rng = np.random.default_rng(2)
+    centers = rng.normal(size=(20, 64)).astype(np.float32)
+    vectors = centers[rng.integers(0, 20, size=2000)] + 0.3 * rng.normal(size=(2000, 64)).astype(np.float32)
+
+    for index_class, min_recall in ((Int8VectorIndex, 0.95), (PQVectorIndex, 0.5)):
+        with tempfile.TemporaryDirectory() as storage_dir:
+            matrix = VectorMatrix(storage_dir=storage_dir)
+            index = index_class(matrix) if index_class is Int8VectorIndex else index_class(matrix, min_train_size=1000)
+            for vector in vectors:
+                index.add(matrix.append(vector))
+            assert matrix.is_mapped
+
+            print(f"🧪 Recall del índice {index.kind}...")
+            found = 0
+            for row in range(0, 2000, 50):
+                exact = {r for r, _ in matrix.search(vectors[row], 10)}
+                approx = {r for r, _ in index.search(vectors[row], 10)}
+                found += len(exact & approx)
+            recall = found / (40 * 10)
+            assert recall >= min_recall, recall
+            stats = index.get_stats()
+            print(f"✅ Recall@10: {recall:.3f} ({stats['compression_vs_float32']}x menos memoria)")
+
+            print("🧪 Guardado y carga de los códigos...")
+            with tempfile.TemporaryDirectory() as snapshot_dir:
+                index.save(snapshot_dir)
+                matrix.save(os.path.join(snapshot_dir, "embeddings.npy"))
+                restored = index_class(VectorMatrix.from_array(
+                    np.load(os.path.join(snapshot_dir, "embeddings.npy"), mmap_mode="r")
+                ))
+                restored.load(snapshot_dir)
+                assert restored.search(vectors[5], 3) == index.search(vectors[5], 3)
+            print("✅ Mismos resultados tras cargar")
+
+def _resident_bytes(manager: EmbeddingManager) -> int:
+    """Bytes en RAM de los vectores: filas completas no mapeadas, códigos y codebooks"""
+    matrix = manager.embeddings_matrix
+    resident = 0 if matrix.is_mapped else matrix.nbytes
+    resident += manager.vector_index.get_stats().get("codes_bytes", 0)
+    codebooks = getattr(manager.vector_index, "codebooks", None)
+    return resident + (codebooks.nbytes if codebooks is not None else 0)
+
+def test_compressed_resident_memory():
+    """Probar que int8/PQ sin reordenación ocupan menos RAM que el índice exacto"""
+
+    topics = ["redes", "bases de datos", "algoritmos", "sistemas operativos", "compiladores", "seguridad"]
+    articles = [
+        {"id": f"articulo-{i}", "title": f"Artículo {i}",
+         "content": f"Apuntes {i} sobre {topics[i % len(topics)]} y su uso en el curso {i % 17}."}
+        for i in range(512)
+    ]
+
+    resident = {}
+    for kind, params in (("exact", None), ("int8", {"rerank": 0}), ("pq", {"rerank": 0, "min_train_size": 256})):
+        print(f"🧪 Memoria residente del índice {kind}...")
+        manager = EmbeddingManager(model=HashingVectorizer(n_features=128), vector_index=kind,
+                                   vector_index_params=params)
+        manager.add_articles_bulk(articles)
+        assert manager.get_index_stats()["embeddings_storage"] == ("ram" if kind == "exact" else "codes_only")
+        assert manager.search_similar_articles("redes", k=3, mode="vector")
+        resident[kind] = _resident_bytes(manager)
+        print(f"✅ {resident[kind]} bytes en RAM")
+
+    assert resident["int8"] < resident["exact"]
+    assert resident["pq"] < resident["exact"]
+
+    print("🧪 Reordenación: vectores completos en RAM salvo con un directorio explícito...")
+    manager = EmbeddingManager(model=HashingVectorizer(n_features=128), vector_index="int8")
+    manager.add_articles_bulk(articles[:8])
+    assert manager.get_index_stats()["embeddings_storage"] == "ram"
+    with tempfile.TemporaryDirectory() as storage_dir:
+        manager = EmbeddingManager(model=HashingVectorizer(n_features=128), vector_index="int8",
+                                   vector_storage_dir=storage_dir)
+        manager.add_articles_bulk(articles[:8])
+        assert manager.get_index_stats()["embeddings_storage"] == "mmap"
+    print("✅ Solo se mapean en disco si se indica dónde")
+
+if __name__ == "__main__":
+    test_vector_matrix()
+    test_ivf_index()
+    test_compressed_indexes()
+    test_compressed_resident_memory()
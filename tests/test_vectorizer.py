@@ -0,0 +1,91 @@
+import os
+import sys
+
+import numpy as np
+
+# Agregar src al path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from services.vectorizer import HashingVectorizer
+from services.embeddings import EmbeddingManager
+
+def test_hashing_vectorizer():
+    """Probar el vectorizador local (hashing + TF-IDF)"""
+
+    vectorizer = HashingVectorizer(n_features=1024)
+    texts = [
+        "Las redes de computadoras permiten la comunicación entre dispositivos",
+        "Python es un lenguaje de programación interpretado",
+    ]
+    vectorizer.partial_fit(texts)
+
+    print("🧪 Vectores densos normalizados...")
+    dense = vectorizer.encode(texts)
+    assert dense.shape == (2, 1024) and dense.dtype == np.float32
+    assert np.allclose(np.linalg.norm(dense, axis=1), 1.0, atol=1e-5)
+
+    print("🧪 Vectores dispersos equivalentes a los densos...")
+    sparse = vectorizer.transform_sparse(texts[:1])[0]
+    for index, weight in sparse.items():
+        assert abs(dense[0, index] - weight) < 1e-5
+
+    print("🧪 Búsqueda con el vectorizador como modelo por defecto...")
+    manager = EmbeddingManager(model=HashingVectorizer())
+    manager.add_article_embedding("redes", "Redes", texts[0])
+    manager.add_article_embedding("python", "Python", texts[1])
+    results = manager.search_similar_articles("programacion en python", 2)
+    assert results[0]["id"] == "python"
+    assert results[0]["similarity_score"] >= manager.relevance_threshold
+    print("✅ Vectorizador local correcto")
+
+def test_hybrid_search():
+    """Probar la fusión de rankings léxico y vectorial"""
+
+    manager = EmbeddingManager(model=HashingVectorizer())
+    manager.add_article_embedding("tcp", "Protocolos", "TCP/IP es la base de Internet.")
+    manager.add_article_embedding("sql", "Bases de datos", "SQL consulta bases de datos relacionales.")
+    manager.add_article_embedding("wifi", "Redes inalámbricas", "Las redes inalámbricas conectan dispositivos sin cables.")
+
+    print("🧪 Búsqueda híbrida por palabra clave exacta...")
+    results = manager.search_similar_articles("SQL", 3, mode="hybrid")
+    assert results[0]["id"] == "sql"
+    assert "rrf_score" in results[0] and "bm25_score" in results[0]
+
+    print("🧪 Pesos por petición...")
+    only_lexical = manager.search_similar_articles("dispositivos inalambricos", 3, mode="hybrid", vector_weight=0.0)
+    assert all(result.get("bm25_score") for result in only_lexical)
+
+    try:
+        manager.search_similar_articles("SQL", 3, mode="desconocido")
+        assert False, "Modo inválido aceptado"
+    except ValueError:
+        pass
+    print("✅ Búsqueda híbrida correcta")
+
+def test_search_many():
+    """Probar la búsqueda en lote: mismo resultado que una a una, en orden y sin duplicar trabajo"""
+
+    manager = EmbeddingManager(model=HashingVectorizer())
+    manager.add_article_embedding("tcp", "Protocolos", "TCP/IP es la base de Internet.")
+    manager.add_article_embedding("sql", "Bases de datos", "SQL consulta bases de datos relacionales.")
+    manager.add_article_embedding("wifi", "Redes inalámbricas", "Las redes inalámbricas conectan dispositivos sin cables.")
+    questions = ["¿Qué es SQL?", "redes inalámbricas", "¿qué es sql?", "Internet"]
+
+    for mode in ("lexical", "vector", "hybrid"):
+        print(f"🧪 Lote en modo {mode}...")
+        manager.query_cache.clear()
+        batch = manager.search_many(questions, 2, mode=mode)
+        assert len(batch) == len(questions)
+        # Las preguntas idénticas tras normalizar comparten resultados
+        assert [r["id"] for r in batch[0]] == [r["id"] for r in batch[2]]
+        manager.query_cache.clear()
+        for question, results in zip(questions, batch):
+            single = manager.search_similar_articles(question, 2, mode=mode)
+            assert [r["id"] for r in results] == [r["id"] for r in single]
+    assert batch[0][0]["id"] == "sql" and batch[1][0]["id"] == "wifi"
+    print("✅ Resultados del lote iguales a los individuales")
+
+if __name__ == "__main__":
+    test_hashing_vectorizer()
+    test_hybrid_search()
+    test_search_many()